@@ -0,0 +1,231 @@
+# src/part1_data/dates.py
+
+import argparse
+import calendar
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+# --- Make sure src/ is on sys.path so we can import sibling modules ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+MONTHS = (
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+)
+
+# Full names and the abbreviations LoC transcriptions use ("Springfield Ill Nov 10th 1860").
+_MONTH_NUMBERS: Dict[str, int] = {}
+for _i, _name in enumerate(MONTHS, start=1):
+    _MONTH_NUMBERS[_name.lower()] = _i
+    _MONTH_NUMBERS[_name[:3].lower()] = _i
+_MONTH_NUMBERS["sept"] = 9
+
+# Month names factored by prefix ("Jan(?:uary)?") so the regex engine commits
+# on the first letter instead of trying 25 alternatives at every position.
+_MONTH_ALT = (
+    r"Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?"
+    r"|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?"
+)
+
+# One compiled pattern for every date shape we care about, so a document is
+# scanned once:
+#   1863-11-19 | November 19, 1863 | Nov 10th 1860 | November 1860 | November
+# The leading lookahead lets re skip positions that cannot start a date.
+DATE_RE = re.compile(
+    r"(?=[JFMASOND1])(?:"
+    r"\b(?P<iso>1[6-9]\d{2})-(?P<iso_m>[01]\d)-(?P<iso_d>[0-3]\d)\b"
+    r"|\b(?P<month>" + _MONTH_ALT + r")\b\.?"
+    r"(?:\s+(?P<day>[0-3]?\d)(?:st|nd|rd|th|d)?\b)?"
+    r"(?:,?\s*(?P<year>1[6-9]\d{2})\b)?"
+    r")"
+)
+YEAR_RE = re.compile(r"\b(1[6-9]\d{2})\b")
+
+# A dateline place is short ("Charleston S. C.", "Executive Mansion, Washington");
+# anything longer in front of a month is running prose, not a place.
+PLACE_MAX_CHARS = 40
+
+
+@dataclass
+class DateValue:
+    text: str = ""       # the date as written in the source
+    iso: str = ""        # "1863-11-19", "1860-11" or "1865"
+    precision: str = ""  # "day" | "month" | "year" | "" (unknown)
+
+
+@dataclass
+class DatePlace:
+    date: DateValue
+    place: str = ""
+
+
+def _from_match(m: "re.Match[str]") -> DateValue:
+    if m.group("iso"):
+        return DateValue(m.group(0), m.group(0), "day")
+    month_name = m.group("month")
+    year = m.group("year")
+    if not year:
+        return DateValue()
+    month = _MONTH_NUMBERS[month_name.lower()]
+    day = m.group("day")
+    if day and 1 <= int(day) <= calendar.monthrange(int(year), month)[1]:
+        return DateValue(m.group(0).strip(), f"{year}-{month:02d}-{int(day):02d}", "day")
+    return DateValue(m.group(0).strip(), f"{year}-{month:02d}", "month")
+
+
+def normalize_date(text: str) -> DateValue:
+    """
+    ISO-8601 form of a free-text date, keeping how precise it actually was:
+      "April 8, 1861" -> 1861-04-08 (day), "November 1860" -> 1860-11 (month),
+      "[Election Night 1860]" -> 1860 (year), "" -> unknown
+    """
+    if not text:
+        return DateValue()
+    for m in DATE_RE.finditer(text):
+        value = _from_match(m)
+        if value.iso:
+            value.text = text
+            return value
+    y = YEAR_RE.search(text)
+    if y:
+        return DateValue(text, y.group(1), "year")
+    return DateValue(text)
+
+
+def iso_bounds(iso: str) -> Tuple[str, str]:
+    """
+    Inclusive day range covered by a (possibly partial) ISO date, for
+    range queries: "1860-11" -> ("1860-11-01", "1860-11-30").
+    """
+    parts = iso.split("-")
+    if len(parts) == 3:
+        return iso, iso
+    if len(parts) == 2:
+        y, m = int(parts[0]), int(parts[1])
+        return f"{iso}-01", f"{iso}-{calendar.monthrange(y, m)[1]:02d}"
+    if len(parts) == 1 and parts[0]:
+        return f"{iso}-01-01", f"{iso}-12-31"
+    return "", ""
+
+
+class DatePlaceEngine:
+    """
+    Finds the first dated mention (month + year, or an ISO date) and the place
+    written in front of a month - LoC datelines look like
+    'Charleston S. C. April 8th 1861' - in a single finditer() pass over the
+    whole document instead of one scan per month per line.
+    """
+
+    def __init__(self, pattern: "re.Pattern[str]" = DATE_RE):
+        self.pattern = pattern
+
+    def extract(self, content: str) -> DatePlace:
+        found = DatePlace(DateValue())
+        for m in self.pattern.finditer(content):
+            if not found.place and m.group("month"):
+                # Start of the line, or of the text node if markup was left in;
+                # only look back as far as a place could reach.
+                lo = max(0, m.start() - PLACE_MAX_CHARS - 8)
+                cut = max(content.rfind("\n", lo, m.start()), content.rfind(">", lo, m.start()))
+                if cut >= 0 or lo == 0:
+                    before = content[cut + 1:m.start()].strip(" \t,;[(").rstrip(",.;")
+                    if before[:1].isupper() and len(before) <= PLACE_MAX_CHARS:
+                        found.place = before
+            if not found.date.iso:
+                found.date = _from_match(m)
+            if found.place and found.date.iso:
+                break
+        return found
+
+    def extract_many(self, contents: Iterable[str]) -> List[DatePlace]:
+        return [self.extract(c) for c in contents]
+
+
+DEFAULT_DATE_ENGINE = DatePlaceEngine()
+
+
+# ----------------------------------------------------------------------
+# Report + benchmark against the old per-line / per-month scan
+# ----------------------------------------------------------------------
+
+def legacy_date_place(content: str) -> Tuple[str, str]:
+    """The line-by-line scans improve_loc_dataset used before this engine."""
+    date = ""
+    for line in content.splitlines():
+        line_stripped = line.strip()
+        if any(m in line_stripped for m in MONTHS) and re.search(r"\b(18[0-9]{2}|19[0-9]{2})\b", line_stripped):
+            date = line_stripped
+            break
+    place = ""
+    for line in content.splitlines():
+        line_stripped = line.strip()
+        if any(m in line_stripped for m in MONTHS):
+            for m in MONTHS:
+                if m in line_stripped:
+                    before = line_stripped.split(m, 1)[0].strip()
+                    if before:
+                        place = before.rstrip(",.;")
+                        break
+            if place:
+                break
+    return date, place
+
+
+def benchmark(label: str, contents: List[str], repeat: int) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for content in contents:
+            legacy_date_place(content)
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        DEFAULT_DATE_ENGINE.extract_many(contents)
+    engine_s = time.perf_counter() - start
+
+    n = repeat * len(contents)
+    print(f"[bench] {label}: legacy {legacy_s:.3f}s, engine {engine_s:.3f}s for {n} docs "
+          f"({legacy_s / engine_s if engine_s else 0:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Date/place engine report and benchmark")
+    parser.add_argument("--input", default="data/processed/loc_lincoln.jsonl")
+    parser.add_argument("--gutenberg-dir", default="data/raw/gutenberg")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    from part1_data.markup import markup_to_text
+    from part1_data.store import iter_jsonl, list_files, open_text
+
+    records = list(iter_jsonl(args.input))
+    # Same content improve_record() scans (it keeps the raw text when cleaning empties it)
+    contents = [markup_to_text(rec.get("content", "")) or rec.get("content", "").strip() for rec in records]
+
+    for rec, found in zip(records, DEFAULT_DATE_ENGINE.extract_many(contents)):
+        given = normalize_date(rec.get("date", "").strip())
+        print(f"[info] {rec.get('id', '')}: given={given.iso or '-'} ({given.precision or 'unknown'}) "
+              f"guessed={found.date.iso or '-'} ({found.date.precision or 'unknown'}) "
+              f"place={found.place[:40]!r}")
+
+    benchmark("loc", contents, args.repeat)
+
+    # Long multi-line texts are where the per-line, per-month scan hurts most.
+    books = []
+    for path in list_files(args.gutenberg_dir, ".txt"):
+        with open_text(path) as f:
+            books.append(f.read())
+    if books:
+        benchmark("gutenberg", books, max(1, args.repeat // 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# src/part1_data/docstore.py
+
+import argparse
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# --- Make sure src/ is on sys.path so we can import sibling modules ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.store import STORE_DIR, loads, logical_name, open_binary, resolve_ref
+
+# Random access by id over a JSONL file:
+#
+#   <data>.jsonl        plain (uncompressed) JSONL, read through mmap
+#   <data>.jsonl.idx    sidecar: [[id, offset, length], ...] in file order
+#
+# Plain files on disk are indexed in place. Files that live in the blob store
+# are compressed, so they are first materialized once under
+# data/store/docs/<sha256>.jsonl - keyed by content, so a new version of the
+# file simply gets a new copy and a new index.
+
+DOCS_DIR = os.path.join(STORE_DIR, "docs")
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+
+def _stat_key(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def source_key(path: str) -> str:
+    """
+    Version stamp of a logical JSONL path without reading it: the blob digest
+    for store refs, size + mtime for files on disk. Same key DocStore uses.
+    """
+    digest = resolve_ref(path)
+    if digest:
+        return digest
+    packed = next((p for p in (path, path + ".gz", path + ".xz") if os.path.isfile(p)), None)
+    if packed is None:
+        raise FileNotFoundError(path)
+    return _stat_key(packed)
+
+
+def _materialize(path: str) -> Tuple[str, str]:
+    """
+    Return (plain_path, source_key) for a logical JSONL path. source_key
+    changes whenever the underlying data does, which invalidates the index.
+    """
+    digest = resolve_ref(path)
+    if digest:
+        plain = os.path.join(DOCS_DIR, digest + ".jsonl")
+        source_key = digest
+    elif os.path.isfile(path) and not path.endswith((".gz", ".xz")):
+        return path, _stat_key(path)
+    else:
+        # Compressed sibling on disk (path.gz / path.xz): decompress once.
+        packed = next((p for p in (path, path + ".gz", path + ".xz") if os.path.isfile(p)), None)
+        if packed is None:
+            raise FileNotFoundError(path)
+        source_key = _stat_key(packed)
+        name = hashlib.sha256(logical_name(path).encode("utf-8")).hexdigest()[:16]
+        plain = os.path.join(DOCS_DIR, f"{name}-{source_key}.jsonl")
+
+    if not os.path.exists(plain):
+        os.makedirs(DOCS_DIR, exist_ok=True)
+        with open_binary(path) as src, open(plain + ".tmp", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(plain + ".tmp", plain)
+    return plain, source_key
+
+
+def build_index(plain_path: str, id_field: str = "id") -> List[List[Any]]:
+    """One sequential pass: [id, byte offset, byte length] for every record."""
+    entries: List[List[Any]] = []
+    offset = 0
+    with open(plain_path, "rb") as f:
+        for line in f:
+            body = line.strip()
+            if body:
+                start = offset + (len(line) - len(line.lstrip()))
+                rec_id = loads(body).get(id_field)
+                entries.append([str(rec_id), start, len(body)])
+            offset += len(line)
+    return entries
+
+
+class DocStore:
+    """
+    Read-only, id-addressable view of a JSONL file:
+
+        docs = DocStore("data/processed/loc_lincoln_improved.jsonl")
+        rec = docs.get("loc_mal4361300")        # decodes only that record
+        for rec in docs.iter_range("gutenberg_", "gutenberg_~"): ...
+        for rec in docs.iter_shard(0, 4): ...
+
+    The index is built on first open and rebuilt whenever the data changes.
+    """
+
+    def __init__(self, path: str, id_field: str = "id"):
+        self.path = path
+        self.id_field = id_field
+        self.plain_path, source_key = _materialize(path)
+        self.index_path = self.plain_path + INDEX_SUFFIX
+        self.entries = self._load_index(source_key)
+
+        self._positions: Dict[str, int] = {}
+        for pos, (rec_id, _, _) in enumerate(self.entries):
+            self._positions.setdefault(rec_id, pos)  # first occurrence wins
+        self._sorted_ids = sorted(self._positions)
+
+        self._file = open(self.plain_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def _load_index(self, source_key: str) -> List[List[Any]]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                idx = json.load(f)
+            if (idx.get("version") == INDEX_VERSION and idx.get("source_key") == source_key
+                    and idx.get("id_field") == self.id_field):
+                return idx["records"]
+        except (OSError, ValueError):
+            pass
+
+        entries = build_index(self.plain_path, self.id_field)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "source": logical_name(self.path),
+                "source_key": source_key,
+                "id_field": self.id_field,
+                "records": entries,
+            }, f)
+        os.replace(tmp_path, self.index_path)
+        print(f"[info] Indexed {len(entries)} records -> {self.index_path}")
+        return entries
+
+    # -- lookups -------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, rec_id: str) -> bool:
+        return rec_id in self._positions
+
+    def ids(self) -> List[str]:
+        """Ids in file order."""
+        return [e[0] for e in self.entries]
+
+    def _decode(self, pos: int) -> Dict[str, Any]:
+        _, offset, length = self.entries[pos]
+        return loads(self._mm[offset:offset + length])  # type: ignore[index]
+
+    def get(self, rec_id: str) -> Dict[str, Any]:
+        pos = self._positions.get(rec_id)
+        if pos is None:
+            raise KeyError(f"{rec_id!r} not in {self.path}")
+        return self._decode(pos)
+
+    def get_many(self, rec_ids: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        for rec_id in rec_ids:
+            yield self.get(rec_id)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for pos in range(len(self.entries)):
+            yield self._decode(pos)
+
+    def iter_range(self, start: Optional[str] = None, stop: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Records with start <= id < stop, in id order (either bound may be None)."""
+        lo = 0 if start is None else bisect.bisect_left(self._sorted_ids, start)
+        hi = len(self._sorted_ids) if stop is None else bisect.bisect_left(self._sorted_ids, stop)
+        for rec_id in self._sorted_ids[lo:hi]:
+            yield self._decode(self._positions[rec_id])
+
+    def iter_shard(self, shard: int, n_shards: int) -> Iterator[Dict[str, Any]]:
+        """Contiguous slice `shard` of `n_shards` (file order), for splitting a run."""
+        if not 0 <= shard < n_shards:
+            raise ValueError(f"shard must be in [0, {n_shards}), got {shard}")
+        n = len(self.entries)
+        for pos in range(n * shard // n_shards, n * (shard + 1) // n_shards):
+            yield self._decode(pos)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "DocStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """'2/8' -> (2, 8)"""
+    shard, n_shards = spec.split("/", 1)
+    return int(shard), int(n_shards)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Id-indexed access to JSONL files")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="(re)build the sidecar index")
+    p_build.add_argument("paths", nargs="+")
+    p_get = sub.add_parser("get", help="print one record by id")
+    p_get.add_argument("path")
+    p_get.add_argument("ids", nargs="+")
+    p_bench = sub.add_parser("bench", help="full parse vs indexed lookup")
+    p_bench.add_argument("path")
+    p_bench.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        for path in args.paths:
+            with DocStore(path) as docs:
+                print(f"[ok] {path}: {len(docs)} records, index {docs.index_path}")
+    elif args.cmd == "get":
+        with DocStore(args.path) as docs:
+            for rec in docs.get_many(args.ids):
+                print(json.dumps(rec, ensure_ascii=False)[:2000])
+    else:
+        from part1_data.store import iter_jsonl
+
+        with DocStore(args.path) as docs:
+            target = docs.ids()[-1]
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                next(r for r in iter_jsonl(args.path) if r.get("id") == target)
+            scan_s = (time.perf_counter() - start) / args.repeat
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                docs.get(target)
+            get_s = (time.perf_counter() - start) / args.repeat
+        print(f"[bench] {target}: scan {scan_s * 1000:.2f} ms, indexed get {get_s * 1000:.3f} ms "
+              f"({scan_s / get_s if get_s else 0:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
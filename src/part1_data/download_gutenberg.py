@@ -1,12 +1,20 @@
 # src/part1_data/download_gutenberg.py
 
 import os
-import time
+import sys
 from typing import List
-import requests
 from bs4 import BeautifulSoup
 from tqdm import tqdm
 
+# --- Make sure src/ is on sys.path so we can import sibling modules ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.harvester import Harvester, load_download_meta
+
 GUTENBERG_BOOK_URLS: List[str] = [
     "https://www.gutenberg.org/ebooks/6812",
     "https://www.gutenberg.org/ebooks/6811",
@@ -45,37 +53,36 @@ def get_plain_text_url(book_page_html: str) -> str:
     raise ValueError("Plain Text UTF-8 download link not found")
 
 
-def download_gutenberg_book(book_url: str, sleep_s: float = 1.0) -> None:
+def download_gutenberg_book(book_url: str, harvester: Harvester) -> None:
     book_id = get_book_id(book_url)
     out_path = os.path.join(RAW_DIR, f"{book_id}.txt")
 
-    if os.path.exists(out_path):
-        print(f"[skip] {book_id} already downloaded")
-        return
-
-    print(f"[info] Fetching book page for {book_id} ...")
-    resp = requests.get(book_url, timeout=30)
-    resp.raise_for_status()
-
-    text_url = get_plain_text_url(resp.text)
-    print(f"[info] Found text URL for {book_id}: {text_url}")
-
-    time.sleep(sleep_s)
-    text_resp = requests.get(text_url, timeout=60)
-    text_resp.raise_for_status()
+    # The text URL is remembered next to the file, so reruns can revalidate
+    # it directly instead of re-scraping the book page.
+    text_url = load_download_meta(out_path).get("url")
+    if not text_url:
+        print(f"[info] Fetching book page for {book_id} ...")
+        resp = harvester.get(book_url, timeout=30)
+        resp.raise_for_status()
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(text_resp.text)
+        text_url = get_plain_text_url(resp.text)
+        print(f"[info] Found text URL for {book_id}: {text_url}")
 
-    print(f"[ok] Saved {book_id} -> {out_path}")
+    status = harvester.download_to_file(text_url, out_path)
+    if status == "not_modified":
+        print(f"[skip] {book_id} unchanged on server (304)")
+    else:
+        print(f"[ok] Saved {book_id} -> {out_path} ({status})")
 
 
 def main():
-    for url in tqdm(GUTENBERG_BOOK_URLS):
-        try:
-            download_gutenberg_book(url)
-        except Exception as e:
-            print(f"[error] Failed to download {url}: {e}")
+    # Gutenberg asks crawlers to be gentle: ~1 request/s per host, a few in flight.
+    with Harvester(max_workers=4, rate_per_host=1.0, burst=1.0) as harvester:
+        results = harvester.map(download_gutenberg_book, GUTENBERG_BOOK_URLS)
+        for url, _, err in tqdm(results, total=len(GUTENBERG_BOOK_URLS)):
+            if err:
+                print(f"[error] Failed to download {url}: {err}")
+        harvester.stats.report("gutenberg")
 
 
 if __name__ == "__main__":
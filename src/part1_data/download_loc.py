@@ -2,10 +2,17 @@
 
 import json
 import os
-import time
-from typing import Dict
-import requests
-from bs4 import BeautifulSoup
+import sys
+from typing import Dict, Tuple
+
+# --- Make sure src/ is on sys.path so we can import sibling modules ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.harvester import Harvester
 
 RAW_DIR = "data/raw/loc"
 os.makedirs(RAW_DIR, exist_ok=True)
@@ -19,10 +26,10 @@ LOC_ITEMS: Dict[str, str] = {
 }
 
 
-def fetch_json(url: str) -> dict:
+def fetch_json(url: str, harvester: Harvester) -> dict:
     """Try to fetch LoC JSON (for /item/ or /resource/ when supported)."""
     json_url = url.rstrip("/") + "/?fo=json"
-    resp = requests.get(json_url, timeout=30)
+    resp = harvester.get(json_url, timeout=30)
     resp.raise_for_status()
     return resp.json()
 
@@ -41,23 +48,26 @@ def save_html(raw_id: str, html: str) -> None:
     print(f"[ok] Saved HTML for {raw_id} -> {out_path}")
 
 
-def download_loc_items(sleep_s: float = 0.5):
-    for loc_id, url in LOC_ITEMS.items():
-        print(f"[info] Processing {loc_id} ({url})")
-        try:
-            if "gettysburg-address" in url:
-                # Gettysburg transcription page is static HTML
-                resp = requests.get(url, timeout=30)
-                resp.raise_for_status()
-                save_html(loc_id, resp.text)
-            else:
-                # Try JSON API for item/resource
-                data = fetch_json(url)
-                save_json(loc_id, data)
-        except Exception as e:
-            print(f"[error] Failed to download {loc_id}: {e}")
-
-        time.sleep(sleep_s)
+def download_loc_item(item: Tuple[str, str], harvester: Harvester) -> None:
+    loc_id, url = item
+    print(f"[info] Processing {loc_id} ({url})")
+    if "gettysburg-address" in url:
+        # Gettysburg transcription page is static HTML
+        resp = harvester.get(url, timeout=30)
+        resp.raise_for_status()
+        save_html(loc_id, resp.text)
+    else:
+        # Try JSON API for item/resource
+        data = fetch_json(url, harvester)
+        save_json(loc_id, data)
+
+
+def download_loc_items(max_workers: int = 4, rate_per_host: float = 2.0):
+    with Harvester(max_workers=max_workers, rate_per_host=rate_per_host) as harvester:
+        for (loc_id, _), _, err in harvester.map(download_loc_item, LOC_ITEMS.items()):
+            if err:
+                print(f"[error] Failed to download {loc_id}: {err}")
+        harvester.stats.report("loc")
 
 
 def main():
@@ -1,11 +1,21 @@
 # src/part1_data/improve_loc_dataset.py
 
-import json
 import os
-import re
-from typing import Dict, Any
+import sys
+from typing import Dict, Any, Tuple
 
-from bs4 import BeautifulSoup
+
+# --- Make sure src/ is on sys.path so we can import sibling modules ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.dates import DEFAULT_DATE_ENGINE, normalize_date
+from part1_data.markup import DEFAULT_ENGINE, markup_to_text
+from part1_data.parallel import RunStats, parallel_map, parse_workers
+from part1_data.store import JsonlWriter, exists, iter_jsonl
 
 INPUT_PATH = "data/processed/loc_lincoln.jsonl"
 OUTPUT_PATH = "data/processed/loc_lincoln_improved.jsonl"
@@ -75,51 +85,25 @@ MANUAL_META: Dict[str, Dict[str, str]] = {
 }
 
 
-def looks_like_xml(content: str) -> bool:
-    """
-    Heuristic: if the content contains XML/HTML-style tags,
-    we treat it as markup and try to strip tags.
-    """
-    if not content:
-        return False
-    return ("<" in content and ">" in content and "</" in content)
-
-
-def clean_content_xml_to_text(content: str) -> str:
+def clean_content_xml_to_text(content: str, engine: str = DEFAULT_ENGINE) -> str:
     """
     Convert XML / HTML-ish content into plain text while preserving line breaks.
     If it doesn't look like XML, just strip leading/trailing whitespace.
-    """
-    if not looks_like_xml(content):
-        return content.strip()
-
-    # Use XML parser; BeautifulSoup will handle slightly messy markup.
-    soup = BeautifulSoup(content, "lxml-xml")
-    text = soup.get_text("\n")
 
-    # Collapse blanks and trim
-    lines = [ln.strip() for ln in text.splitlines()]
-    lines = [ln for ln in lines if ln]  # drop empty lines
-    return "\n".join(lines).strip()
-
-
-MONTHS = (
-    "January", "February", "March", "April", "May", "June",
-    "July", "August", "September", "October", "November", "December"
-)
+    The work is done by part1_data.markup: the default "lxml" engine parses
+    with lxml.etree directly and only falls back to BeautifulSoup ("soup")
+    for markup lxml rejects. `python src/part1_data/markup.py` checks both
+    against the original implementation and benchmarks them.
+    """
+    return markup_to_text(content, engine)
 
 
 def maybe_extract_date_from_text(content: str) -> str:
     """
-    Lightweight attempt to pull a date-like line out of the text
-    if 'date' is empty. We look for a line containing a month + year.
+    Lightweight attempt to pull a date out of the text if 'date' is empty:
+    the first month + year (or ISO date), e.g. "April 8th, 1861".
     """
-    for line in content.splitlines():
-        line_stripped = line.strip()
-        if any(m in line_stripped for m in MONTHS) and re.search(r"\b(18[0-9]{2}|19[0-9]{2})\b", line_stripped):
-            # e.g. "April 8th, 1861" or "March 4, 1865"
-            return line_stripped
-    return ""
+    return DEFAULT_DATE_ENGINE.extract(content).date.text
 
 
 def maybe_extract_place_from_text(content: str) -> str:
@@ -128,15 +112,7 @@ def maybe_extract_place_from_text(content: str) -> str:
       'Charleston S. C. April 8th 1861'
     We grab the part before the month name.
     """
-    for line in content.splitlines():
-        line_stripped = line.strip()
-        if any(m in line_stripped for m in MONTHS):
-            for m in MONTHS:
-                if m in line_stripped:
-                    before = line_stripped.split(m, 1)[0].strip()
-                    if before:
-                        return before.rstrip(",.;")
-    return ""
+    return DEFAULT_DATE_ENGINE.extract(content).place
 
 
 def merge_manual_meta(record: Dict[str, Any]) -> Dict[str, Any]:
@@ -166,61 +142,70 @@ def improve_record(record: Dict[str, Any]) -> Dict[str, Any]:
     # 2) Use manual metadata where present
     record = merge_manual_meta(record)
 
-    # 3) If date is still empty, try to guess from content
-    if not record.get("date") or not record["date"].strip():
-        guessed_date = maybe_extract_date_from_text(cleaned_content)
-        if guessed_date:
-            record["date"] = guessed_date
-
-    # 4) If place is still empty, try to guess from content
-    if not record.get("place") or not record["place"].strip():
-        guessed_place = maybe_extract_place_from_text(cleaned_content)
-        if guessed_place:
-            record["place"] = guessed_place
+    # 3) If date / place are still empty, guess both from one pass over the content
+    need_date = not record.get("date") or not record["date"].strip()
+    need_place = not record.get("place") or not record["place"].strip()
+    if need_date or need_place:
+        found = DEFAULT_DATE_ENGINE.extract(cleaned_content)
+        if need_date and found.date.text:
+            record["date"] = found.date.text
+        if need_place and found.place:
+            record["place"] = found.place
+
+    # 4) Sortable ISO-8601 date next to the source wording ("" when unknown)
+    normalized = normalize_date(record.get("date", "").strip())
+    record["date_iso"] = normalized.iso
+    record["date_precision"] = normalized.precision
 
     return record
 
 
-def main():
-    if not os.path.exists(INPUT_PATH):
-        raise FileNotFoundError(f"Input file not found: {INPUT_PATH}")
+def improve_record_with_stats(rec: Dict[str, Any]) -> Tuple[Dict[str, Any], bool, bool]:
+    """
+    improve_record() plus whether date / place went from empty to filled.
+    Module-level so parallel_map can ship it to worker processes.
+    """
+    before_date = rec.get("date", "").strip()
+    before_place = rec.get("place", "").strip()
+
+    rec = improve_record(rec)
+
+    after_date = rec.get("date", "").strip()
+    after_place = rec.get("place", "").strip()
+    return rec, not before_date and bool(after_date), not before_place and bool(after_place)
 
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+
+def main(workers: int = 1):
+    if not exists(INPUT_PATH):
+        raise FileNotFoundError(f"Input file not found: {INPUT_PATH}")
 
     total = 0
     improved_dates = 0
     improved_places = 0
+    stats = RunStats()
 
-    with open(INPUT_PATH, "r", encoding="utf-8") as in_f, \
-         open(OUTPUT_PATH, "w", encoding="utf-8") as out_f:
+    with JsonlWriter(OUTPUT_PATH) as out_f:
 
-        for line in in_f:
-            line = line.strip()
-            if not line:
+        items = ((rec.get("id", ""), rec) for rec in iter_jsonl(INPUT_PATH))
+        for res in parallel_map(improve_record_with_stats, items, workers=workers):
+            stats.add(res)
+            if not res.ok:
+                print(f"[error] Failed to improve {res.item_id}: {res.error.splitlines()[0]}")
                 continue
 
-            rec = json.loads(line)
-            before_date = rec.get("date", "").strip()
-            before_place = rec.get("place", "").strip()
-
-            rec = improve_record(rec)
-
-            after_date = rec.get("date", "").strip()
-            after_place = rec.get("place", "").strip()
-
-            if not before_date and after_date:
-                improved_dates += 1
-            if not before_place and after_place:
-                improved_places += 1
+            rec, filled_date, filled_place = res.value
+            improved_dates += filled_date
+            improved_places += filled_place
 
-            out_f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            out_f.write(rec)
             total += 1
 
     print(f"[ok] Wrote improved file -> {OUTPUT_PATH}")
     print(f"[stats] Records processed: {total}")
     print(f"[stats] Dates newly filled: {improved_dates}")
     print(f"[stats] Places newly filled: {improved_places}")
+    stats.report("improve_loc_dataset")
 
 
 if __name__ == "__main__":
-    main()
+    main(parse_workers("Clean LoC content and fill missing metadata"))
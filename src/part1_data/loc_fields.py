@@ -0,0 +1,407 @@
+# src/part1_data/loc_fields.py
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Optional: incremental JSON parsing. Without it we fall back to json.load.
+try:
+    import ijson  # type: ignore
+except ImportError:
+    ijson = None
+
+# --- Make sure src/ is on sys.path so we can import sibling modules ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.store import open_binary
+
+# A string value is a transcription candidate when its key contains one of these
+# (case-insensitive). "fulltext" is covered by "text" but kept for readability.
+TEXT_KEY_TERMS = ("transcription", "text", "fulltext")
+
+# Below this size json.load + the compiled walk is faster than driving ijson's
+# events through Python; above it we stream so the payload is never built.
+STREAM_MIN_BYTES = 8 << 20
+
+Event = Tuple[str, Any]
+_MISSING = object()
+
+# Paths of the small header values we need; everything else is only scanned.
+_HEADER_PATHS = {
+    ("title",), ("date",),
+    ("item", 0, "title"), ("item", 0, "date"), ("item", 0, "location"),
+}
+
+
+class _ValueBuilder:
+    """Rebuild one JSON value from (event, value) pairs (tiny ijson.ObjectBuilder)."""
+
+    def __init__(self) -> None:
+        self.root: Any = None
+        self.containers: List[Any] = []
+        self.keys: List[Optional[str]] = []
+
+    def _add(self, value: Any) -> None:
+        if not self.containers:
+            self.root = value
+        elif isinstance(self.containers[-1], list):
+            self.containers[-1].append(value)
+        else:
+            self.containers[-1][self.keys[-1]] = value
+
+    def event(self, event: str, value: Any) -> bool:
+        """Feed one event; returns True once the value is complete."""
+        if event == "map_key":
+            self.keys[-1] = value
+        elif event in ("start_map", "start_array"):
+            container: Any = {} if event == "start_map" else []
+            self._add(container)
+            self.containers.append(container)
+            self.keys.append(None)
+        elif event in ("end_map", "end_array"):
+            self.containers.pop()
+            self.keys.pop()
+        else:
+            self._add(value)
+        return not self.containers
+
+
+def iter_events(obj: Any) -> Iterator[Event]:
+    """ijson-style events for an already-parsed object, without recursion."""
+    stack: List[Iterator[Any]] = [iter([obj])]
+    closers: List[str] = []
+    while stack:
+        try:
+            item = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            if closers:
+                yield closers.pop(), None
+            continue
+        if isinstance(stack[-1], _KeyedIter):
+            key, item = item
+            yield "map_key", key
+        if isinstance(item, dict):
+            yield "start_map", None
+            stack.append(_KeyedIter(item))
+            closers.append("end_map")
+        elif isinstance(item, list):
+            yield "start_array", None
+            stack.append(iter(item))
+            closers.append("end_array")
+        elif isinstance(item, str):
+            yield "string", item
+        elif isinstance(item, bool):
+            yield "boolean", item
+        elif item is None:
+            yield "null", None
+        else:
+            yield "number", item
+
+
+class _KeyedIter:
+    def __init__(self, d: Dict[str, Any]):
+        self._it = iter(d.items())
+
+    def __iter__(self) -> "_KeyedIter":
+        return self
+
+    def __next__(self) -> Tuple[str, Any]:
+        return next(self._it)
+
+
+class LocFieldExtractor:
+    """
+    Compiled version of normalize_loc's field extraction.
+
+    Key matching is decided once per distinct key and memoized (LoC JSON
+    repeats the same few dozen keys thousands of times), and the document is
+    walked with an explicit stack instead of recursion. For files over
+    STREAM_MIN_BYTES, extract_file() parses incrementally with ijson (when
+    installed), so large resource payloads are scanned as a stream and only
+    the header values are ever built.
+    """
+
+    def __init__(self, terms: Iterable[str] = TEXT_KEY_TERMS):
+        self.terms = tuple(t.lower() for t in terms)
+        self._key_cache: Dict[str, bool] = {}
+
+    def is_text_key(self, key: str) -> bool:
+        hit = self._key_cache.get(key)
+        if hit is None:
+            kl = key.lower()
+            hit = any(term in kl for term in self.terms)
+            self._key_cache[key] = hit
+        return hit
+
+    # -- materialized input --------------------------------------------
+
+    def collect_texts(self, data: Any) -> List[str]:
+        """
+        Pre-order walk, same order as the old recursive collect_texts.
+        Only containers and matching strings are ever pushed; children go on
+        the stack reversed so the first child is processed (fully) first.
+        """
+        candidates: List[str] = []
+        cache = self._key_cache
+        is_text_key = self.is_text_key
+        stack: List[Tuple[Optional[str], Any]] = [(None, data)]
+        pop = stack.pop
+        push = stack.extend
+        while stack:
+            _, value = pop()
+            if isinstance(value, str):
+                candidates.append(value)
+            elif isinstance(value, dict):
+                children = []
+                for k, v in value.items():
+                    if isinstance(v, (dict, list)):
+                        children.append((k, v))
+                    elif isinstance(v, str):
+                        hit = cache.get(k)
+                        if hit is None:
+                            hit = is_text_key(k)
+                        if hit:
+                            children.append((k, v))
+                children.reverse()
+                push(children)
+            elif isinstance(value, list):
+                children = [(None, x) for x in value if isinstance(x, (dict, list))]
+                children.reverse()
+                push(children)
+        return candidates
+
+    def extract(self, loc_id: str, data: dict) -> Dict[str, str]:
+        header = {("title",): data.get("title", _MISSING), ("date",): data.get("date", _MISSING)}
+        item = data.get("item")
+        if isinstance(item, list) and item:
+            for name in ("title", "date", "location"):
+                header[("item", 0, name)] = item[0].get(name, _MISSING)
+        return self._finish(loc_id, isinstance(item, list) and bool(item), header,
+                            self.collect_texts(data))
+
+    # -- event stream (ijson or iter_events) ---------------------------
+
+    def extract_events(self, loc_id: str, events: Iterable[Event]) -> Dict[str, str]:
+        candidates: List[str] = []
+        header: Dict[Tuple[Any, ...], Any] = {}
+        item_is_list = False
+        item_nonempty = False
+
+        path: List[Any] = []         # key / index of each open container
+        kinds: List[List[Any]] = []  # [kind, next array index] per open container
+        pending_key: Optional[str] = None
+        builder: Optional[_ValueBuilder] = None
+        builder_path: Tuple[Any, ...] = ()
+        is_text_key = self.is_text_key
+
+        for event, value in events:
+            if event == "map_key":
+                pending_key = value
+                if builder is not None:
+                    builder.event(event, value)
+                continue
+
+            if event in ("end_map", "end_array"):
+                if builder is not None and builder.event(event, value):
+                    header[builder_path] = builder.root
+                    builder = None
+                kinds.pop()
+                if path:
+                    path.pop()
+                continue
+
+            # Any other event starts a value; work out its key / index.
+            if kinds:
+                top = kinds[-1]
+                if top[0] == "map":
+                    key: Any = pending_key
+                else:
+                    key = top[1]
+                    top[1] += 1
+            else:
+                key = None
+
+            if builder is not None:
+                if builder.event(event, value):
+                    header[builder_path] = builder.root
+                    builder = None
+            elif len(path) < 3 and kinds:
+                vpath = tuple(path) + (key,)
+                if vpath == ("item",):
+                    item_is_list = event == "start_array"
+                elif vpath == ("item", 0):
+                    item_nonempty = item_is_list
+                if vpath in _HEADER_PATHS:
+                    builder = _ValueBuilder()
+                    builder_path = vpath
+                    if builder.event(event, value):
+                        header[vpath] = builder.root
+                        builder = None
+
+            if event == "string":
+                if kinds and kinds[-1][0] == "map" and is_text_key(key):
+                    candidates.append(value)
+            elif event in ("start_map", "start_array"):
+                if kinds:
+                    path.append(key)
+                kinds.append(["map" if event == "start_map" else "array", 0])
+
+        return self._finish(loc_id, item_nonempty, header, candidates)
+
+    def extract_file(self, loc_id: str, path: str, stream: Optional[bool] = None) -> Dict[str, str]:
+        if stream is None:
+            # Store blobs have no cheap size; stream those whenever we can.
+            size = os.path.getsize(path) if os.path.isfile(path) else STREAM_MIN_BYTES
+            stream = size >= STREAM_MIN_BYTES
+        with open_binary(path) as f:
+            if stream and ijson is not None:
+                events = ((ev, val) for _, ev, val in ijson.parse(f, use_float=True))
+                return self.extract_events(loc_id, events)
+            return self.extract(loc_id, json.load(f))
+
+    # -- shared --------------------------------------------------------
+
+    @staticmethod
+    def _finish(
+        loc_id: str,
+        item_nonempty: bool,
+        header: Dict[Tuple[Any, ...], Any],
+        candidates: List[str],
+    ) -> Dict[str, str]:
+        # Same precedence rules as the original extract_fields_from_loc_json.
+        if item_nonempty:
+            t = header.get(("item", 0, "title"), _MISSING)
+            title = t[0] if isinstance(t, list) else ("" if t is _MISSING else t)
+            d = header.get(("item", 0, "date"), _MISSING)
+            date = "" if d is _MISSING else d
+            p = header.get(("item", 0, "location"), _MISSING)
+            place = p[0] if isinstance(p, list) else ("" if p is _MISSING else p)
+        else:
+            t = header.get(("title",), _MISSING)
+            d = header.get(("date",), _MISSING)
+            title = "" if t is _MISSING else (t or "")
+            date = "" if d is _MISSING else (d or "")
+            place = ""
+
+        content = "\n\n".join(candidates) if candidates else ""
+        return {
+            "title": title or f"LoC Item {loc_id}",
+            "date": date or "",
+            "place": place or "",
+            "content": content.strip(),
+        }
+
+
+DEFAULT_EXTRACTOR = LocFieldExtractor()
+
+
+# ----------------------------------------------------------------------
+# Differential check + benchmark on data/raw/loc
+# ----------------------------------------------------------------------
+
+def legacy_extract(loc_id: str, data: dict) -> Dict[str, str]:
+    """The recursive extractor normalize_loc used before; the differential baseline."""
+    title = ""
+    date = ""
+    place = ""
+    content = ""
+    if "item" in data and isinstance(data["item"], list) and data["item"]:
+        title = data["item"][0].get("title", [""])[0] if isinstance(data["item"][0].get("title"), list) else data["item"][0].get("title", "")
+        date = data["item"][0].get("date", "")
+        place = data["item"][0].get("location", [""])[0] if isinstance(data["item"][0].get("location"), list) else data["item"][0].get("location", "")
+    else:
+        title = data.get("title") or ""
+        date = data.get("date") or ""
+
+    candidates = []
+
+    def collect_texts(obj):
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                kl = k.lower()
+                if any(term in kl for term in ["transcription", "text", "fulltext"]):
+                    if isinstance(v, str):
+                        candidates.append(v)
+                collect_texts(v)
+        elif isinstance(obj, list):
+            for x in obj:
+                collect_texts(x)
+
+    collect_texts(data)
+    if candidates:
+        content = "\n\n".join(candidates)
+
+    return {
+        "title": title or f"LoC Item {loc_id}",
+        "date": date or "",
+        "place": place or "",
+        "content": content.strip(),
+    }
+
+
+def main():
+    from part1_data.store import list_files
+
+    parser = argparse.ArgumentParser(description="Check / benchmark the LoC JSON field extractor")
+    parser.add_argument("--raw-dir", default="data/raw/loc")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = [p for p in list_files(args.raw_dir, ".json") if not os.path.basename(p).startswith("_")]
+    ex = LocFieldExtractor()
+
+    mismatches = 0
+    for path in paths:
+        with open_binary(path) as f:
+            data = json.load(f)
+        expected = legacy_extract(path, data)
+        for label, got in (
+            ("compiled", ex.extract(path, data)),
+            ("events", ex.extract_events(path, iter_events(data))),
+            ("file", ex.extract_file(path, path)),
+            ("stream", ex.extract_file(path, path, stream=True)),
+        ):
+            if got != expected:
+                mismatches += 1
+                print(f"[diff] {path}: {label} differs from legacy")
+    print(f"[check] {len(paths)} files, {mismatches} mismatches "
+          f"(streaming parser: {'ijson' if ijson else 'not installed, json.load used'})")
+
+    def bench(label: str, fn) -> float:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for path in paths:
+                fn(path)
+        elapsed = time.perf_counter() - start
+        print(f"[bench] {label:>22}: {elapsed / (args.repeat * len(paths)) * 1000:.3f} ms/file")
+        return elapsed
+
+    def legacy_file(path: str) -> None:
+        with open_binary(path) as f:
+            legacy_extract(path, json.load(f))
+
+    def compiled_file(path: str) -> None:
+        with open_binary(path) as f:
+            ex.extract(path, json.load(f))
+
+    base = bench("json.load + recursive", legacy_file)
+    fast = bench("json.load + compiled", compiled_file)
+    print(f"[bench] compiled speedup: {base / fast:.1f}x")
+    if ijson is not None:
+        stream = bench("ijson streaming", lambda p: ex.extract_file(p, p, stream=True))
+        print(f"[bench] streaming speedup: {base / stream:.1f}x")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
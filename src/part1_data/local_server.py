@@ -0,0 +1,133 @@
+# src/part1_data/local_server.py
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Tuple, Union
+
+# A route maps a path (including any query string, e.g. "/item/x/?fo=json")
+# to one of:
+#   - bytes / str: served as 200 with that body
+#   - (status, headers, body)
+#   - a callable(handler) -> (status, headers, body) for dynamic responses
+#     (POST routes read the request body with read_body(handler))
+Response = Tuple[int, Dict[str, str], bytes]
+Route = Union[bytes, str, Response, Callable[[BaseHTTPRequestHandler], Response]]
+
+
+def static_file_route(
+    body: bytes,
+    etag: str = "",
+    last_modified: str = "",
+) -> Callable[[BaseHTTPRequestHandler], Response]:
+    """
+    Route that behaves like a real static file host: answers If-None-Match /
+    If-Modified-Since with 304 and `Range: bytes=N-` with 206 (honoring If-Range).
+    """
+    validators = {v for v in (etag, last_modified) if v}
+    base_headers = {"Accept-Ranges": "bytes"}
+    if etag:
+        base_headers["ETag"] = etag
+    if last_modified:
+        base_headers["Last-Modified"] = last_modified
+
+    def route(handler: BaseHTTPRequestHandler) -> Response:
+        req = handler.headers
+        if (etag and req.get("If-None-Match") == etag) or (
+            last_modified and req.get("If-Modified-Since") == last_modified
+        ):
+            return 304, dict(base_headers), b""
+
+        range_header = req.get("Range", "")
+        if_range = req.get("If-Range")
+        if range_header.startswith("bytes=") and (if_range is None or if_range in validators):
+            start = int(range_header[len("bytes="):].split("-", 1)[0] or 0)
+            if start >= len(body):
+                return 416, {"Content-Range": f"bytes */{len(body)}"}, b""
+            headers = dict(base_headers)
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            return 206, headers, body[start:]
+
+        return 200, dict(base_headers), body
+
+    return route
+
+
+def read_body(handler: BaseHTTPRequestHandler) -> bytes:
+    """Request body of a POST, as sent (Content-Length framed)."""
+    length = int(handler.headers.get("Content-Length") or 0)
+    return handler.rfile.read(length) if length else b""
+
+
+class StandInServer:
+    """
+    Tiny threaded HTTP server on 127.0.0.1 that stands in for gutenberg.org /
+    loc.gov (or an OpenAI-compatible API), so the download and LLM code can be
+    benchmarked and exercised offline. GET and POST share the same routes.
+
+        with StandInServer({"/a": b"hello"}, latency_s=0.05) as srv:
+            requests.get(srv.url("/a"))
+    """
+
+    def __init__(self, routes: Dict[str, Route], latency_s: float = 0.0):
+        self.routes = routes
+        self.latency_s = latency_s
+        self.hits: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def __enter__(self) -> "StandInServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _resolve(self, handler: BaseHTTPRequestHandler) -> Response:
+        route = self.routes.get(handler.path)
+        if route is None:
+            return 404, {}, b"not found"
+        if callable(route):
+            return route(handler)
+        if isinstance(route, tuple):
+            return route
+        if isinstance(route, str):
+            route = route.encode("utf-8")
+        return 200, {}, route
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so pooling is measurable
+
+            def do_GET(self) -> None:
+                with server.lock:
+                    server.hits[self.path] = server.hits.get(self.path, 0) + 1
+                if server.latency_s:
+                    time.sleep(server.latency_s)
+                status, headers, body = server._resolve(self)
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_POST = do_GET
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,196 @@
+# src/part1_data/markup.py
+
+import argparse
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, Iterable, List
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+# --- Make sure src/ is on sys.path so we can import sibling modules ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+# Markup = at least one real closing tag, e.g. "</p>" or "</ammemxml>".
+# (A bare "<", ">" and "</" anywhere in the text is not enough.)
+CLOSING_TAG_RE = re.compile(r"</[A-Za-z_][\w:.-]*\s*>")
+
+
+def looks_like_xml(content: str) -> bool:
+    return bool(content) and CLOSING_TAG_RE.search(content) is not None
+
+
+def join_text_lines(pieces: Iterable[str]) -> str:
+    """
+    Shared line-break handling: every line of every text node, stripped,
+    blank lines dropped, joined with "\\n".
+    """
+    lines: List[str] = []
+    for piece in pieces:
+        for ln in piece.splitlines():
+            ln = ln.strip()
+            if ln:
+                lines.append(ln)
+    return "\n".join(lines)
+
+
+def soup_extract(content: str) -> str:
+    """Reference engine: full BeautifulSoup lxml-xml tree (tolerates broken markup)."""
+    soup = BeautifulSoup(content, "lxml-xml")
+    return join_text_lines([soup.get_text("\n")])
+
+
+class _TextTarget:
+    """
+    lxml parser target that keeps only text. Mirrors how BeautifulSoup's
+    lxml-xml builder splits strings: data between two tags is one string,
+    and comments / processing instructions / doctypes are not text.
+    """
+
+    def __init__(self) -> None:
+        self.pieces: List[str] = []
+        self.buf: List[str] = []
+
+    def _flush(self, *args: object) -> None:
+        if self.buf:
+            self.pieces.append("".join(self.buf))
+            self.buf = []
+
+    start = end = comment = pi = doctype = _flush
+
+    def data(self, content: str) -> None:
+        self.buf.append(content)
+
+    def close(self) -> List[str]:
+        self._flush()
+        return self.pieces
+
+
+# Same feed size as BeautifulSoup, so lxml's error recovery sees identical input.
+_FEED_CHUNK = 512
+
+
+def lxml_extract(content: str) -> str:
+    """
+    Fast path: drive lxml's recovering XML parser (the same one BeautifulSoup
+    uses for "lxml-xml") straight into a text-only target, streaming text
+    nodes out as they are parsed instead of building a soup tree. Recovery
+    handles the usual LoC breakage (stray "&", unclosed <body>); if lxml
+    rejects the input outright we fall back to soup_extract().
+    """
+    if content.startswith("\ufeff"):
+        content = content[1:]  # BeautifulSoup drops a leading BOM too
+    target = _TextTarget()
+    parser = etree.XMLParser(target=target, strip_cdata=False, recover=True)
+    try:
+        for i in range(0, max(len(content), 1), _FEED_CHUNK):
+            parser.feed(content[i:i + _FEED_CHUNK])
+        pieces = parser.close()
+    except (etree.ParserError, etree.XMLSyntaxError, UnicodeDecodeError, LookupError):
+        return soup_extract(content)
+    return join_text_lines(pieces)
+
+
+ENGINES: Dict[str, Callable[[str], str]] = {
+    "lxml": lxml_extract,
+    "soup": soup_extract,
+}
+
+DEFAULT_ENGINE = os.environ.get("MM_MARKUP_ENGINE", "lxml")
+
+
+def markup_to_text(content: str, engine: str = DEFAULT_ENGINE) -> str:
+    """
+    Convert XML / HTML-ish content into plain text while preserving line breaks.
+    If it doesn't look like markup, just strip leading/trailing whitespace.
+    """
+    if not looks_like_xml(content):
+        return content.strip()
+    return ENGINES[engine](content).strip()
+
+
+# ----------------------------------------------------------------------
+# Differential check + benchmark on data/raw/loc
+# ----------------------------------------------------------------------
+
+def load_sample_contents(
+    raw_dir: str = "data/raw/loc",
+    processed_path: str = "data/processed/loc_lincoln.jsonl",
+) -> List[str]:
+    """Content strings improve_loc_dataset sees, plus the raw LoC JSON / HTML."""
+    from part1_data.normalize_loc import extract_fields_from_loc_json, load_json
+    from part1_data.store import exists, iter_jsonl, list_files, open_text
+
+    contents: List[str] = [rec["content"] for rec in iter_jsonl(processed_path)] if exists(processed_path) else []
+    for path in list_files(raw_dir):
+        if path.endswith(".json") and not os.path.basename(path).startswith("_"):
+            contents.append(extract_fields_from_loc_json(path, load_json(path))["content"])
+        elif path.endswith(".html"):
+            with open_text(path) as f:
+                contents.append(f.read())
+    return contents
+
+
+def legacy_clean(content: str) -> str:
+    """
+    improve_loc_dataset.clean_content_xml_to_text as it was before the engines
+    existed (loose substring check + BeautifulSoup); the differential baseline.
+    """
+    if not content or not ("<" in content and ">" in content and "</" in content):
+        return content.strip()
+    soup = BeautifulSoup(content, "lxml-xml")
+    text = soup.get_text("\n")
+    lines = [ln.strip() for ln in text.splitlines()]
+    lines = [ln for ln in lines if ln]
+    return "\n".join(lines).strip()
+
+
+def check(contents: List[str]) -> int:
+    """Compare every engine with legacy_clean(); returns the mismatch count."""
+    mismatches = 0
+    for i, content in enumerate(contents):
+        expected = legacy_clean(content)
+        for name in ENGINES:
+            got = markup_to_text(content, name)
+            if got != expected:
+                mismatches += 1
+                print(f"[diff] sample {i}: engine {name!r} differs from soup")
+    print(f"[check] {len(contents)} samples, {mismatches} mismatches")
+    return mismatches
+
+
+def benchmark(contents: List[str], repeat: int = 50) -> None:
+    timings: Dict[str, float] = {}
+    for name in ENGINES:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for content in contents:
+                markup_to_text(content, name)
+        timings[name] = time.perf_counter() - start
+        per_doc_ms = timings[name] / (repeat * len(contents)) * 1000
+        print(f"[bench] {name:>5}: {timings[name]:.3f}s for {repeat}x{len(contents)} docs "
+              f"({per_doc_ms:.3f} ms/doc)")
+    print(f"[bench] lxml speedup over soup: {timings['soup'] / timings['lxml']:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check / benchmark markup-to-text engines")
+    parser.add_argument("--raw-dir", default="data/raw/loc")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    contents = load_sample_contents(args.raw_dir)
+    mismatches = check(contents)
+    benchmark(contents, args.repeat)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
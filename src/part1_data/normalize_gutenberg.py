@@ -1,11 +1,45 @@
 # src/part1_data/normalize_gutenberg.py
 
+import io
 import json
 import os
-from typing import Dict
+import re
+import sys
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# --- Make sure src/ is on sys.path so we can import sibling modules ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.parallel import RunStats, parallel_map, parse_workers
+from part1_data.store import BlobStore, JsonlWriter, list_files, open_binary
 
 RAW_DIR = "data/raw/gutenberg"
 OUT_PATH = "data/processed/gutenberg_lincoln.jsonl"
+SECTIONS_PATH = "data/processed/gutenberg_lincoln_sections.jsonl"
+
+# Newer Gutenberg files say "THE PROJECT", older ones "THIS PROJECT".
+START_MARKER_RE = re.compile(r"\*\*\* ?START OF (THIS|THE) PROJECT GUTENBERG EBOOK")
+END_MARKER_RE = re.compile(r"\*\*\* ?END OF (THIS|THE) PROJECT GUTENBERG EBOOK")
+
+# Section headings as they appear in our books: "CHAPTER IV.", "BOOK II", "PREFACE".
+# Case-sensitive on purpose, so prose lines like "Part of the army..." don't match.
+HEADING_RE = re.compile(
+    r"^(CHAPTER|BOOK|PART|VOLUME)\s+[IVXLCDM0-9]+\b"
+    r"|^(PREFACE|INTRODUCTION|APPENDIX|CONTENTS|INDEX)\.?\s*$"
+)
+
+# Every line boundary str.splitlines() recognizes, as UTF-8 bytes: the
+# streaming path must cut lines exactly where normalize_book does.
+LINE_BREAK_RE = re.compile(rb"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]")
+
+# Sections with no heading for this long are split at the next blank line,
+# so peak memory stays bounded even for books without chapter markup.
+MAX_SECTION_CHARS = 200_000
 
 # Map Gutenberg ID -> human title (you can refine these by scraping each book page too)
 GUTENBERG_META: Dict[str, Dict[str, str]] = {
@@ -28,12 +62,12 @@ def strip_gutenberg_boilerplate(text: str) -> str:
     end_idx = len(lines)
 
     for i, line in enumerate(lines):
-        if "*** START OF THIS PROJECT GUTENBERG EBOOK" in line.upper():
+        if START_MARKER_RE.search(line.upper()):
             start_idx = i + 1
             break
 
     for j in range(len(lines) - 1, -1, -1):
-        if "*** END OF THIS PROJECT GUTENBERG EBOOK" in lines[j].upper():
+        if END_MARKER_RE.search(lines[j].upper()):
             end_idx = j
             break
 
@@ -64,21 +98,249 @@ def normalize_book(book_id: str, raw_text: str) -> Dict:
     return record
 
 
-def main():
-    os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-    with open(OUT_PATH, "w", encoding="utf-8") as out_f:
-        for fname in os.listdir(RAW_DIR):
-            if not fname.endswith(".txt"):
+# ----------------------------------------------------------------------
+# Streaming path: bounded memory, chapter/section records with source offsets
+# ----------------------------------------------------------------------
+
+def iter_raw_lines(raw_path: str) -> Iterator[Tuple[int, int, str]]:
+    """
+    Yield (byte_offset, next_byte_offset, line) for each line of the raw file,
+    with the line ending removed. Offsets point into the raw (uncompressed) bytes.
+    Lines break wherever str.splitlines() breaks them (a lone \\r, \\f, \\v,
+    U+2028, ... as well as \\n and \\r\\n), so the lines match normalize_book's.
+    """
+    offset = 0
+    with open_binary(raw_path) as f:
+        for raw in f:  # chunks ending in b"\n"; a b"\r\n" never straddles two
+            pos = 0
+            for m in LINE_BREAK_RE.finditer(raw):
+                yield offset + pos, offset + m.end(), raw[pos:m.start()].decode("utf-8", errors="replace")
+                pos = m.end()
+            if pos < len(raw):
+                yield offset + pos, offset + len(raw), raw[pos:].decode("utf-8", errors="replace")
+            offset += len(raw)
+
+
+def find_body_bounds(raw_path: str) -> Tuple[int, Optional[int]]:
+    """
+    One pass over the file to locate the body: the line after the first START
+    marker up to the last END marker (same rules as strip_gutenberg_boilerplate).
+    Falls back to the whole file when that range has no text. Keeps no lines.
+    """
+    start = 0
+    end: Optional[int] = None
+    found_start = False
+    first_text_after_start: Optional[int] = None
+
+    for off, next_off, line in iter_raw_lines(raw_path):
+        upper = line.upper()
+        if not found_start and START_MARKER_RE.search(upper):
+            found_start = True
+            start = next_off
+            continue
+        if END_MARKER_RE.search(upper):
+            end = off
+        elif found_start and first_text_after_start is None and line.strip():
+            first_text_after_start = off
+
+    if end is not None and end < start:
+        end = None
+    if found_start and (first_text_after_start is None
+                        or (end is not None and first_text_after_start >= end)):
+        return 0, None
+    return start, end
+
+
+def iter_book_sections(
+    raw_path: str,
+    max_section_chars: int = MAX_SECTION_CHARS,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the body of a raw book and yield one dict per chapter/section:
+      {section_index, section_title, source_start, source_end, content}
+    source_start/source_end are byte offsets into the raw file.
+    Only the current section is ever held in memory.
+    """
+    start, end = find_body_bounds(raw_path)
+
+    index = 0
+    title = ""
+    lines: List[str] = []
+    n_chars = 0
+    sec_start = start
+    sec_end = start
+
+    def flush() -> Optional[Dict[str, Any]]:
+        content = "\n".join(lines).strip()
+        if not content:
+            return None
+        return {
+            "section_index": index,
+            "section_title": title,
+            "source_start": sec_start,
+            "source_end": sec_end,
+            "content": content,
+        }
+
+    for off, next_off, line in iter_raw_lines(raw_path):
+        if off < start:
+            continue
+        if end is not None and off >= end:
+            break
+
+        is_heading = bool(HEADING_RE.match(line))
+        too_long = n_chars >= max_section_chars and not line.strip()
+        if is_heading or too_long:
+            section = flush()
+            if section:
+                yield section
+                index += 1
+            if is_heading:
+                title = line.strip()
+            lines = []
+            n_chars = 0
+            sec_start = off
+
+        lines.append(line)
+        n_chars += len(line) + 1
+        sec_end = next_off
+
+    section = flush()
+    if section:
+        yield section
+
+
+def book_record_fields(book_id: str) -> Dict[str, str]:
+    meta = GUTENBERG_META.get(book_id, {})
+    return {
+        "id": f"gutenberg_{book_id}",
+        "title": meta.get("title", f"Gutenberg Book {book_id}"),
+        "reference": f"https://www.gutenberg.org/ebooks/{book_id}",
+        "document_type": meta.get("document_type", "Book"),
+        "date": "",
+        "place": "",
+        "from": "",
+        "to": "",
+    }
+
+
+def stream_book_record(book_id: str, raw_path: str, out_f: JsonlWriter) -> None:
+    """
+    Write the same whole-book record as normalize_book(), but serialize the
+    "content" string piece by piece instead of building it in memory first.
+    JSON string escaping is per character, so the concatenated output is
+    byte-identical to json.dumps() of the full record.
+    """
+    start, end = find_body_bounds(raw_path)
+
+    header = json.dumps({**book_record_fields(book_id), "content": ""}, ensure_ascii=False)
+    out_f.write_raw(header[:-2])  # drop the closing '"}' of the empty content
+
+    def emit(piece: str) -> None:
+        out_f.write_raw(json.dumps(piece, ensure_ascii=False)[1:-1])
+
+    # Reproduce "\n".join(body_lines).strip(): leading blank lines are skipped,
+    # blank lines are only written once more text follows them, and the last
+    # text line is right-stripped.
+    held: Optional[str] = None
+    blanks: List[str] = []
+    for off, _, line in iter_raw_lines(raw_path):
+        if off < start:
+            continue
+        if end is not None and off >= end:
+            break
+        if not line.strip():
+            if held is not None:
+                blanks.append(line)
+            continue
+        if held is None:
+            held = line.lstrip()
+        else:
+            emit(held)
+            emit("\n" + "".join(b + "\n" for b in blanks))
+            held = line
+        blanks = []
+    if held is not None:
+        emit(held.rstrip())
+
+    out_f.write_raw('"}\n')
+    out_f.count += 1
+
+
+def normalize_book_streaming(
+    book_id: str,
+    raw_path: str,
+    out_f: JsonlWriter,
+    sections_f: JsonlWriter,
+) -> int:
+    """Write the whole-book record and its section records; returns the section count."""
+    stream_book_record(book_id, raw_path, out_f)
+
+    fields = book_record_fields(book_id)
+    n_sections = 0
+    for sec in iter_book_sections(raw_path):
+        record = dict(fields)
+        record["id"] = f"{fields['id']}_s{sec['section_index']:04d}"
+        record["parent_id"] = fields["id"]
+        record["section_index"] = sec["section_index"]
+        record["section_title"] = sec["section_title"]
+        record["source_path"] = raw_path
+        record["source_start"] = sec["source_start"]
+        record["source_end"] = sec["source_end"]
+        record["content"] = sec["content"]
+        sections_f.write(record)
+        n_sections += 1
+    return n_sections
+
+
+def normalize_book_to_parts(args: Tuple[str, str, str]) -> Tuple[str, str, int]:
+    """
+    Worker for the parallel mode: normalize one book into two blobs in a
+    scratch store (book record, section records) and return their digests,
+    so the parent can splice them into the real outputs in a fixed order.
+    """
+    book_id, raw_path, scratch_dir = args
+    scratch = BlobStore(scratch_dir)
+    out_f = JsonlWriter(os.path.join(scratch_dir, f"{book_id}.jsonl"), store=scratch)
+    sections_f = JsonlWriter(os.path.join(scratch_dir, f"{book_id}_sections.jsonl"), store=scratch)
+    n_sections = normalize_book_streaming(book_id, raw_path, out_f, sections_f)
+    return out_f.close(), sections_f.close(), n_sections
+
+
+def _splice(scratch: BlobStore, digest: str, out_f: JsonlWriter) -> None:
+    with io.TextIOWrapper(scratch.open_blob(digest), encoding="utf-8") as src:
+        while True:
+            text = src.read(1 << 20)
+            if not text:
+                break
+            out_f.write_raw(text)
+
+
+def main(workers: int = 1):
+    stats = RunStats()
+    with tempfile.TemporaryDirectory() as scratch_dir, \
+         JsonlWriter(OUT_PATH) as out_f, JsonlWriter(SECTIONS_PATH) as sections_f:
+        scratch = BlobStore(scratch_dir)
+        # list_files() is sorted, so books land in the same order for any worker count
+        items = []
+        for raw_path in list_files(RAW_DIR, ".txt"):
+            book_id = os.path.basename(raw_path).replace(".txt", "")
+            items.append((book_id, (book_id, raw_path, scratch_dir)))
+
+        for res in parallel_map(normalize_book_to_parts, items, workers=workers):
+            stats.add(res)
+            if not res.ok:
+                print(f"[error] Failed to normalize {res.item_id}: {res.error.splitlines()[0]}")
                 continue
-            book_id = fname.replace(".txt", "")
-            raw_path = os.path.join(RAW_DIR, fname)
-            with open(raw_path, "r", encoding="utf-8") as f:
-                raw_text = f.read()
+            book_digest, sections_digest, n_sections = res.value
+            _splice(scratch, book_digest, out_f)
+            _splice(scratch, sections_digest, sections_f)
+            out_f.count += 1
+            sections_f.count += n_sections
+            print(f"[ok] Normalized Gutenberg book {res.item_id} ({n_sections} sections)")
 
-            record = normalize_book(book_id, raw_text)
-            out_f.write(json.dumps(record, ensure_ascii=False) + "\n")
-            print(f"[ok] Normalized Gutenberg book {book_id}")
+    stats.report("normalize_gutenberg")
 
 
 if __name__ == "__main__":
-    main()
+    main(parse_workers("Normalize raw Gutenberg books into data/processed"))
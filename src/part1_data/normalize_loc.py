@@ -2,9 +2,22 @@
 
 import json
 import os
-from typing import Dict, Any
+import sys
+from typing import Dict, Any, List, Optional, Tuple
 from bs4 import BeautifulSoup
 
+# --- Make sure src/ is on sys.path so we can import sibling modules ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.crawl_loc import load_manifest
+from part1_data.loc_fields import DEFAULT_EXTRACTOR
+from part1_data.parallel import RunStats, parallel_map, parse_workers
+from part1_data.store import JsonlWriter, exists, open_text
+
 RAW_DIR = "data/raw/loc"
 OUT_PATH = "data/processed/loc_lincoln.jsonl"
 
@@ -35,12 +48,12 @@ LOC_META: Dict[str, Dict[str, str]] = {
 
 
 def load_json(path: str) -> Any:
-    with open(path, "r", encoding="utf-8") as f:
+    with open_text(path) as f:
         return json.load(f)
 
 
 def extract_text_from_gettysburg_html(html_path: str) -> str:
-    with open(html_path, "r", encoding="utf-8") as f:
+    with open_text(html_path) as f:
         html = f.read()
     soup = BeautifulSoup(html, "html.parser")
 
@@ -50,6 +63,33 @@ def extract_text_from_gettysburg_html(html_path: str) -> str:
     return text.strip()
 
 
+def transcription_paths(loc_id: str) -> List[str]:
+    """
+    Per-page transcription files crawl_loc.fetch_item saved for an item, in
+    page order: {loc_id}.xml for a single page, {loc_id}_1.xml, _2, ... otherwise.
+    """
+    single = os.path.join(RAW_DIR, f"{loc_id}.xml")
+    if exists(single):
+        return [single]
+    paths: List[str] = []
+    while exists(os.path.join(RAW_DIR, f"{loc_id}_{len(paths) + 1}.xml")):
+        paths.append(os.path.join(RAW_DIR, f"{loc_id}_{len(paths) + 1}.xml"))
+    return paths
+
+
+def extract_text_from_transcriptions(paths: List[str]) -> str:
+    """Page texts of the transcription XMLs, one blank line between pages."""
+    pages = []
+    for path in paths:
+        with open_text(path) as f:
+            soup = BeautifulSoup(f.read(), "html.parser")
+        lines = (line.strip() for line in soup.get_text("\n").splitlines())
+        text = "\n".join(line for line in lines if line)
+        if text:
+            pages.append(text)
+    return "\n\n".join(pages)
+
+
 def extract_fields_from_loc_json(loc_id: str, data: dict) -> Dict[str, str]:
     """
     LoC JSON structure can vary. We grab the most likely fields:
@@ -57,50 +97,19 @@ def extract_fields_from_loc_json(loc_id: str, data: dict) -> Dict[str, str]:
       - date
       - location (place)
       - transcription/full text if provided
+
+    The walk itself lives in part1_data.loc_fields (compiled key rules,
+    no recursion); normalize_loc_item reads straight from the file with
+    DEFAULT_EXTRACTOR.extract_file so big payloads can be streamed.
     """
-    title = ""
-    date = ""
-    place = ""
-    content = ""
-
-    # 1) Title: often in 'title' or 'item' fields
-    if "item" in data and isinstance(data["item"], list) and data["item"]:
-        title = data["item"][0].get("title", [""])[0] if isinstance(data["item"][0].get("title"), list) else data["item"][0].get("title", "")
-        date = data["item"][0].get("date", "")
-        place = data["item"][0].get("location", [""])[0] if isinstance(data["item"][0].get("location"), list) else data["item"][0].get("location", "")
-    else:
-        title = data.get("title") or ""
-        date = data.get("date") or ""
-
-    # 2) Transcription or text may appear under different keys; we do a best-effort search.
-    # Depending on the real structure, you may refine this.
-    candidates = []
-
-    def collect_texts(obj):
-        if isinstance(obj, dict):
-            for k, v in obj.items():
-                kl = k.lower()
-                if any(term in kl for term in ["transcription", "text", "fulltext"]):
-                    if isinstance(v, str):
-                        candidates.append(v)
-                collect_texts(v)
-        elif isinstance(obj, list):
-            for x in obj:
-                collect_texts(x)
-
-    collect_texts(data)
-    if candidates:
-        content = "\n\n".join(candidates)
-
-    return {
-        "title": title or f"LoC Item {loc_id}",
-        "date": date or "",
-        "place": place or "",
-        "content": content.strip(),
-    }
+    return DEFAULT_EXTRACTOR.extract(loc_id, data)
 
 
-def normalize_loc_item(loc_id: str) -> Dict:
+def normalize_loc_item(loc_id: str, reference: Optional[str] = None) -> Dict:
+    """
+    One processed record. reference is the item's URL from the manifest
+    (looked up when not given; callers normalizing many items pass it in).
+    """
     meta = LOC_META.get(loc_id, {})
     doc_type = meta.get("document_type", "Unknown")
     from_field = meta.get("from", "")
@@ -116,17 +125,21 @@ def normalize_loc_item(loc_id: str) -> Dict:
         date = "1863-11-19"  # You may override or derive this from metadata if present elsewhere
         place = "Gettysburg, Pennsylvania"
     else:
-        data = load_json(json_path)
-        fields = extract_fields_from_loc_json(loc_id, data)
+        fields = DEFAULT_EXTRACTOR.extract_file(loc_id, json_path)
         title = fields["title"]
         date = fields["date"]
         place = fields["place"]
         content = fields["content"]
+        pages = transcription_paths(loc_id)
+        if pages:
+            # Crawled items: the page transcriptions are the text (the JSON
+            # only links to them)
+            content = extract_text_from_transcriptions(pages) or content
 
     record = {
         "id": f"loc_{loc_id}",
         "title": title,
-        "reference": LOC_ITEMS_REFERENCE(loc_id),
+        "reference": reference if reference is not None else LOC_ITEMS_REFERENCE(loc_id),
         "document_type": doc_type,
         "date": date,   # "As in the source" – we don't change format here
         "place": place,
@@ -137,34 +150,55 @@ def normalize_loc_item(loc_id: str) -> Dict:
     return record
 
 
-def LOC_ITEMS_REFERENCE(loc_id: str) -> str:
-    # Mirror the original URLs used in download_loc.py
-    mapping = {
-        "mal0440500": "https://www.loc.gov/item/mal0440500/",
-        "mal0882800": "https://www.loc.gov/resource/mal.0882800",
-        "gettysburg_nicolay": "https://www.loc.gov/exhibits/gettysburg-address/ext/trans-nicolay-copy.html",
-        "mal4361300": "https://www.loc.gov/resource/mal.4361300",
-        "mal4361800": "https://www.loc.gov/resource/mal.4361800/",
-    }
-    return mapping[loc_id]
+def LOC_ITEMS_REFERENCE(loc_id: str, manifest: Optional[Dict[str, str]] = None) -> str:
+    # Hand-picked LOC_ITEMS from download_loc.py plus anything crawl_loc.py fetched
+    if manifest is None:
+        manifest = load_manifest(RAW_DIR)
+    return manifest[loc_id]
 
 
-def main():
-    os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-    with open(OUT_PATH, "w", encoding="utf-8") as out_f:
-        for loc_id in LOC_META.keys():
-            try:
-                record = normalize_loc_item(loc_id)
+def _normalize_task(item: Tuple[str, str]) -> Dict:
+    # parallel_map passes one argument: (loc_id, reference)
+    return normalize_loc_item(*item)
 
-                if not record["content"]:
-                    # Log partial failure for your report
-                    print(f"[warn] No content extracted for {loc_id}; will mention as partial in report.")
 
-                out_f.write(json.dumps(record, ensure_ascii=False) + "\n")
-                print(f"[ok] Normalized LoC item {loc_id}")
-            except Exception as e:
-                print(f"[error] Failed to normalize {loc_id}: {e}")
+def list_loc_ids(manifest: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    Curated ids first (in LOC_META order), then every crawled item that has
+    raw JSON on disk, sorted by id so the output order never depends on the
+    order the crawler happened to finish items in.
+    """
+    if manifest is None:
+        manifest = load_manifest(RAW_DIR)
+    crawled = sorted(
+        loc_id for loc_id in manifest
+        if loc_id not in LOC_META and exists(os.path.join(RAW_DIR, f"{loc_id}.json"))
+    )
+    return list(LOC_META.keys()) + crawled
+
+
+def main(workers: int = 1):
+    stats = RunStats()
+    manifest = load_manifest(RAW_DIR)  # read once, not once per item
+    with JsonlWriter(OUT_PATH) as out_f:
+        items = ((loc_id, (loc_id, LOC_ITEMS_REFERENCE(loc_id, manifest))) for loc_id in list_loc_ids(manifest))
+        for res in parallel_map(_normalize_task, items, workers=workers):
+            stats.add(res)
+            loc_id = res.item_id
+            if not res.ok:
+                print(f"[error] Failed to normalize {loc_id}: {res.error.splitlines()[0]}")
+                continue
+
+            record = res.value
+            if not record["content"]:
+                # Log partial failure for your report
+                print(f"[warn] No content extracted for {loc_id}; will mention as partial in report.")
+
+            out_f.write(record)
+            print(f"[ok] Normalized LoC item {loc_id}")
+
+    stats.report("normalize_loc")
 
 
 if __name__ == "__main__":
-    main()
+    main(parse_workers("Normalize raw LoC items into data/processed/loc_lincoln.jsonl"))
@@ -0,0 +1,99 @@
+# src/part1_data/parallel.py
+
+import argparse
+import os
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class ItemResult:
+    item_id: str
+    value: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _timed_call(fn: Callable[[Any], Any], item_id: str, arg: Any) -> ItemResult:
+    # Runs inside the worker; exceptions are captured so one bad item
+    # never takes down the batch.
+    start = time.perf_counter()
+    try:
+        value = fn(arg)
+        return ItemResult(item_id, value=value, seconds=time.perf_counter() - start)
+    except Exception as e:
+        err = f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=3)}"
+        return ItemResult(item_id, error=err, seconds=time.perf_counter() - start)
+
+
+def parallel_map(
+    fn: Callable[[Any], Any],
+    items: Iterable[Tuple[str, Any]],
+    workers: int = 1,
+    window: int = 0,
+) -> Iterator[ItemResult]:
+    """
+    Apply fn to each (item_id, arg) and yield ItemResults *in input order*, so
+    output files are byte-for-byte identical whatever the worker count.
+
+      workers == 1  -> run in this process (the old serial behaviour)
+      workers <= 0  -> one process per CPU
+      window        -> max items in flight (default 4 x workers), which keeps
+                       memory bounded when `items` is a lazy stream
+
+    fn must be a module-level function so it can be pickled.
+    """
+    if workers == 1:
+        for item_id, arg in items:
+            yield _timed_call(fn, item_id, arg)
+        return
+
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    window = window or workers * 4
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for item_id, arg in items:
+            pending.append(pool.submit(_timed_call, fn, item_id, arg))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+@dataclass
+class RunStats:
+    started: float = field(default_factory=time.perf_counter)
+    results: List[Tuple[str, float]] = field(default_factory=list)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+    def add(self, res: ItemResult) -> None:
+        self.results.append((res.item_id, res.seconds))
+        if res.error:
+            self.errors.append((res.item_id, res.error))
+
+    def report(self, label: str, slowest: int = 3) -> None:
+        wall = time.perf_counter() - self.started
+        busy = sum(s for _, s in self.results)
+        print(f"[stats] {label}: {len(self.results)} items, {len(self.errors)} errors, "
+              f"wall {wall:.2f}s, item time {busy:.2f}s (x{busy / wall if wall else 0:.1f} parallel)")
+        for item_id, secs in sorted(self.results, key=lambda x: -x[1])[:slowest]:
+            print(f"  slowest: {item_id} {secs:.3f}s")
+        for item_id, err in self.errors:
+            print(f"  [error] {item_id}: {err.splitlines()[0]}")
+
+
+def parse_workers(description: str) -> int:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes to use (1 = serial, 0 = one per CPU)",
+    )
+    return parser.parse_args().workers
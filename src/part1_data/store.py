@@ -0,0 +1,438 @@
+# src/part1_data/store.py
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, TypeVar
+
+# Optional faster JSON decoder (pip install orjson); same results as json.loads.
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+# Content-addressed blob store shared by every stage.
+#
+#   data/store/objects/ab/<sha256>.gz    compressed blob, keyed by the sha256 of
+#                                        its *uncompressed* content (stored once)
+#   data/store/refs/<logical path>       text file holding the sha256, e.g.
+#                                        refs/data/processed/loc_lincoln.jsonl
+#
+# Stages keep using the same logical paths as before ("data/processed/...");
+# open_text()/iter_jsonl() resolve a path through the store first and fall back
+# to a plain (or .gz/.xz) file on disk, so old checkouts keep working. A plain
+# file written after the ref (e.g. by a git checkout or an older script) wins
+# over it, so a stale ref never hides newer data.
+
+STORE_DIR = os.environ.get("MM_STORE_DIR", "data/store")
+PREFETCH_DEPTH = 2  # records produced ahead of the consumer by prefetch()
+
+loads: Callable[[Any], Any] = orjson.loads if orjson is not None else json.loads
+
+CODECS = {
+    "gzip": (".gz", lambda f: gzip.GzipFile(fileobj=f, mode="wb", mtime=0), gzip.open),
+    "xz": (".xz", lambda f: lzma.LZMAFile(f, mode="wb", preset=6), lzma.open),
+    # Same format as "gzip", ~7x faster to write; for caches that are cheap to rebuild.
+    "gzip-fast": (".gz", lambda f: gzip.GzipFile(fileobj=f, mode="wb", mtime=0, compresslevel=1), gzip.open),
+}
+
+
+def logical_name(path: str) -> str:
+    """Normalize a path to the key used under refs/ (relative, forward slashes)."""
+    return os.path.normpath(path).replace(os.sep, "/").lstrip("/")
+
+
+class BlobWriter:
+    """
+    Write-once sink: hashes the raw bytes while compressing them into a temp
+    file, then moves the result to objects/ under its digest on close().
+    If a blob with that digest already exists, the temp file is dropped.
+    """
+
+    def __init__(self, store: "BlobStore", name: Optional[str] = None):
+        self.store = store
+        self.name = name
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.digest: Optional[str] = None
+        os.makedirs(store.tmp_dir, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=store.tmp_dir)
+        self._raw = os.fdopen(fd, "wb")
+        self._out = CODECS[store.codec][1](self._raw)
+
+    def write(self, data: bytes) -> int:
+        self.hasher.update(data)
+        self.size += len(data)
+        return self._out.write(data)
+
+    def close(self) -> str:
+        if self.digest is not None:
+            return self.digest
+        self._out.close()
+        self._raw.close()
+        self.digest = self.hasher.hexdigest()
+        dest = self.store.object_path(self.digest)
+        if self.store.has(self.digest):
+            os.remove(self.tmp_path)
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(self.tmp_path, dest)
+        if self.name:
+            self.store.link(self.name, self.digest)
+        return self.digest
+
+    def abort(self) -> None:
+        self._out.close()
+        self._raw.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self) -> "BlobWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class BlobStore:
+    def __init__(self, root: str = STORE_DIR, codec: str = "gzip"):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}; expected one of {sorted(CODECS)}")
+        self.root = root
+        self.codec = codec
+        self.objects_dir = os.path.join(root, "objects")
+        self.refs_dir = os.path.join(root, "refs")
+        self.tmp_dir = os.path.join(root, "tmp")
+
+    # -- blobs ---------------------------------------------------------
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest + CODECS[self.codec][0])
+
+    def _find_object(self, digest: str) -> Optional[str]:
+        # A blob may have been written under a different codec earlier.
+        for ext, _, _ in CODECS.values():
+            p = os.path.join(self.objects_dir, digest[:2], digest + ext)
+            if os.path.exists(p):
+                return p
+        return None
+
+    def has(self, digest: str) -> bool:
+        return self._find_object(digest) is not None
+
+    def writer(self, name: Optional[str] = None) -> BlobWriter:
+        return BlobWriter(self, name)
+
+    def put_file(self, path: str, name: Optional[str] = None, chunk_size: int = 1 << 20) -> str:
+        with open(path, "rb") as f, self.writer(name) as w:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                w.write(chunk)
+        return w.digest  # type: ignore[return-value]
+
+    def open_blob(self, digest: str) -> IO[bytes]:
+        path = self._find_object(digest)
+        if path is None:
+            raise FileNotFoundError(f"Blob {digest} not in store {self.root}")
+        opener = next(o for ext, _, o in CODECS.values() if path.endswith(ext))
+        return opener(path, "rb")
+
+    # -- refs ----------------------------------------------------------
+
+    def _ref_path(self, name: str) -> str:
+        return os.path.join(self.refs_dir, logical_name(name))
+
+    def link(self, name: str, digest: str) -> None:
+        ref_path = self._ref_path(name)
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        tmp_path = ref_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(digest + "\n")
+        os.replace(tmp_path, ref_path)
+
+    def resolve(self, name: str) -> Optional[str]:
+        try:
+            with open(self._ref_path(name), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def ref_mtime(self, name: str) -> Optional[int]:
+        try:
+            return os.stat(self._ref_path(name)).st_mtime_ns
+        except OSError:
+            return None
+
+    def list_refs(self, prefix: str) -> List[str]:
+        base = self._ref_path(prefix)
+        if not os.path.isdir(base):
+            return []
+        return sorted(logical_name(os.path.join(prefix, n)) for n in os.listdir(base)
+                      if not n.endswith(".tmp"))
+
+    def usage(self) -> Dict[str, int]:
+        n_objects = 0
+        n_bytes = 0
+        for dirpath, _, files in os.walk(self.objects_dir):
+            for fn in files:
+                n_objects += 1
+                n_bytes += os.path.getsize(os.path.join(dirpath, fn))
+        return {"objects": n_objects, "compressed_bytes": n_bytes}
+
+
+_default_store: Optional[BlobStore] = None
+
+
+def default_store() -> BlobStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = BlobStore(STORE_DIR, os.environ.get("MM_STORE_CODEC", "gzip"))
+    return _default_store
+
+
+# ----------------------------------------------------------------------
+# Transparent readers / writers used by every stage
+# ----------------------------------------------------------------------
+
+def resolve_ref(path: str) -> Optional[str]:
+    """
+    Digest the store ref for `path` points to, or None when there is no ref
+    or a file on disk at that path (or its .gz/.xz sibling) is newer.
+    """
+    store = default_store()
+    digest = store.resolve(path)
+    if not digest:
+        return None
+    ref_mtime = store.ref_mtime(path) or 0
+    for candidate in (path, path + ".gz", path + ".xz"):
+        try:
+            if os.stat(candidate).st_mtime_ns > ref_mtime:
+                return None
+        except OSError:
+            pass
+    return digest
+
+
+def exists(path: str) -> bool:
+    if resolve_ref(path):
+        return True
+    return any(os.path.exists(path + ext) for ext in ("", ".gz", ".xz"))
+
+
+def open_binary(path: str) -> IO[bytes]:
+    """Open `path` for streaming reads: store ref, plain file, or .gz/.xz sibling."""
+    digest = resolve_ref(path)
+    if digest:
+        return default_store().open_blob(digest)
+    if os.path.exists(path):
+        if path.endswith(".gz"):
+            return gzip.open(path, "rb")
+        if path.endswith(".xz"):
+            return lzma.open(path, "rb")
+        return open(path, "rb")
+    if os.path.exists(path + ".gz"):
+        return gzip.open(path + ".gz", "rb")
+    if os.path.exists(path + ".xz"):
+        return lzma.open(path + ".xz", "rb")
+    raise FileNotFoundError(path)
+
+
+def open_text(path: str) -> IO[str]:
+    return io.TextIOWrapper(open_binary(path), encoding="utf-8")
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one record per non-blank line, without loading the whole file.
+    Lines are decoded straight from bytes (orjson when installed).
+    """
+    with open_binary(path) as f:
+        for line in f:
+            if line.isspace():
+                continue
+            yield loads(line)
+
+
+_T = TypeVar("_T")
+
+
+def prefetch(items: Iterable[_T], depth: int = PREFETCH_DEPTH) -> Iterator[_T]:
+    """
+    Iterate `items` on a background thread, at most `depth` items ahead of
+    the consumer: reading and decoding the next record overlaps with whatever
+    the caller does with the current one (LLM calls, writes), and memory stays
+    bounded by `depth` records. Exceptions are re-raised in the consumer.
+    """
+    q: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()  # set when the consumer goes away
+
+    def put(entry: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        it = iter(items)
+        try:
+            for item in it:
+                if not put((None, item)):
+                    return
+        except BaseException as exc:  # hand it to the consumer
+            put((exc, None))
+            return
+        finally:
+            # Runs here, on the thread iterating it: releases the source's
+            # file handles even when the consumer stopped early
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+        put((None, done))
+
+    threading.Thread(target=produce, name="prefetch", daemon=True).start()
+    try:
+        while True:
+            exc, item = q.get()
+            if exc is not None:
+                raise exc
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+        while True:  # unblock a producer waiting on a full queue
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+
+
+def list_files(directory: str, suffix: str = "") -> List[str]:
+    """Logical paths under `directory`, whether stored as refs or plain files."""
+    names = set(n for n in default_store().list_refs(directory) if n.endswith(suffix))
+    if os.path.isdir(directory):
+        for fn in os.listdir(directory):
+            if fn.endswith(suffix):
+                names.add(logical_name(os.path.join(directory, fn)))
+    return sorted(names)
+
+
+class JsonlWriter:
+    """
+    Streaming JSONL writer into the store under a logical path:
+
+        with JsonlWriter("data/events/event_extractions.jsonl") as out:
+            out.write(record)
+
+    A plain file already at that path (e.g. one tracked in git) is kept and
+    rewritten with the new version, so it matches the store ref; readers
+    pick whichever of the two was written last (resolve_ref). `store import
+    --remove` migrates it.
+    """
+
+    def __init__(self, path: str, store: Optional[BlobStore] = None):
+        self.path = path
+        self.count = 0
+        self._blob = (store or default_store()).writer(name=path)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._blob.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.count += 1
+
+    def write_raw(self, text: str) -> None:
+        """Append pre-serialized JSON text; the caller must end each record with a newline."""
+        self._blob.write(text.encode("utf-8"))
+
+    def close(self) -> str:
+        digest = self._blob.close()
+        if os.path.isfile(self.path):
+            export_path(self.path, self.path, quiet=True)
+        return digest
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._blob.abort()
+
+
+def write_jsonl(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    with JsonlWriter(path) as out:
+        for rec in records:
+            out.write(rec)
+    return out.count
+
+
+def import_paths(paths: List[str], remove: bool = False) -> None:
+    """Move existing plain files (or whole directories) into the store."""
+    store = default_store()
+    total_in = 0
+    for root in paths:
+        files = [root] if os.path.isfile(root) else [
+            os.path.join(d, fn) for d, _, fns in os.walk(root) for fn in fns
+        ]
+        for path in sorted(files):
+            if path.endswith((".part", ".meta.json", ".tmp")):
+                continue
+            digest = store.put_file(path, name=path)
+            total_in += os.path.getsize(path)
+            print(f"[ok] {path} -> {digest[:12]}")
+            if remove:
+                os.remove(path)
+    usage = store.usage()
+    print(f"[stats] {total_in / 1e6:.2f} MB imported; store now {usage['objects']} objects, "
+          f"{usage['compressed_bytes'] / 1e6:.2f} MB compressed")
+
+
+def export_path(name: str, out_path: Optional[str] = None, quiet: bool = False) -> None:
+    """Materialize a stored file as plain bytes (for inspection or mmap)."""
+    out_path = out_path or name
+    with open_binary(name) as src, open(out_path + ".tmp", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(out_path + ".tmp", out_path)
+    if not quiet:
+        print(f"[ok] Exported {name} -> {out_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed data store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_import = sub.add_parser("import", help="ingest plain files/directories")
+    p_import.add_argument("paths", nargs="+")
+    p_import.add_argument("--remove", action="store_true", help="delete originals after import")
+    p_export = sub.add_parser("export", help="write a stored file back out as plain text")
+    p_export.add_argument("name")
+    p_export.add_argument("--out")
+    sub.add_parser("stats", help="object count and compressed size")
+    args = parser.parse_args()
+
+    if args.cmd == "import":
+        import_paths(args.paths, remove=args.remove)
+    elif args.cmd == "export":
+        export_path(args.name, args.out)
+    else:
+        print(default_store().usage())
+
+
+if __name__ == "__main__":
+    main()
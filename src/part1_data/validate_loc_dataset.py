@@ -1,6 +1,16 @@
 # src/part1_data/validate_loc_improved.py
 
-import json
+import os
+import sys
+
+# --- Make sure src/ is on sys.path so we can import sibling modules ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.store import iter_jsonl
 
 PATH = "data/processed/loc_lincoln_improved.jsonl"
 
@@ -20,24 +30,19 @@ def main():
     total = 0
     non_empty = {k: 0 for k in REQUIRED_KEYS}
 
-    with open(PATH, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            rec = json.loads(line)
-            total += 1
-
-            # Check required keys
-            missing = [k for k in REQUIRED_KEYS if k not in rec]
-            if missing:
-                print(f"[ERROR] Record {rec.get('id')} missing keys: {missing}")
-
-            # Count non-empty values
-            for k in REQUIRED_KEYS:
-                v = rec.get(k, "")
-                if isinstance(v, str) and v.strip():
-                    non_empty[k] += 1
+    for rec in iter_jsonl(PATH):
+        total += 1
+
+        # Check required keys
+        missing = [k for k in REQUIRED_KEYS if k not in rec]
+        if missing:
+            print(f"[ERROR] Record {rec.get('id')} missing keys: {missing}")
+
+        # Count non-empty values
+        for k in REQUIRED_KEYS:
+            v = rec.get(k, "")
+            if isinstance(v, str) and v.strip():
+                non_empty[k] += 1
 
     print(f"\n[OK] Loaded {total} records from {PATH}")
     print("\n[non-empty field counts]")
@@ -0,0 +1,304 @@
+# src/part2_events/bm25_index.py
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# --- Make sure src/ is on sys.path so we can import sibling packages ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part2_events.config import EventConfig, get_all_events
+from part2_events.retrieval import DEFAULT_CHUNKER, chunk_document
+
+# Persistent BM25 index over retrieval chunks, on SQLite FTS5 (stdlib).
+#
+#   docs        doc_id -> content hash + chunking params (skip unchanged docs)
+#   chunks      the chunk texts (FTS5 external content table)
+#   chunks_fts  FTS5 index; every add_document() transaction becomes one new
+#               FTS5 segment, so adding a book never rewrites existing ones
+#
+# Segments are merged incrementally ('automerge' during writes, plus explicit
+# merge steps that can run on a background thread) so the number of segments a
+# query has to consult - and with it query latency - stays flat.
+
+INDEX_PATH = "data/index/chunks.sqlite"
+AUTOMERGE = 4       # merge once this many same-level segments exist
+MERGE_PAGES = 500   # leaf pages per background merge step
+
+_TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = {
+    "a", "an", "and", "as", "at", "by", "for", "from", "in", "into", "is", "it",
+    "of", "on", "or", "s", "the", "to", "was", "with", "his", "her", "their",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    max_words INTEGER NOT NULL,
+    overlap_words INTEGER NOT NULL,
+    n_chunks INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    rowid INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL,
+    chunk_no INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_doc ON chunks(doc_id, chunk_no);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    text, content='chunks', content_rowid='rowid', tokenize='unicode61'
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")   # readers never block the merger
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def event_query(event_cfg: EventConfig) -> str:
+    """
+    FTS5 query for an event: every keyword as a quoted phrase, OR-ed with the
+    content words of its description.
+    """
+    terms: List[str] = []
+    for kw in event_cfg.keywords:
+        tokens = _TOKEN_RE.findall(kw.lower())
+        if tokens:
+            terms.append('"' + " ".join(tokens) + '"')
+    for tok in _TOKEN_RE.findall(event_cfg.description.lower()):
+        if tok not in STOPWORDS and len(tok) > 2 and f'"{tok}"' not in terms:
+            terms.append(f'"{tok}"')
+    return " OR ".join(terms)
+
+
+class BM25Index:
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = _connect(path)
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(
+            "INSERT INTO chunks_fts(chunks_fts, rank) VALUES('automerge', ?)", (AUTOMERGE,)
+        )
+        self.conn.commit()
+        self._merge_thread: Optional[threading.Thread] = None
+
+    # -- writes --------------------------------------------------------
+
+    def add_document(
+        self,
+        doc_id: str,
+        content: str,
+        max_words: int = 1000,
+        overlap_words: int = 150,
+    ) -> bool:
+        """
+        Index one document's chunks as a single new segment. Returns False
+        (and writes nothing) when the same content is already indexed.
+        """
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if DEFAULT_CHUNKER != "words":
+            content_hash += f":{DEFAULT_CHUNKER}"  # re-chunk when the chunker changes
+        row = self.conn.execute(
+            "SELECT content_hash, max_words, overlap_words FROM docs WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        if row == (content_hash, max_words, overlap_words):
+            return False
+
+        chunks = chunk_document(content, max_words=max_words, overlap_words=overlap_words).chunks
+        with self.conn:
+            if row is not None:
+                self._delete_chunks(doc_id)
+            for chunk_no, text in enumerate(chunks):
+                cur = self.conn.execute(
+                    "INSERT INTO chunks(doc_id, chunk_no, text) VALUES (?, ?, ?)",
+                    (doc_id, chunk_no, text),
+                )
+                self.conn.execute(
+                    "INSERT INTO chunks_fts(rowid, text) VALUES (?, ?)", (cur.lastrowid, text)
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_id, content_hash, max_words, overlap_words, len(chunks), time.time()),
+            )
+        return True
+
+    def _delete_chunks(self, doc_id: str) -> None:
+        rows = self.conn.execute(
+            "SELECT rowid, text FROM chunks WHERE doc_id = ?", (doc_id,)
+        ).fetchall()
+        for rowid, text in rows:
+            # External-content FTS5 tables need the old text to remove a row.
+            self.conn.execute(
+                "INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES('delete', ?, ?)", (rowid, text)
+            )
+        self.conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+
+    def add_documents(self, docs: Iterable[Dict[str, str]]) -> Tuple[int, int]:
+        added = skipped = 0
+        for doc in docs:
+            if self.add_document(doc["id"], doc.get("content", "")):
+                added += 1
+                print(f"[ok] Indexed {doc['id']}")
+            else:
+                skipped += 1
+        return added, skipped
+
+    # -- merging -------------------------------------------------------
+
+    def merge_step(self, pages: int = MERGE_PAGES, conn: Optional[sqlite3.Connection] = None) -> bool:
+        """One bounded unit of segment merging; True if there may be more to do."""
+        conn = conn or self.conn
+        before = conn.total_changes
+        with conn:
+            conn.execute("INSERT INTO chunks_fts(chunks_fts, rank) VALUES('merge', ?)", (pages,))
+        # The command itself counts as one change; more means pages were merged.
+        return conn.total_changes - before > 1
+
+    def start_background_merge(self, pages: int = MERGE_PAGES, pause_s: float = 0.05) -> threading.Thread:
+        """Merge segments on a separate connection until nothing is left to merge."""
+        def run() -> None:
+            conn = _connect(self.path)
+            try:
+                while self.merge_step(pages, conn):
+                    time.sleep(pause_s)  # let writers and readers in between steps
+            finally:
+                conn.close()
+
+        self._merge_thread = threading.Thread(target=run, name="bm25-merge", daemon=True)
+        self._merge_thread.start()
+        return self._merge_thread
+
+    def optimize(self) -> None:
+        """Merge everything into a single segment (blocking)."""
+        with self.conn:
+            self.conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES('optimize')")
+
+    def segment_pages(self) -> int:
+        """Rows in the FTS5 data table - a rough size of the index structure."""
+        return self.conn.execute("SELECT count(*) FROM chunks_fts_data").fetchone()[0]
+
+    # -- queries -------------------------------------------------------
+
+    def search(
+        self,
+        event_cfg: EventConfig,
+        doc_id: Optional[str] = None,
+        top_k: int = 5,
+    ) -> List[Tuple[str, int, str, float]]:
+        """Top (doc_id, chunk_no, text, bm25 score) for an event, optionally within one document."""
+        query = event_query(event_cfg)
+        if not query:
+            return []
+        sql = (
+            "SELECT c.doc_id, c.chunk_no, c.text, -bm25(chunks_fts) AS score "
+            "FROM chunks_fts JOIN chunks c ON c.rowid = chunks_fts.rowid "
+            "WHERE chunks_fts MATCH ?"
+        )
+        params: List[object] = [query]
+        if doc_id is not None:
+            sql += " AND c.doc_id = ?"
+            params.append(doc_id)
+        sql += " ORDER BY bm25(chunks_fts) LIMIT ?"
+        params.append(top_k)
+        return [tuple(r) for r in self.conn.execute(sql, params)]  # type: ignore[misc]
+
+    def top_chunks_for_events(
+        self,
+        doc_id: str,
+        events: Optional[Sequence[EventConfig]] = None,
+        top_k: int = 5,
+    ) -> Dict[str, List[Tuple[str, float]]]:
+        """Drop-in for retrieval.get_top_chunks_for_events, ranked by BM25."""
+        events = list(events) if events is not None else get_all_events()
+        return {
+            ev.event_id: [(text, score) for _, _, text, score in self.search(ev, doc_id, top_k)]
+            for ev in events
+        }
+
+    def has_document(self, doc_id: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM docs WHERE doc_id = ?", (doc_id,)).fetchone() is not None
+
+    def close(self) -> None:
+        if self._merge_thread is not None:
+            self._merge_thread.join()
+        self.conn.close()
+
+    def __enter__(self) -> "BM25Index":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _query_latency_ms(index: BM25Index, repeat: int = 20) -> float:
+    events = get_all_events()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for ev in events:
+            index.search(ev, top_k=5)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(events))
+
+
+def main():
+    from part1_data.docstore import DocStore
+
+    parser = argparse.ArgumentParser(description="Persistent BM25 chunk index (SQLite FTS5)")
+    parser.add_argument("--index", default=INDEX_PATH)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="index new / changed documents")
+    p_build.add_argument("paths", nargs="*", default=[
+        "data/processed/gutenberg_lincoln.jsonl",
+        "data/processed/loc_lincoln_improved.jsonl",
+    ])
+    p_query = sub.add_parser("query", help="top chunks for an event")
+    p_query.add_argument("event")
+    p_query.add_argument("--doc-id")
+    p_query.add_argument("--top-k", type=int, default=5)
+    sub.add_parser("merge", help="run incremental merges to completion")
+    sub.add_parser("optimize", help="merge all segments into one")
+    args = parser.parse_args()
+
+    with BM25Index(args.index) as index:
+        if args.cmd == "build":
+            for path in args.paths:
+                with DocStore(path) as docs:
+                    added, skipped = index.add_documents(docs)
+                print(f"[stats] {path}: {added} indexed, {skipped} unchanged")
+            before = _query_latency_ms(index)
+            index.start_background_merge().join()
+            after = _query_latency_ms(index)
+            print(f"[stats] query latency {before:.2f} ms before merge, {after:.2f} ms after "
+                  f"({index.segment_pages()} index pages)")
+        elif args.cmd == "query":
+            ev = {e.event_id: e for e in get_all_events()}[args.event]
+            print(f"[info] {event_query(ev)}")
+            for doc_id, chunk_no, text, score in index.search(ev, args.doc_id, args.top_k):
+                print(f"{score:7.3f}  {doc_id}#{chunk_no}  {text[:100]!r}")
+        elif args.cmd == "merge":
+            steps = 0
+            while index.merge_step():
+                steps += 1
+            print(f"[ok] {steps} merge steps")
+        else:
+            index.optimize()
+            print("[ok] Optimized")
+
+
+if __name__ == "__main__":
+    main()
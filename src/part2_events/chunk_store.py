@@ -0,0 +1,295 @@
+# src/part2_events/chunk_store.py
+
+import argparse
+import array
+import json
+import mmap
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# --- Make sure src/ is on sys.path so we can import sibling packages ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.docstore import DocStore, parse_shard, source_key
+from part1_data.store import logical_name
+from part2_events.config import EventConfig, get_all_events
+from part2_events.retrieval import DEFAULT_CHUNKER, chunk_document, keyword_matcher
+
+# Prebuilt retrieval state for the whole corpus, so an extractor run can mmap
+# it and rank chunks without decoding, chunking or scoring a single document:
+#
+#   arena.txt     every chunk's text, UTF-8, back to back
+#   offsets.u64   byte offset of chunk i in the arena (n_chunks + 1 entries)
+#   scores.u16    keyword score of chunk i for event j (n_chunks x n_events)
+#   meta.json     fingerprint, docs -> chunk ranges, event catalog
+#
+# The fingerprint covers the input files (blob digest or size + mtime, see
+# docstore.source_key) and the chunking parameters; any change rebuilds the
+# store. Scores are only used when the event catalog still matches - otherwise
+# chunks are rescored from the arena on the fly.
+
+CHUNK_STORE_DIR = "data/index/chunkstore"
+CHUNK_STORE_VERSION = 1
+DEFAULT_SOURCES = [
+    "data/processed/gutenberg_lincoln.jsonl",
+    "data/processed/loc_lincoln_improved.jsonl",
+]
+MAX_WORDS = 1000
+OVERLAP_WORDS = 150
+
+
+def fingerprint(paths: Sequence[str]) -> Dict[str, Any]:
+    return {
+        "version": CHUNK_STORE_VERSION,
+        "sources": {logical_name(p): source_key(p) for p in paths},
+        "chunker": DEFAULT_CHUNKER,
+        "max_words": MAX_WORDS,
+        "overlap_words": OVERLAP_WORDS,
+    }
+
+
+def _event_catalog(events: Sequence[EventConfig]) -> List[List[Any]]:
+    return [[ev.event_id, list(ev.keywords)] for ev in events]
+
+
+def build_chunk_store(
+    paths: Sequence[str] = DEFAULT_SOURCES,
+    out_dir: str = CHUNK_STORE_DIR,
+    events: Optional[Sequence[EventConfig]] = None,
+) -> None:
+    events = list(events) if events is not None else get_all_events()
+    matcher = keyword_matcher(events)
+    event_ids = [ev.event_id for ev in events]
+    offsets = array.array("Q", [0])
+    scores = array.array("H")
+    docs: List[List[Any]] = []
+
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = lambda name: os.path.join(out_dir, name + ".tmp")  # noqa: E731
+    with open(tmp("arena.txt"), "wb") as arena:
+        for path in paths:
+            with DocStore(path) as store:
+                for doc in store:
+                    first = len(offsets) - 1
+                    chunked = chunk_document(
+                        doc.get("content", ""), MAX_WORDS, OVERLAP_WORDS, persist=False,
+                    )
+                    for ch, lowered in zip(chunked.chunks, chunked.lowered):
+                        data = ch.encode("utf-8")
+                        arena.write(data)
+                        offsets.append(offsets[-1] + len(data))
+                        row = matcher.scores(lowered)
+                        scores.extend(min(row[e], 0xFFFF) for e in event_ids)
+                    docs.append([doc["id"], doc.get("title", ""), logical_name(path),
+                                 first, len(offsets) - 1])
+
+    with open(tmp("offsets.u64"), "wb") as f:
+        offsets.tofile(f)
+    with open(tmp("scores.u16"), "wb") as f:
+        scores.tofile(f)
+    with open(tmp("meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "fingerprint": fingerprint(paths),
+            "events": _event_catalog(events),
+            "docs": docs,
+        }, f)
+    # meta.json last: a reader never sees a new fingerprint over old arrays.
+    for name in ("arena.txt", "offsets.u64", "scores.u16", "meta.json"):
+        os.replace(tmp(name), os.path.join(out_dir, name))
+    print(f"[ok] {len(docs)} documents, {len(offsets) - 1} chunks -> {out_dir}")
+
+
+def _map(path: str, typecode: str) -> Tuple[Optional[mmap.mmap], memoryview]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, memoryview(array.array(typecode))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    if typecode == "B":
+        return mm, view
+    cast = view.cast(typecode)
+    view.release()  # the cast view keeps the mapping; close() releases it
+    return mm, cast
+
+
+class ChunkStore:
+    """
+    Read side, all mmap'ed - opening it costs one small JSON read:
+
+        chunks = load_chunk_store()
+        top = chunks.top_chunks_for_events("gutenberg_14004")  # same as get_top_chunks_for_events
+    """
+
+    def __init__(self, store_dir: str = CHUNK_STORE_DIR):
+        with open(os.path.join(store_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.fingerprint: Dict[str, Any] = meta["fingerprint"]
+        self.events: List[List[Any]] = meta["events"]
+        self.docs: List[List[Any]] = meta["docs"]
+        self._doc_pos = {d[0]: i for i, d in enumerate(self.docs)}
+        self._arena_mm, self.arena = _map(os.path.join(store_dir, "arena.txt"), "B")
+        self._off_mm, self.offsets = _map(os.path.join(store_dir, "offsets.u64"), "Q")
+        self._score_mm, self.scores = _map(os.path.join(store_dir, "scores.u16"), "H")
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_pos
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def chunk(self, i: int) -> str:
+        return bytes(self.arena[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def chunk_range(self, doc_id: str) -> range:
+        _, _, _, first, end = self.docs[self._doc_pos[doc_id]]
+        return range(first, end)
+
+    def iter_docs(self, doc_ids: Optional[List[str]] = None, shard: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        {"id", "title"} stubs in corpus order, with the same doc_ids / shard
+        selection as event_extractor.iter_documents (shards split each source).
+        """
+        if doc_ids:
+            wanted = set(doc_ids)
+            rows = [d for d in self.docs if d[0] in wanted]
+        elif shard:
+            i, n = parse_shard(shard)
+            if not 0 <= i < n:
+                raise ValueError(f"shard must be in [0, {n}), got {i}")
+            rows = []
+            for source in dict.fromkeys(d[2] for d in self.docs):
+                docs = [d for d in self.docs if d[2] == source]
+                rows.extend(docs[len(docs) * i // n:len(docs) * (i + 1) // n])
+        else:
+            rows = self.docs
+        for doc_id, title, _, _, _ in rows:
+            yield {"id": doc_id, "title": title}
+
+    def top_chunks_for_events(
+        self,
+        doc_id: str,
+        events: Optional[Sequence[EventConfig]] = None,
+        top_k: int = 5,
+    ) -> Dict[str, List[Tuple[str, int]]]:
+        """Drop-in for retrieval.get_top_chunks_for_events on a stored document."""
+        events = list(events) if events is not None else get_all_events()
+        rows = self.chunk_range(doc_id)
+        n_events = len(self.events)
+        columns = {e[0]: j for j, e in enumerate(self.events)}
+
+        if _event_catalog(events) == self.events:
+            scored: Dict[str, List[Tuple[int, int]]] = {ev.event_id: [] for ev in events}
+            for i in rows:
+                base = i * n_events
+                for ev in events:
+                    s = self.scores[base + columns[ev.event_id]]
+                    if s > 0:
+                        scored[ev.event_id].append((i, s))
+        else:
+            # Catalog changed since the build: rescore this document's chunks.
+            matcher = keyword_matcher(events)
+            scored = {ev.event_id: [] for ev in events}
+            for i in rows:
+                for event_id, s in matcher.scores(self.chunk(i).lower()).items():
+                    if s > 0:
+                        scored[event_id].append((i, s))
+
+        top: Dict[str, List[Tuple[str, int]]] = {}
+        for event_id, pairs in scored.items():
+            pairs.sort(key=lambda x: x[1], reverse=True)
+            top[event_id] = [(self.chunk(i), s) for i, s in pairs[:top_k]]
+        return top
+
+    def close(self) -> None:
+        for view in (self.arena, self.offsets, self.scores):
+            view.release()
+        for mm in (self._arena_mm, self._off_mm, self._score_mm):
+            if mm is not None:
+                mm.close()
+
+    def __enter__(self) -> "ChunkStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def is_current(paths: Sequence[str] = DEFAULT_SOURCES, store_dir: str = CHUNK_STORE_DIR) -> bool:
+    try:
+        with open(os.path.join(store_dir, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)["fingerprint"] == fingerprint(paths)
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def load_chunk_store(paths: Sequence[str] = DEFAULT_SOURCES, store_dir: str = CHUNK_STORE_DIR) -> ChunkStore:
+    """Open the store, rebuilding it first if any input (or chunking setting) changed."""
+    if not is_current(paths, store_dir):
+        print(f"[info] Chunk store out of date, rebuilding {store_dir}")
+        build_chunk_store(paths, store_dir)
+    return ChunkStore(store_dir)
+
+
+def _cold_start(paths: Sequence[str]) -> Tuple[float, float]:
+    from part2_events.retrieval import get_top_chunks_for_events
+
+    start = time.perf_counter()
+    first = 0.0
+    for path in paths:
+        with DocStore(path) as docs:
+            for doc in docs:
+                get_top_chunks_for_events(doc.get("content", ""))
+                first = first or time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def _warm_start(paths: Sequence[str], store_dir: str) -> Tuple[float, float]:
+    start = time.perf_counter()
+    first = 0.0
+    with load_chunk_store(paths, store_dir) as chunks:
+        for doc in chunks.iter_docs():
+            chunks.top_chunks_for_events(doc["id"])
+            first = first or time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    from part2_events import retrieval
+
+    parser = argparse.ArgumentParser(description="Memory-mapped chunk store for the extractor")
+    parser.add_argument("--dir", default=CHUNK_STORE_DIR)
+    parser.add_argument("cmd", choices=["build", "status", "bench"])
+    parser.add_argument("paths", nargs="*", default=DEFAULT_SOURCES)
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        start = time.perf_counter()
+        build_chunk_store(args.paths, args.dir)
+        print(f"[stats] built in {time.perf_counter() - start:.1f}s")
+    elif args.cmd == "status":
+        print(f"[info] {args.dir}: {'up to date' if is_current(args.paths, args.dir) else 'stale'}")
+    else:
+        cold_first, cold_total = _cold_start(args.paths)
+        retrieval._chunk_cache.clear()
+        warm_first, warm_total = _warm_start(args.paths, args.dir)
+        print(f"[bench] JSONL + chunk + score: first context {cold_first * 1000:8.1f} ms, "
+              f"all documents {cold_total:6.2f}s")
+        print(f"[bench] chunk store (mmap):    first context {warm_first * 1000:8.1f} ms, "
+              f"all documents {warm_total:6.2f}s")
+
+        mismatches = 0
+        with ChunkStore(args.dir) as chunks, DocStore(args.paths[0]) as docs:
+            for doc_id in docs.ids()[:3]:
+                expected = retrieval.get_top_chunks_for_events(docs.get(doc_id).get("content", ""))
+                mismatches += expected != chunks.top_chunks_for_events(doc_id)
+        print(f"[check] {mismatches} mismatching documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# src/part2_events/context.py
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config import EventConfig
+from .dedup import estimate_tokens
+from .packing import SEPARATOR
+from .retrieval import score_chunk_for_event
+from .spans import Span
+
+# Token-budgeted context assembly, between retrieval and the extraction prompt.
+#
+# Retrieval returns whole chunks: neighbouring chunks repeat their overlap
+# (150 words for word chunks) and a 1000-word chunk is sent even when only
+# a few of its sentences mention the event. The assembler
+#   1. merges chunks that overlap (a suffix of one is a prefix of the other)
+#      into one passage, so the overlap is sent once;
+#   2. splits passages into sentences and scores each by the event's
+#      keywords, plus half the score of its neighbours (a hit pulls in its
+#      immediate context);
+#   3. keeps the best sentences that fit the token budget, in source order,
+#      marking gaps with " [...] ".
+# Passages are located in the document when its content is available, so
+# every kept run of sentences carries its (start, end) character offsets.
+
+CONTEXT_TOKENS = int(os.environ.get("MM_CONTEXT_TOKENS", "3000"))
+MIN_MERGE_WORDS = 8    # shortest overlap that counts as the same text
+NEIGHBOUR_WEIGHT = 0.5
+GAP = " [...] "
+
+_SENTENCE_END = re.compile(r"[.!?][\"'”’)\]]*$")
+_WORD = re.compile(r"\S+")
+
+
+@dataclass
+class AssembledContext:
+    passages: List[str]
+    spans: List[Optional[Span]]  # document offsets of each kept run of sentences (None if not located)
+    tokens_before: int
+    tokens_after: int
+
+    def summary(self) -> Dict[str, Any]:
+        """For the extraction record."""
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "spans": [list(s) if s is not None else None for s in self.spans],
+        }
+
+
+def merge_chunks(chunks: Sequence[str]) -> List[List[str]]:
+    """
+    Chunks as word lists, with overlapping ones merged. Chunks arrive in
+    rank order, so merging repeats until no pair overlaps; passages keep
+    the rank order of their best chunk.
+    """
+    passages = [c.split() for c in chunks if c.strip()]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(passages)):
+            for j in range(len(passages)):
+                k = _overlap(passages[i], passages[j]) if i != j else 0
+                if k:
+                    # The merged passage takes the better-ranked of the two places
+                    passages[min(i, j)] = passages[i] + passages[j][k:]
+                    del passages[max(i, j)]
+                    merged = True
+                    break
+            if merged:
+                break
+    return passages
+
+
+def _overlap(a: List[str], b: List[str]) -> int:
+    """Length of the longest suffix of a that is a prefix of b (0 if shorter than MIN_MERGE_WORDS)."""
+    if len(b) < MIN_MERGE_WORDS:
+        return 0
+    head = b[:MIN_MERGE_WORDS]
+    start = max(0, len(a) - len(b))
+    for k in range(start, len(a) - MIN_MERGE_WORDS + 1):
+        if a[k:k + MIN_MERGE_WORDS] == head and a[k:] == b[:len(a) - k]:
+            return len(a) - k
+    return 0
+
+
+def _sentences(words: List[str]) -> List[Tuple[int, int]]:
+    """(first word, end word) of each sentence."""
+    out = []
+    start = 0
+    for i, w in enumerate(words):
+        if _SENTENCE_END.search(w):
+            out.append((start, i + 1))
+            start = i + 1
+    if start < len(words):
+        out.append((start, len(words)))
+    return out
+
+
+def _locate(words: List[str], content: str) -> Optional[List[Span]]:
+    """Character span of every word of a passage in content, or None if it is not found verbatim."""
+    anchor = r"\s+".join(re.escape(w) for w in words[:MIN_MERGE_WORDS])
+    for m in re.finditer(anchor, content):
+        spans = []
+        for tok, w in zip(_WORD.finditer(content, m.start()), words):
+            if tok.group() != w:
+                break
+            spans.append(tok.span())
+        if len(spans) == len(words):
+            return spans
+    return None
+
+
+def assemble_context(
+    chunks: Sequence[str],
+    event_cfg: EventConfig,
+    budget: int = CONTEXT_TOKENS,
+    content: Optional[str] = None,
+) -> AssembledContext:
+    """The event's best sentences from chunks (rank order), within `budget` tokens."""
+    passages = merge_chunks(chunks)
+    sentences = [(p, s, e) for p, words in enumerate(passages) for s, e in _sentences(words)]
+    texts = [" ".join(passages[p][s:e]) for p, s, e in sentences]
+    hits = [score_chunk_for_event(t, event_cfg) for t in texts]
+
+    weights = []
+    for i, (p, _, _) in enumerate(sentences):
+        w = float(hits[i])
+        for j in (i - 1, i + 1):
+            if 0 <= j < len(sentences) and sentences[j][0] == p:
+                w += NEIGHBOUR_WEIGHT * hits[j]
+        weights.append(w)
+
+    if any(weights):
+        order = sorted((i for i in range(len(sentences)) if weights[i] > 0), key=lambda i: (-weights[i], i))
+    else:
+        order = list(range(len(sentences)))  # nothing to go on (e.g. a semantic match): keep the lead
+    kept = set()
+    used = 0
+    for i in order:
+        cost = estimate_tokens(texts[i]) + 1
+        if used + cost <= budget:
+            kept.add(i)
+            used += cost
+
+    located = {p: _locate(words, content) for p, words in enumerate(passages)} if content else {}
+    out_passages: List[str] = []
+    spans: List[Optional[Span]] = []
+    for p in range(len(passages)):
+        runs: List[List[int]] = []
+        for i in sorted(kept):
+            if sentences[i][0] != p:
+                continue
+            if runs and runs[-1][-1] == i - 1:
+                runs[-1].append(i)
+            else:
+                runs.append([i])
+        if not runs:
+            continue
+        out_passages.append(GAP.join(" ".join(texts[i] for i in run) for run in runs))
+        word_spans = located.get(p)
+        for run in runs:
+            first, last = sentences[run[0]], sentences[run[-1]]
+            spans.append((word_spans[first[1]][0], word_spans[last[2] - 1][1]) if word_spans else None)
+
+    return AssembledContext(
+        out_passages,
+        spans,
+        estimate_tokens(SEPARATOR.join(chunks)),
+        estimate_tokens(SEPARATOR.join(out_passages)),
+    )
+
+
+# Totals for this process, for the end-of-run report.
+_totals = {"contexts": 0, "before": 0, "after": 0}
+
+
+def record(ctx: AssembledContext) -> None:
+    _totals["contexts"] += 1
+    _totals["before"] += ctx.tokens_before
+    _totals["after"] += ctx.tokens_after
+
+
+def report() -> None:
+    """Context tokens before / after assembly (no-op if nothing was assembled)."""
+    if not _totals["contexts"]:
+        return
+    before, after = _totals["before"], _totals["after"]
+    print(f"[stats] context: {_totals['contexts']} contexts assembled, {before:,} -> {after:,} tokens "
+          f"({before / max(1, after):.1f}x fewer)")
@@ -0,0 +1,186 @@
+# src/part2_events/cost_plan.py
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .dedup import estimate_tokens
+from .llm_batch import BATCH_PRICE_FACTOR
+from .llm_cache import CACHE_MODE, PRICES, LLMCache, cache_key, get_cache, request_cost
+from .llm_client import COMPLETION_TOKENS_EST, LLM_CONCURRENCY, LLM_RPM, LLM_TPM, LLMRequest, chat_messages
+
+# Pre-flight planning (--dry-run): what a stage will cost before it runs.
+#
+# A stage builds its prompts with its usual builders and hands them to a
+# CostPlan instead of the LLM, in the groups it would send them in (one
+# call_llm_many per group). Nothing is sent; prompts already in the LLM
+# cache are counted as cached and cost nothing.
+#
+# Prompt tokens are counted offline with dedup.estimate_tokens, the same
+# estimate the packer and the context assembler budget with, so a plan and
+# the budgets a run enforces agree (plus the chat format's per-message
+# overhead). Answer lengths are per-kind estimates.
+#
+# Wall-clock time is the larger of
+#   - latency: each group runs min(concurrency, group size) calls at a time,
+#     each call taking LATENCY_S plus its answer at OUTPUT_TOKENS_PER_S;
+#   - rate limits: after the first minute's burst, MM_LLM_RPM requests and
+#     MM_LLM_TPM tokens per minute (the RateLimiter buckets).
+
+# Input context window per model (prompt + answer must fit).
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-4o-mini": 128_000,
+    "gpt-4o": 128_000,
+    "gpt-4.1-mini": 1_047_576,
+    "gpt-4.1": 1_047_576,
+}
+
+# Expected answer tokens per request kind (the strategy field of its
+# custom_id); a packed extraction call answers once per (document, event) pair.
+OUTPUT_TOKENS: Dict[str, int] = {
+    "extract": 250,
+    "pack": 250,
+    "judge": 450,
+    "zero_shot": 300,
+    "cot": 600,
+    "few_shot": 300,
+    "self_consistency": 600,
+}
+
+LATENCY_S = 0.8              # request overhead + time to first token
+OUTPUT_TOKENS_PER_S = 80.0   # decode speed (gpt-4o-mini is typically 60-120)
+TOKENS_PER_MESSAGE = 3       # chat format overhead per message
+REPLY_PRIMING = 3            # every reply is primed with <|start|>assistant<|message|>
+
+
+def prompt_tokens(req: LLMRequest) -> int:
+    messages = chat_messages(req.system_prompt, req.user_prompt)
+    return sum(TOKENS_PER_MESSAGE + estimate_tokens(m["content"]) for m in messages) + REPLY_PRIMING
+
+
+def output_tokens(req: LLMRequest, answers: int = 1) -> int:
+    parts = req.request_id.split("|")
+    kind = parts[2] if len(parts) > 2 else ""
+    return OUTPUT_TOKENS.get(kind, COMPLETION_TOKENS_EST) * answers
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+@dataclass
+class StagePlan:
+    calls: int = 0           # calls that would reach the API
+    cached: int = 0          # calls answered from the LLM cache
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    busy_s: float = 0.0      # latency-bound time
+    largest: int = 0         # largest prompt, tokens
+
+    def wall_s(self, rpm: int, tpm: int) -> Tuple[float, str]:
+        """(estimated seconds, what bounds them)."""
+        bounds = [
+            (self.busy_s, "latency"),
+            (max(0, self.calls - rpm) * 60 / rpm, "RPM"),
+            (max(0, self.input_tokens + self.output_tokens - tpm) * 60 / tpm, "TPM"),
+        ]
+        return max(bounds)
+
+
+class CostPlan:
+    """
+    Token / cost / time plan for the requests of one or more stages:
+
+        plan = CostPlan()
+        for group in groups:
+            plan.add("extract", group)      # requests sent together
+        plan.report()
+    """
+
+    def __init__(
+        self,
+        concurrency: int = LLM_CONCURRENCY,
+        rpm: int = LLM_RPM,
+        tpm: int = LLM_TPM,
+        cache: Optional[LLMCache] = None,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.rpm = rpm
+        self.tpm = tpm
+        self.cache = cache if cache is not None else (get_cache() if CACHE_MODE == "on" else None)
+        self.stages: Dict[str, StagePlan] = {}
+        self.oversized: List[Tuple[str, int, str]] = []  # (request id, prompt tokens, reason)
+        self.unpriced: Set[str] = set()
+
+    def add(self, stage: str, requests: Sequence[LLMRequest], answers: Optional[Sequence[int]] = None) -> None:
+        """
+        Plan requests that the stage sends together (one call_llm_many).
+        answers gives the number of answers each request carries (packed
+        extraction), 1 by default.
+        """
+        plan = self.stages.setdefault(stage, StagePlan())
+        latencies = []
+        for i, req in enumerate(requests):
+            n_in = prompt_tokens(req)
+            n_out = output_tokens(req, answers[i] if answers else 1)
+            plan.largest = max(plan.largest, n_in)
+            window = CONTEXT_WINDOWS.get(req.model)
+            if window and n_in + n_out > window:
+                self.oversized.append((req.request_id, n_in, f"exceeds the {window:,}-token {req.model} context window"))
+            elif n_in + n_out > self.tpm:
+                self.oversized.append((req.request_id, n_in, f"exceeds MM_LLM_TPM={self.tpm:,} (rejected as too large)"))
+            if req.model not in PRICES:
+                self.unpriced.add(req.model)
+
+            if self.cache is not None:
+                key = cache_key(req.model, chat_messages(req.system_prompt, req.user_prompt), req.temperature, req.sample)
+                if self.cache.contains(key):
+                    plan.cached += 1
+                    continue
+            plan.calls += 1
+            plan.input_tokens += n_in
+            plan.output_tokens += n_out
+            plan.cost_usd += request_cost(req.model, n_in, n_out)
+            latencies.append(LATENCY_S + n_out / OUTPUT_TOKENS_PER_S)
+        if latencies:
+            plan.busy_s += sum(latencies) / min(self.concurrency, len(latencies))
+
+    def total(self) -> StagePlan:
+        total = StagePlan()
+        for plan in self.stages.values():
+            total.calls += plan.calls
+            total.cached += plan.cached
+            total.input_tokens += plan.input_tokens
+            total.output_tokens += plan.output_tokens
+            total.cost_usd += plan.cost_usd
+            total.busy_s += plan.busy_s
+            total.largest = max(total.largest, plan.largest)
+        return total
+
+    def _line(self, name: str, plan: StagePlan) -> str:
+        seconds, bound = plan.wall_s(self.rpm, self.tpm)
+        return (f"[plan] {name}: {plan.calls:,} calls ({plan.cached:,} cached), "
+                f"{plan.input_tokens:,} in / ~{plan.output_tokens:,} out tokens, "
+                f"${plan.cost_usd:.4f} (${plan.cost_usd * BATCH_PRICE_FACTOR:.4f} with --batch), "
+                f"~{_duration(seconds)} ({bound}-bound), largest prompt {plan.largest:,} tokens")
+
+    def report(self) -> None:
+        print(f"[plan] dry run, nothing sent: concurrency {self.concurrency}, "
+              f"{self.rpm:,} RPM, {self.tpm:,} TPM (MM_LLM_CONCURRENCY / MM_LLM_RPM / MM_LLM_TPM)")
+        for name, plan in self.stages.items():
+            print(self._line(name, plan))
+        if len(self.stages) > 1:
+            print(self._line("total", self.total()))
+        for model in sorted(self.unpriced):
+            print(f"[warn] No price for model {model!r} in llm_cache.PRICES; its calls count as $0")
+        if self.oversized:
+            print(f"[warn] {len(self.oversized)} prompt(s) too large to send:")
+            for request_id, n_in, reason in self.oversized[:20]:
+                print(f"[warn]   {request_id}: {n_in:,} prompt tokens, {reason}")
+            if len(self.oversized) > 20:
+                print(f"[warn]   ... and {len(self.oversized) - 20} more")
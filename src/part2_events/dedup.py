@@ -0,0 +1,249 @@
+# src/part2_events/dedup.py
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# --- Make sure src/ is on sys.path so we can import sibling packages ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+# Near-duplicate detection with MinHash + LSH.
+#
+# Every text becomes a set of hashed word 5-shingles. Signatures use
+# one-permutation hashing: each shingle hash is computed once and dropped into
+# one of NUM_PERM bins (min per bin), so a signature costs O(shingles) rather
+# than O(shingles x permutations). LSH splits the signature into BANDS bands of
+# ROWS rows; texts sharing any band bucket become candidates, and only those
+# pairs are compared, so clustering stays far below quadratic.
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # 8 rows -> candidate threshold around J = 0.7
+THRESHOLD = 0.8
+
+# Rough prompt-token estimate (English text averages ~4 characters per token).
+CHARS_PER_TOKEN = 4
+
+_MAX64 = (1 << 64) - 1
+_WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_WORDS) -> List[int]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < k:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+    return [
+        int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little")
+        for g in set(grams)
+    ]
+
+
+def minhash(hashes: Iterable[int], num_perm: int = NUM_PERM) -> Tuple[int, ...]:
+    """One-permutation MinHash with rotation densification for empty bins."""
+    sig = [_MAX64] * num_perm
+    for h in hashes:
+        b = h % num_perm
+        v = h // num_perm
+        if v < sig[b]:
+            sig[b] = v
+    if _MAX64 not in sig or all(v == _MAX64 for v in sig):
+        return tuple(sig)
+    # Empty bin i borrows the nearest filled bin to its right (wrapping), tagged
+    # with the distance so a borrowed value never equals a real one.
+    out = list(sig)
+    nxt = -1
+    for step in range(2 * num_perm - 1, -1, -1):
+        i = step % num_perm
+        if sig[i] != _MAX64:
+            nxt = i
+        elif step < num_perm:
+            out[i] = sig[nxt] + (((nxt - i) % num_perm) << 64)
+    return tuple(out)
+
+
+def signature(text: str) -> Tuple[int, ...]:
+    return minhash(shingle_hashes(text))
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class LSHIndex:
+    """
+    Online banded LSH over MinHash signatures. query() returns the first
+    indexed key whose estimated similarity clears the threshold, so callers
+    can cluster a stream without ever comparing all pairs.
+    """
+
+    def __init__(self, bands: int = BANDS, rows: int = ROWS, threshold: float = THRESHOLD):
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self.buckets: List[Dict[Tuple[int, ...], List[Any]]] = [defaultdict(list) for _ in range(bands)]
+        self.signatures: Dict[Any, Tuple[int, ...]] = {}
+
+    def _band_keys(self, sig: Sequence[int]) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+        for b in range(self.bands):
+            yield b, tuple(sig[b * self.rows:(b + 1) * self.rows])
+
+    def add(self, key: Any, sig: Tuple[int, ...]) -> None:
+        self.signatures[key] = sig
+        for b, band in self._band_keys(sig):
+            self.buckets[b][band].append(key)
+
+    def query(self, sig: Sequence[int]) -> Optional[Any]:
+        seen = set()
+        for b, band in self._band_keys(sig):
+            for key in self.buckets[b].get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                if similarity(sig, self.signatures[key]) >= self.threshold:
+                    return key
+        return None
+
+
+def cluster(texts: Sequence[str], threshold: float = THRESHOLD) -> List[int]:
+    """
+    Cluster id per text: the index of the first earlier text it near-duplicates
+    (itself if none). Cluster representatives are always the earliest member.
+    """
+    index = LSHIndex(threshold=threshold)
+    labels: List[int] = []
+    for i, text in enumerate(texts):
+        sig = signature(text)
+        rep = index.query(sig)
+        if rep is None:
+            index.add(i, sig)
+            labels.append(i)
+        else:
+            labels.append(labels[rep])
+    return labels
+
+
+def drop_duplicate_chunks(chunks: List[Tuple[str, int]], threshold: float = THRESHOLD) -> List[Tuple[str, int]]:
+    """Keep the first of any near-duplicate (chunk, score) pairs, preserving order."""
+    labels = cluster([ch for ch, _ in chunks], threshold)
+    return [pair for i, pair in enumerate(chunks) if labels[i] == i]
+
+
+class ExtractionDeduper:
+    """
+    Remembers every extraction context sent for each (event, source) pair. A
+    later context from the same kind of source ("lincoln" or "other") that
+    near-duplicates one of them reuses that result instead of calling the LLM
+    again, so claims never cross between Lincoln's documents and other
+    authors'. Calls and prompt tokens saved are tallied for the report.
+    """
+
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self.indexes: Dict[Tuple[str, str], LSHIndex] = {}
+        self.results: Dict[Tuple[str, str, int], Tuple[str, Dict[str, Any]]] = {}
+        self.calls = 0
+        self.saved_calls = 0
+        self.saved_tokens = 0
+
+    def lookup(
+        self, event_id: str, source: str, context: str
+    ) -> Tuple[Optional[Tuple[str, Dict[str, Any]]], Tuple[int, ...]]:
+        """((source doc_id, parsed result) or None, signature of this context)."""
+        sig = signature(context)
+        index = self.indexes.get((event_id, source))
+        key = index.query(sig) if index else None
+        return (self.results[(event_id, source, key)] if key is not None else None), sig
+
+    def record_reuse(self, prompt: str) -> None:
+        self.saved_calls += 1
+        self.saved_tokens += estimate_tokens(prompt)
+
+    def store(self, event_id: str, source: str, sig: Tuple[int, ...], doc_id: str, parsed: Dict[str, Any]) -> None:
+        index = self.indexes.setdefault((event_id, source), LSHIndex(threshold=self.threshold))
+        key = len(index.signatures)
+        index.add(key, sig)
+        self.results[(event_id, source, key)] = (doc_id, parsed)
+        self.calls += 1
+
+    def report(self) -> None:
+        total = self.calls + self.saved_calls
+        print(f"[stats] dedup: {total} extraction contexts, {self.calls} LLM calls, "
+              f"{self.saved_calls} reused (~{self.saved_tokens} prompt tokens saved)")
+
+
+# ----------------------------------------------------------------------
+# Corpus report: duplicate chunk clusters and what dedup would save
+# ----------------------------------------------------------------------
+
+def main():
+    from part1_data.docstore import DocStore
+    from part2_events.config import get_all_events
+    from part2_events.event_extractor import classify_source
+    from part2_events.retrieval import chunk_document, get_top_chunks_for_events
+
+    parser = argparse.ArgumentParser(description="Near-duplicate chunk report for the extraction corpus")
+    parser.add_argument("paths", nargs="*", default=[
+        "data/processed/gutenberg_lincoln.jsonl",
+        "data/processed/loc_lincoln_improved.jsonl",
+    ])
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    chunk_ids: List[str] = []
+    chunks: List[str] = []
+    deduper = ExtractionDeduper(args.threshold)
+    within_doc_tokens = 0
+    for path in args.paths:
+        with DocStore(path) as docs:
+            for doc in docs:
+                content = doc.get("content", "")
+                for i, ch in enumerate(chunk_document(content).chunks):
+                    chunk_ids.append(f"{doc['id']}#{i}")
+                    chunks.append(ch)
+                top_by_event = get_top_chunks_for_events(content, top_k=5)
+                for event_cfg in get_all_events():
+                    top = top_by_event[event_cfg.event_id]
+                    if not top:
+                        continue
+                    kept = drop_duplicate_chunks(top, args.threshold)
+                    within_doc_tokens += sum(estimate_tokens(ch) for ch, _ in top) - \
+                        sum(estimate_tokens(ch) for ch, _ in kept)
+                    context = "\n\n---\n\n".join(ch for ch, _ in kept)
+                    source = classify_source(doc["id"])
+                    hit, sig = deduper.lookup(event_cfg.event_id, source, context)
+                    if hit:
+                        deduper.record_reuse(context)
+                    else:
+                        deduper.store(event_cfg.event_id, source, sig, doc["id"], {})
+
+    labels = cluster(chunks, args.threshold)
+    members: Dict[int, List[int]] = defaultdict(list)
+    for i, rep in enumerate(labels):
+        members[rep].append(i)
+    dup_clusters = [m for m in members.values() if len(m) > 1]
+    print(f"[stats] {len(chunks)} chunks, {len(dup_clusters)} near-duplicate clusters covering "
+          f"{sum(len(m) for m in dup_clusters)} chunks")
+    for m in sorted(dup_clusters, key=len, reverse=True)[:10]:
+        print(f"  cluster of {len(m)}: {', '.join(chunk_ids[i] for i in m[:6])}")
+    print(f"[stats] duplicate chunks dropped inside contexts: ~{within_doc_tokens} prompt tokens")
+    deduper.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 # src/part2_events/event_extractor.py
 
+import argparse
 import json
 import os
 import sys
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
 
 # --- Import handling: works both as a module and a script ---
 
@@ -14,22 +15,42 @@ if __package__ is None or __package__ == "":
     if src_dir not in sys.path:
         sys.path.append(src_dir)
 
-    from part2_events.config import get_all_events
-    from part2_events.retrieval import load_jsonl, get_top_chunks_for_event
-    from part2_events.llm_client import call_llm
+    from part2_events.config import EventConfig, get_all_events
+    from part2_events.retrieval import get_top_chunks_for_event, get_top_chunks_for_events
+    from part2_events.llm_client import LLM_CONCURRENCY, LLMRequest, call_llm_many
+    from part2_events.packing import PACK_TOKENS, SEPARATOR, Packer, WorkUnit, group_events
+    from part2_events import context
+    from part2_events.context import CONTEXT_TOKENS, AssembledContext, assemble_context
+    from part2_events import llm_cache
+    from part2_events.cost_plan import CostPlan
+    from part2_events.llm_batch import BatchJob, custom_id
+    from part2_events.dedup import ExtractionDeduper, drop_duplicate_chunks, estimate_tokens
+    from part2_events.bm25_index import BM25Index
+    from part2_events.chunk_store import ChunkStore, load_chunk_store
+    from part1_data.docstore import DocStore, parse_shard
+    from part1_data.store import JsonlWriter, prefetch
 else:
     # Running as a module: use relative imports
-    from .config import get_all_events
-    from .retrieval import load_jsonl, get_top_chunks_for_event
-    from .llm_client import call_llm
+    from .config import EventConfig, get_all_events
+    from .retrieval import get_top_chunks_for_event, get_top_chunks_for_events
+    from .llm_client import LLM_CONCURRENCY, LLMRequest, call_llm_many
+    from .packing import PACK_TOKENS, SEPARATOR, Packer, WorkUnit, group_events
+    from . import context
+    from .context import CONTEXT_TOKENS, AssembledContext, assemble_context
+    from . import llm_cache
+    from .cost_plan import CostPlan
+    from .llm_batch import BatchJob, custom_id
+    from .dedup import ExtractionDeduper, drop_duplicate_chunks, estimate_tokens
+    from .bm25_index import BM25Index
+    from .chunk_store import ChunkStore, load_chunk_store
+    from part1_data.docstore import DocStore, parse_shard
+    from part1_data.store import JsonlWriter, prefetch
 
 
 GUTENBERG_PATH = "data/processed/gutenberg_lincoln.jsonl"
 LOC_PATH = "data/processed/loc_lincoln_improved.jsonl"
 OUT_PATH = "data/events/event_extractions.jsonl"
 
-os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-
 
 def classify_source(doc_id: str) -> str:
     """
@@ -119,7 +140,11 @@ def safe_parse_json(output: str) -> Dict[str, Any]:
             "tone": "Not discussed",
         }
 
-    # Normalize structure
+    return normalize_extraction(data)
+
+
+def normalize_extraction(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in / repair the claims, temporal_details and tone fields of one extraction result."""
     if "claims" not in data or not isinstance(data["claims"], list):
         data["claims"] = []
     if "temporal_details" not in data or not isinstance(data["temporal_details"], dict):
@@ -134,75 +159,670 @@ def safe_parse_json(output: str) -> Dict[str, Any]:
     return data
 
 
-def extract_for_document(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+def build_packed_extraction_prompt(units: List[WorkUnit]) -> tuple[str, str]:
     """
-    For a single document, run extraction for all events.
-    Returns a list of event result records.
+    Returns (system_prompt, user_prompt) for one packed call: several
+    documents, each with the events to extract from its excerpts. The answer
+    is keyed by doc_id, then event_id.
+    """
+    system_prompt = (
+        "You are a careful historian extracting factual and interpretive claims "
+        "about key events in Abraham Lincoln's life. You must only use the provided "
+        "text and avoid speculation. Each document is separate: never use one "
+        "document's text for another. Return concise JSON only."
+    )
+
+    # One section per document: its units (consecutive in a pack) share it,
+    # since the answer has a single entry per document id.
+    by_doc: Dict[str, List[WorkUnit]] = {}
+    for unit in units:
+        by_doc.setdefault(unit.doc_id, []).append(unit)
+
+    sections = []
+    for doc_id, doc_units in by_doc.items():
+        events = [ev for unit in doc_units for ev in unit.events]
+        chunks = list(dict.fromkeys(ch for unit in doc_units for ch in unit.chunks))
+        event_lines = "\n".join(f"  - {ev.event_id}: {ev.name}. {ev.description}" for ev in events)
+        text = SEPARATOR.join(chunks)
+        sections.append(f"""
+Document {doc_id} ({doc_units[0].title})
+Events:
+{event_lines}
+Text:
+\"\"\"
+{text}
+\"\"\"
+""")
+    documents = "".join(sections)
+
+    user_prompt = f"""
+For every document below and every event listed under it:
+1. From that document's text, list all concrete claims related to the event.
+   - Each claim should be a short, self-contained sentence.
+   - Include both factual statements and interpretive statements (e.g., about motives or attitudes).
+2. Extract any dates, times, and places mentioned specifically for the event.
+3. Classify the tone of the author toward Lincoln in this context as one of:
+   "Sympathetic", "Critical", "Neutral", "Mixed", or "Not discussed".
+{documents}
+Return your answer as valid JSON keyed by document id, then event id, covering
+every listed (document, event) pair (use an empty claims list if the text says
+nothing about it):
+
+{{
+  "<document id>": {{
+    "<event id>": {{
+      "claims": [ "<claim 1>", "<claim 2>", "..."],
+      "temporal_details": {{
+        "date": "<date if given, else empty string>",
+        "time": "<time if given, else empty string>",
+        "place": "<place if given, else empty string>"
+      }},
+      "tone": "<one of: Sympathetic, Critical, Neutral, Mixed, Not discussed>"
+    }}
+  }}
+}}
+"""
+
+    return system_prompt, user_prompt
+
+
+def parse_packed_output(output: str, units: List[WorkUnit]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """(doc_id, event_id) -> normalized result, for the requested pairs the answer covers."""
+    text = output.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+    start = text.find("{")
+    end = text.rfind("}")
+    if start != -1 and end != -1:
+        text = text[start:end + 1]
+    try:
+        data = json.loads(text)
+    except Exception:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    found: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for unit in units:
+        by_event = data.get(unit.doc_id)
+        if not isinstance(by_event, dict):
+            continue
+        for ev in unit.events:
+            result = by_event.get(ev.event_id)
+            if isinstance(result, dict):
+                found[(unit.doc_id, ev.event_id)] = normalize_extraction(result)
+    return found
+
+
+# (event, request, (reused doc_id, parsed) for a near-duplicate context or None, context signature,
+#  assembled context or None)
+PlannedCall = Tuple[
+    EventConfig, LLMRequest, Optional[Tuple[str, Dict[str, Any]]], Optional[Tuple[int, ...]], Optional[AssembledContext]
+]
+
+
+def rank_chunks(
+    doc: Dict[str, Any],
+    deduper: Optional[ExtractionDeduper] = None,
+    index: Optional[BM25Index] = None,
+    backend: str = "keywords",
+    chunk_store: Optional[ChunkStore] = None,
+    context_tokens: Optional[int] = None,
+) -> List[Tuple[EventConfig, List[Tuple[str, int]], Optional[AssembledContext]]]:
+    """
+    Top chunks of one document for every event that has any, in event order.
+    With context_tokens, they are replaced by the passages the context
+    assembler keeps within that budget (context.py).
     """
-    results: List[Dict[str, Any]] = []
     doc_id = doc["id"]
-    source = classify_source(doc_id)
-    title = doc.get("title", "")
     content = doc.get("content", "")
 
-    for event_cfg in get_all_events():
-        # Retrieve top chunks for this event
-        top_chunks = get_top_chunks_for_event(content, event_cfg, top_k=5)
+    # Chunk the document once and rank its chunks for every event in one sweep
+    events = get_all_events()
+    if index is not None:
+        index.add_document(doc_id, content)
+        top_by_event = index.top_chunks_for_events(doc_id, events, top_k=5)
+    elif chunk_store is not None and doc_id in chunk_store:
+        top_by_event = chunk_store.top_chunks_for_events(doc_id, events, top_k=5)
+    elif backend == "vector":
+        top_by_event = {
+            ev.event_id: get_top_chunks_for_event(content, ev, top_k=5, backend="vector") for ev in events
+        }
+    else:
+        top_by_event = get_top_chunks_for_events(content, events, top_k=5)
+
+    ranked = []
+    for event_cfg in events:
+        top_chunks = top_by_event[event_cfg.event_id]
         if not top_chunks:
             # No sign of this event in the document
             continue
+        if deduper is not None:
+            top_chunks = drop_duplicate_chunks(top_chunks, deduper.threshold)
+        assembled = None
+        if context_tokens:
+            assembled = assemble_context(
+                [ch for ch, _ in top_chunks], event_cfg, context_tokens, doc.get("content") or None
+            )
+            top_chunks = [(passage, 0) for passage in assembled.passages]
+        ranked.append((event_cfg, top_chunks, assembled))
+    return ranked
+
+
+def _plan_event(
+    doc_id: str,
+    event_cfg: EventConfig,
+    top_chunks: List[Tuple[str, int]],
+    deduper: Optional[ExtractionDeduper],
+    assembled: Optional[AssembledContext] = None,
+) -> PlannedCall:
+    # Concatenate chunks with separators
+    combined_context = "\n\n---\n\n".join(ch for ch, _ in top_chunks)
+
+    system_prompt, user_prompt = build_extraction_prompt(
+        event_cfg.event_id,
+        event_cfg.name,
+        event_cfg.description,
+        combined_context,
+    )
 
-        # Concatenate chunks with separators
-        combined_context = "\n\n---\n\n".join(ch for ch, _ in top_chunks)
-
-        system_prompt, user_prompt = build_extraction_prompt(
-            event_cfg.event_id,
-            event_cfg.name,
-            event_cfg.description,
-            combined_context,
-        )
-
-        raw_output = call_llm(system_prompt, user_prompt)
-        parsed = safe_parse_json(raw_output)
-
-        record = {
-            "event": event_cfg.event_id,
-            "event_name": event_cfg.name,
-            "doc_id": doc_id,
-            "source": source,  # "lincoln" or "other"
-            "document_title": title,
-            "claims": parsed["claims"],
-            "temporal_details": parsed["temporal_details"],
-            "tone": parsed["tone"],
-        }
-        results.append(record)
+    hit, sig = None, None
+    if deduper is not None:
+        hit, sig = deduper.lookup(event_cfg.event_id, classify_source(doc_id), combined_context)
+        if hit:
+            deduper.record_reuse(system_prompt + user_prompt)
+    request = LLMRequest(custom_id(doc_id, event_cfg.event_id, "extract"), system_prompt, user_prompt)
+    return event_cfg, request, hit, sig, assembled
+
+
+def plan_extraction(
+    doc: Dict[str, Any],
+    deduper: Optional[ExtractionDeduper] = None,
+    index: Optional[BM25Index] = None,
+    backend: str = "keywords",
+    chunk_store: Optional[ChunkStore] = None,
+    context_tokens: Optional[int] = None,
+) -> List[PlannedCall]:
+    """
+    Retrieval and prompt building for one document, without calling the LLM:
+    one PlannedCall per event that has any matching chunks, in event order.
+    """
+    return [
+        _plan_event(doc["id"], event_cfg, top_chunks, deduper, assembled)
+        for event_cfg, top_chunks, assembled in rank_chunks(doc, deduper, index, backend, chunk_store, context_tokens)
+    ]
+
+
+def make_record(
+    doc: Dict[str, Any],
+    event_cfg: EventConfig,
+    parsed: Dict[str, Any],
+    reused_from: Optional[str] = None,
+    assembled: Optional[AssembledContext] = None,
+) -> Dict[str, Any]:
+    record = {
+        "event": event_cfg.event_id,
+        "event_name": event_cfg.name,
+        "doc_id": doc["id"],
+        "source": classify_source(doc["id"]),  # "lincoln" or "other"
+        "document_title": doc.get("title", ""),
+        "claims": parsed["claims"],
+        "temporal_details": parsed["temporal_details"],
+        # Tone is the author's: a reused result only vouches for the claims
+        "tone": parsed["tone"] if reused_from is None else None,
+    }
+    if reused_from is not None:
+        record["reused_from"] = reused_from
+    if assembled is not None:
+        # Context actually sent: tokens before / after assembly, document offsets
+        record["context"] = assembled.summary()
+        context.record(assembled)
+    return record
+
+
+def extract_for_document(
+    doc: Dict[str, Any],
+    deduper: Optional[ExtractionDeduper] = None,
+    index: Optional[BM25Index] = None,
+    backend: str = "keywords",
+    chunk_store: Optional[ChunkStore] = None,
+    context_tokens: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    For a single document, run extraction for all events.
+    Returns a list of event result records.
+
+    With a deduper, near-duplicate chunks are dropped from each context and a
+    context that near-duplicates one already extracted for the same event
+    from the same kind of source (classify_source) reuses its claims (the
+    record notes the source in "reused_from"; tone is left null).
+    With a BM25 index, chunks are ranked by BM25 instead of keyword counts
+    (the document is indexed first if it is new or changed); backend="vector"
+    ranks them with the local vector index instead. With a chunk store, the
+    keyword ranking is read from the prebuilt store and doc needs no content.
+    With context_tokens, each context is cut down to its most relevant
+    sentences within that budget (context.py). The document's LLM calls run
+    concurrently when MM_LLM_CONCURRENCY > 1.
+    """
+    results: List[Dict[str, Any]] = []
+
+    # Plan every event's prompt first, so the calls that are still needed can
+    # run concurrently (call_llm_many); records are then built in event order.
+    planned = plan_extraction(doc, deduper, index, backend, chunk_store, context_tokens)
+    outputs = iter(call_llm_many([req for _, req, hit, _, _ in planned if not hit]))
+
+    for event_cfg, _, hit, sig, assembled in planned:
+        reused_from = None
+        if hit:
+            reused_from, parsed = hit
+        else:
+            parsed = safe_parse_json(next(outputs))
+            if deduper is not None:
+                deduper.store(event_cfg.event_id, classify_source(doc["id"]), sig, doc["id"], parsed)
+        results.append(make_record(doc, event_cfg, parsed, reused_from, assembled))
 
     return results
 
 
-def main():
-    gutenberg_docs = load_jsonl(GUTENBERG_PATH)
-    loc_docs = load_jsonl(LOC_PATH)
-    all_docs = gutenberg_docs + loc_docs
+# ----------------------------------------------------------------------
+# Packed extraction (see packing.py)
+# ----------------------------------------------------------------------
+
+# A record waiting for its result: (document, event, result dict - filled in
+# once the call it depends on returns, doc_id it was reused from or None,
+# assembled context or None)
+PendingRecord = Tuple[Dict[str, Any], EventConfig, Dict[str, Any], Optional[str], Optional[AssembledContext]]
+
+
+def plan_packs(
+    docs: Iterable[Dict[str, Any]],
+    deduper: Optional[ExtractionDeduper] = None,
+    index: Optional[BM25Index] = None,
+    backend: str = "keywords",
+    chunk_store: Optional[ChunkStore] = None,
+    budget: int = PACK_TOKENS,
+    context_tokens: Optional[int] = None,
+) -> Iterator[Tuple[List[PendingRecord], Optional[List[WorkUnit]]]]:
+    """
+    Packed extraction plan over docs, without calling the LLM. Yields
+    (records, pack): the records planned since the previous yield, in
+    document and event order, and the next full pack (None at the end).
+
+    Each (document, event) pair gets an empty result dict that its pack's
+    call fills in. A near-duplicate context shares the dict of the context
+    it duplicates, so dedup works across packs as it does unpacked.
+    """
+    packer = Packer(budget)
+    records: List[PendingRecord] = []
+    for doc in docs:
+        contexts: List[Tuple[EventConfig, List[str]]] = []
+        results: Dict[str, Dict[str, Any]] = {}
+        for event_cfg, top_chunks, assembled in rank_chunks(doc, deduper, index, backend, chunk_store, context_tokens):
+            _, _, hit, sig, _ = _plan_event(doc["id"], event_cfg, top_chunks, deduper)
+            if hit:
+                reused_from, parsed = hit
+                records.append((doc, event_cfg, parsed, reused_from, assembled))
+                continue
+            parsed = {}
+            if deduper is not None:
+                deduper.store(event_cfg.event_id, classify_source(doc["id"]), sig, doc["id"], parsed)
+            contexts.append((event_cfg, [ch for ch, _ in top_chunks]))
+            results[event_cfg.event_id] = parsed
+            records.append((doc, event_cfg, parsed, None, assembled))
+
+        for unit in group_events(doc["id"], doc.get("title", ""), contexts, budget):
+            unit.results = {ev.event_id: results[ev.event_id] for ev in unit.events}
+            pack = packer.add(unit)
+            if pack is not None:
+                yield records, pack
+                records = []
+    yield records, packer.flush()
+
+
+def pack_request(pack: List[WorkUnit]) -> LLMRequest:
+    system_prompt, user_prompt = build_packed_extraction_prompt(pack)
+    first = pack[0]
+    return LLMRequest(custom_id(first.doc_id, first.events[0].event_id, "pack"), system_prompt, user_prompt)
+
+
+def single_request(unit: WorkUnit, event_cfg: EventConfig) -> LLMRequest:
+    """The unpacked request for one pair of a unit (same prompt, so same cache entry, as extract_for_document)."""
+    system_prompt, user_prompt = build_extraction_prompt(
+        event_cfg.event_id, event_cfg.name, event_cfg.description, unit.contexts[event_cfg.event_id]
+    )
+    return LLMRequest(custom_id(unit.doc_id, event_cfg.event_id, "extract"), system_prompt, user_prompt)
+
+
+def resolve_packs(packs: List[List[WorkUnit]], stats: Dict[str, int]) -> None:
+    """
+    Run the packed calls (concurrently when MM_LLM_CONCURRENCY > 1) and fill
+    in every unit's results. Pairs missing from a packed answer are asked
+    again on their own.
+    """
+    requests = [pack_request(p) for p in packs]
+    fallback: List[Tuple[WorkUnit, EventConfig]] = []
+    for pack, raw in zip(packs, call_llm_many(requests)):
+        found = parse_packed_output(raw, pack)
+        for unit in pack:
+            for ev in unit.events:
+                result = found.get((unit.doc_id, ev.event_id))
+                if result is None:
+                    fallback.append((unit, ev))
+                else:
+                    unit.results[ev.event_id].update(result)
+    singles = [single_request(unit, ev) for unit, ev in fallback]
+    for (unit, ev), raw in zip(fallback, call_llm_many(singles)):
+        unit.results[ev.event_id].update(safe_parse_json(raw))
+
+    stats["pairs"] += sum(len(unit.events) for pack in packs for unit in pack)
+    stats["calls"] += len(requests) + len(singles)
+    stats["fallback"] += len(singles)
+    stats["tokens"] += sum(estimate_tokens(r.system_prompt + r.user_prompt) for r in requests + singles)
+    stats["unpacked_tokens"] += sum(
+        estimate_tokens(r.system_prompt + r.user_prompt)
+        for r in (single_request(unit, ev) for pack in packs for unit in pack for ev in unit.events)
+    )
 
-    total_docs = len(all_docs)
-    print(f"[info] Loaded {total_docs} documents")
+
+def extract_packed(
+    docs: Iterable[Dict[str, Any]],
+    deduper: Optional[ExtractionDeduper] = None,
+    index: Optional[BM25Index] = None,
+    backend: str = "keywords",
+    chunk_store: Optional[ChunkStore] = None,
+    budget: int = PACK_TOKENS,
+    context_tokens: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Same records as extract_for_document over every doc, in the same order,
+    from packed calls. Packs are sent MM_LLM_CONCURRENCY at a time; a record
+    is yielded once its result and those of all earlier records are in.
+    """
+    stats = {"pairs": 0, "calls": 0, "fallback": 0, "tokens": 0, "unpacked_tokens": 0}
+    pending: List[PendingRecord] = []
+    ready: List[List[WorkUnit]] = []
+    failed: Set[int] = set()  # ids of result dicts whose call failed
+
+    def run(packs: List[List[WorkUnit]]) -> None:
+        try:
+            resolve_packs(packs, stats)
+        except Exception as e:
+            print(f"[error] Failed on pack starting at doc {packs[0][0].doc_id}: {e}")
+            failed.update(id(r) for pack in packs for unit in pack for r in unit.results.values())
+
+    def done() -> Iterator[Dict[str, Any]]:
+        while pending and (pending[0][2] or id(pending[0][2]) in failed):
+            doc, event_cfg, parsed, reused_from, assembled = pending.pop(0)
+            if id(parsed) not in failed:
+                yield make_record(doc, event_cfg, parsed, reused_from, assembled)
+
+    for records, pack in plan_packs(docs, deduper, index, backend, chunk_store, budget, context_tokens):
+        pending.extend(records)
+        if pack is not None:
+            ready.append(pack)
+        if len(ready) >= LLM_CONCURRENCY:
+            run(ready)
+            ready = []
+            yield from done()
+    if ready:
+        run(ready)
+    yield from done()
+
+    if stats["calls"]:
+        unpacked = stats["unpacked_tokens"]
+        print(f"[stats] packing: {stats['pairs']} (document, event) pairs in {stats['calls']} calls "
+              f"({stats['pairs'] / stats['calls']:.1f}x fewer), prompt tokens {unpacked:,} -> {stats['tokens']:,} "
+              f"({unpacked / max(1, stats['tokens']):.1f}x fewer), {stats['fallback']} pairs re-asked singly")
+
+
+def request_groups(
+    docs: Iterable[Dict[str, Any]],
+    dedup: bool = False,
+    index: Optional[BM25Index] = None,
+    backend: str = "keywords",
+    chunk_store: Optional[ChunkStore] = None,
+    pack: bool = False,
+    context_tokens: Optional[int] = None,
+    budget: int = PACK_TOKENS,
+) -> Iterator[Tuple[List[LLMRequest], List[int]]]:
+    """
+    Every LLM request a full run over docs will make, grouped the way the run
+    sends them (one document's events, or MM_LLM_CONCURRENCY packs, per
+    call_llm_many), each group with the number of (document, event) pairs
+    each request answers. Near-duplicate contexts are skipped the same way
+    extract_for_document skips them: the dedup decision depends only on
+    which contexts came earlier, not on their results. Pairs a packed answer
+    misses are re-asked singly at run time; those calls are not known here.
+    """
+    deduper = ExtractionDeduper() if dedup else None
+    if pack:
+        group: List[List[WorkUnit]] = []
+        for _, p in plan_packs(docs, deduper, index, backend, chunk_store, budget, context_tokens):
+            if p:
+                group.append(p)
+            if len(group) >= LLM_CONCURRENCY:
+                yield [pack_request(p) for p in group], [sum(len(u.events) for u in p) for p in group]
+                group = []
+        if group:
+            yield [pack_request(p) for p in group], [sum(len(u.events) for u in p) for p in group]
+        return
+    for doc in docs:
+        requests: List[LLMRequest] = []
+        for event_cfg, req, hit, sig, _ in plan_extraction(doc, deduper, index, backend, chunk_store, context_tokens):
+            if hit:
+                continue
+            requests.append(req)
+            if deduper is not None:
+                deduper.store(event_cfg.event_id, classify_source(doc["id"]), sig, doc["id"], {})  # placeholder result
+        if requests:
+            yield requests, [1] * len(requests)
+
+
+def batch_requests(
+    docs: Iterable[Dict[str, Any]],
+    dedup: bool = False,
+    index: Optional[BM25Index] = None,
+    backend: str = "keywords",
+    chunk_store: Optional[ChunkStore] = None,
+    pack: bool = False,
+    context_tokens: Optional[int] = None,
+    budget: int = PACK_TOKENS,
+) -> List[LLMRequest]:
+    """
+    Every LLM request a full run over docs will make, for Batch API mode
+    (packed requests with pack=True); see request_groups.
+    """
+    return [
+        req
+        for requests, _ in request_groups(docs, dedup, index, backend, chunk_store, pack, context_tokens, budget)
+        for req in requests
+    ]
+
+
+def iter_documents(
+    doc_ids: Optional[List[str]] = None,
+    shard: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Documents to process, in corpus order (Gutenberg, then LoC).
+    doc_ids fetches just those records through the id index; shard ("i/n")
+    takes a contiguous slice of each source.
+    """
+    for path in (GUTENBERG_PATH, LOC_PATH):
+        with DocStore(path) as docs:
+            if doc_ids:
+                yield from docs.get_many(d for d in doc_ids if d in docs)
+            elif shard:
+                yield from docs.iter_shard(*parse_shard(shard))
+            else:
+                yield from docs
+
+
+def with_content(stubs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Full records for chunk-store stubs, read through the id indexes. The
+    context assembler needs the content to give its passages source offsets.
+    """
+    stores = [DocStore(path) for path in (GUTENBERG_PATH, LOC_PATH)]
+    try:
+        for stub in stubs:
+            for docs in stores:
+                if stub["id"] in docs:
+                    yield docs.get(stub["id"])
+                    break
+            else:
+                yield stub
+    finally:
+        for docs in stores:
+            docs.close()
+
+
+def count_documents(
+    doc_ids: Optional[List[str]] = None,
+    shard: Optional[str] = None,
+) -> Tuple[int, List[str]]:
+    """
+    (how many documents iter_documents will yield, requested ids found in no
+    source) - answered from the id indexes, without decoding any record.
+    """
+    total = 0
+    found = set()
+    for path in (GUTENBERG_PATH, LOC_PATH):
+        with DocStore(path) as docs:
+            if doc_ids:
+                present = [d for d in doc_ids if d in docs]
+                total += len(present)
+                found.update(present)
+            elif shard:
+                i, n = parse_shard(shard)
+                total += len(docs) * (i + 1) // n - len(docs) * i // n
+            else:
+                total += len(docs)
+    return total, sorted(set(doc_ids or []) - found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract event claims from every document")
+    parser.add_argument("--doc-id", action="append", default=[],
+                        help="only these documents (repeatable), e.g. loc_mal4361300")
+    parser.add_argument("--shard", help="process slice i of n, e.g. 0/4")
+    parser.add_argument("--out", default=OUT_PATH)
+    parser.add_argument("--dedup", action="store_true",
+                        help="reuse the claims of a near-duplicate context (same event, same kind of "
+                             "source) instead of calling the LLM; those records carry \"reused_from\" "
+                             "and a null tone")
+    parser.add_argument("--retriever", choices=["keywords", "bm25", "vector"], default="keywords",
+                        help="chunk ranking: distinct-keyword count, the persistent BM25 index, "
+                             "or the local vector index")
+    parser.add_argument("--no-chunk-store", action="store_true",
+                        help="re-read and re-chunk the JSONL corpus instead of using the "
+                             "prebuilt chunk store (keywords retriever only)")
+    parser.add_argument("--pack", action="store_true",
+                        help="pack events with overlapping contexts and small documents into shared "
+                             "LLM calls (packing.py); implies --assemble, since whole-chunk contexts "
+                             "(~9k tokens for a Gutenberg event) leave no room to share a call")
+    parser.add_argument("--pack-tokens", type=int, default=PACK_TOKENS,
+                        help="context token budget per packed call; with the default --context-tokens "
+                             "about four assembled event contexts fit one call")
+    parser.add_argument("--assemble", action="store_true",
+                        help="send each event only its most relevant sentences, within --context-tokens "
+                             "(context.py); records note tokens before / after and source offsets")
+    parser.add_argument("--context-tokens", type=int, default=CONTEXT_TOKENS,
+                        help="token budget per context with --assemble (or --pack)")
+    parser.add_argument("--batch", metavar="JOB",
+                        help="run the LLM calls as OpenAI batch job JOB (half price, results within 24h); "
+                             "rerun with the same JOB to resume after an interruption")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="with --batch: submit / check the job once and exit instead of polling")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="build every prompt and report calls, tokens, cost and run time "
+                             "without calling the LLM (cost_plan.py)")
+    args = parser.parse_args()
+    context_tokens = args.context_tokens if args.assemble or args.pack else None
+    deduper = ExtractionDeduper() if args.dedup else None
+    index = BM25Index() if args.retriever == "bm25" else None
+    chunk_store = None
+    if args.retriever == "keywords" and not args.no_chunk_store:
+        # Warm start: mmap the prebuilt chunks (rebuilt only if the inputs changed)
+        chunk_store = load_chunk_store([GUTENBERG_PATH, LOC_PATH])
+
+    # Documents are streamed: the next one is read and decoded on a background
+    # thread while the current one waits on the LLM, and each record is written
+    # as soon as it is produced, so memory does not grow with the corpus.
+    def open_docs() -> Iterable[Dict[str, Any]]:
+        if chunk_store is not None:
+            stubs = chunk_store.iter_docs(args.doc_id, args.shard)  # ids + titles only
+            if context_tokens:
+                return prefetch(with_content(stubs))  # assembler offsets need the text
+            return stubs
+        return prefetch(iter_documents(args.doc_id, args.shard))
+
+    if chunk_store is not None:
+        stubs = list(chunk_store.iter_docs(args.doc_id, args.shard))  # ids + titles, never content
+        total_docs = len(stubs)
+        missing = sorted(set(args.doc_id) - {d["id"] for d in stubs})
+    else:
+        total_docs, missing = count_documents(args.doc_id, args.shard)
+    for doc_id in missing:
+        print(f"[warn] Unknown doc id: {doc_id}")
+
+    print(f"[info] Found {total_docs} documents")
+
+    if args.dry_run:
+        plan = CostPlan()
+        for requests, answers in request_groups(open_docs(), args.dedup, index, args.retriever, chunk_store,
+                                                args.pack, context_tokens, args.pack_tokens):
+            plan.add("extract", requests, answers)
+        plan.report()
+        context.report()
+        if index is not None:
+            index.close()
+        if chunk_store is not None:
+            chunk_store.close()
+        return
+
+    if args.batch:
+        # Run every prompt through the Batch API first; the pass below is then
+        # answered from the LLM cache.
+        requests = batch_requests(open_docs(), args.dedup, index, args.retriever, chunk_store, args.pack,
+                                  context_tokens, args.pack_tokens)
+        if not BatchJob(args.batch).run(requests, wait=not args.no_wait):
+            print(f"[info] Batch {args.batch} still running; rerun the same command to resume")
+            return
 
     count_records = 0
-    os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
 
-    with open(OUT_PATH, "w", encoding="utf-8") as out_f:
-        for i, doc in enumerate(all_docs, start=1):
+    def progress(docs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for i, doc in enumerate(docs, start=1):
             print(f"[info] Processing doc {i}/{total_docs}: {doc.get('id')} - {doc.get('title')}")
-            try:
-                doc_results = extract_for_document(doc)
-                for rec in doc_results:
-                    out_f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-                    count_records += 1
-            except Exception as e:
-                print(f"[error] Failed on doc {doc.get('id')}: {e}")
-
-    print(f"[ok] Wrote {count_records} event records to {OUT_PATH}")
+            yield doc
+
+    with JsonlWriter(args.out) as out_f:
+        if args.pack:
+            for rec in extract_packed(progress(open_docs()), deduper, index, args.retriever, chunk_store,
+                                      args.pack_tokens, context_tokens):
+                out_f.write(rec)
+                count_records += 1
+        else:
+            for doc in progress(open_docs()):
+                try:
+                    doc_results = extract_for_document(doc, deduper, index, args.retriever, chunk_store,
+                                                       context_tokens)
+                    for rec in doc_results:
+                        out_f.write(rec)
+                        count_records += 1
+                except Exception as e:
+                    print(f"[error] Failed on doc {doc.get('id')}: {e}")
+
+    print(f"[ok] Wrote {count_records} event records to {args.out}")
+    if deduper is not None:
+        deduper.report()
+    context.report()
+    llm_cache.report()
+    if index is not None:
+        index.close()
+    if chunk_store is not None:
+        chunk_store.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,253 @@
+# src/part2_events/keywords.py
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+# --- Make sure src/ is on sys.path so we can import sibling packages ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part2_events.config import EventConfig
+
+# Optional C implementation of the same automaton (pip install pyahocorasick).
+try:
+    import ahocorasick  # type: ignore
+except ImportError:
+    ahocorasick = None
+
+# Below these many distinct keywords, one C-level `kw in text` per keyword beats
+# an automaton (see the benchmark in main()); above them the single scan wins
+# and keeps winning as the catalog grows.
+C_AUTOMATON_MIN_KEYWORDS = 64
+PY_AUTOMATON_MIN_KEYWORDS = 700
+
+
+@dataclass
+class EventHits:
+    count: int = 0                                   # keyword occurrences
+    positions: List[Tuple[int, str]] = field(default_factory=list)  # (start, keyword)
+    keywords: Dict[str, int] = field(default_factory=dict)          # keyword -> occurrences
+
+
+class _Automaton:
+    """Plain Aho-Corasick: trie + failure links, outputs merged along the fail chain."""
+
+    def __init__(self, patterns: Sequence[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+        for pid, pat in enumerate(patterns):
+            state = 0
+            for ch in pat:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(pid)
+
+        # Depth-1 states fail to the root; deeper ones are filled in BFS order.
+        queue: Deque[int] = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter(self, text: str):
+        """Yield (end_index, pattern_id) for every occurrence, overlaps included."""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for pid in out[state]:
+                    yield i, pid
+
+
+class KeywordMatcher:
+    """
+    All events' keywords compiled into one automaton, so a chunk is scanned
+    once no matter how many events or keywords there are:
+
+        matcher = KeywordMatcher(get_all_events())
+        hits = matcher.scan(chunk.lower())      # {event_id: EventHits}
+        scores = matcher.scores(chunk.lower())  # {event_id: score}
+
+    Matching is case-sensitive on purpose: callers pass lowercased text and
+    keywords are lowercased here, exactly like score_chunk_for_event.
+    """
+
+    def __init__(self, events: Sequence[EventConfig], engine: Optional[str] = None):
+        self.event_ids = [ev.event_id for ev in events]
+        pattern_ids: Dict[str, int] = {}
+        # pattern id -> [(event_id, times listed in that event's keywords)]
+        self.owners: List[List[Tuple[str, int]]] = []
+        for ev in events:
+            for kw in ev.keywords:
+                kw = kw.lower()
+                if not kw:
+                    continue
+                pid = pattern_ids.setdefault(kw, len(pattern_ids))
+                if pid == len(self.owners):
+                    self.owners.append([])
+                owners = self.owners[pid]
+                if owners and owners[-1][0] == ev.event_id:
+                    owners[-1] = (ev.event_id, owners[-1][1] + 1)
+                else:
+                    owners.append((ev.event_id, 1))
+        self.patterns = list(pattern_ids)
+
+        if engine is None:
+            if ahocorasick is not None and len(self.patterns) >= C_AUTOMATON_MIN_KEYWORDS:
+                engine = "c"
+            elif len(self.patterns) >= PY_AUTOMATON_MIN_KEYWORDS:
+                engine = "python"
+            else:
+                engine = "substring"
+        self.engine = engine
+
+        if engine == "c":
+            if ahocorasick is None:
+                raise ImportError("engine 'c' needs the pyahocorasick package")
+            self._c = ahocorasick.Automaton()
+            for pid, pat in enumerate(self.patterns):
+                self._c.add_word(pat, pid)
+            self._c.make_automaton()
+        elif engine == "python":
+            self._py = _Automaton(self.patterns)
+        elif engine != "substring":
+            raise ValueError(f"Unknown engine {engine!r}")
+
+    def _matches(self, text: str):
+        """(start, pattern_id) for every occurrence."""
+        if self.engine == "c":
+            if not self.patterns:
+                return
+            for end, pid in self._c.iter(text):
+                yield end - len(self.patterns[pid]) + 1, pid
+        elif self.engine == "python":
+            for end, pid in self._py.iter(text):
+                yield end - len(self.patterns[pid]) + 1, pid
+        else:
+            for pid, pat in enumerate(self.patterns):
+                start = text.find(pat)
+                while start != -1:
+                    yield start, pid
+                    start = text.find(pat, start + 1)
+
+    def scan(self, text: str) -> Dict[str, EventHits]:
+        """Per-event hit counts and (start, keyword) positions, from one pass."""
+        hits = {event_id: EventHits() for event_id in self.event_ids}
+        for start, pid in self._matches(text):
+            kw = self.patterns[pid]
+            for event_id, _ in self.owners[pid]:
+                h = hits[event_id]
+                h.count += 1
+                h.positions.append((start, kw))
+                h.keywords[kw] = h.keywords.get(kw, 0) + 1
+        for h in hits.values():
+            h.positions.sort()
+        return hits
+
+    def scores(self, text: str) -> Dict[str, int]:
+        """
+        {event_id: number of the event's keywords present} - the same numbers
+        score_chunk_for_event gives, for every event at once.
+        """
+        scores = dict.fromkeys(self.event_ids, 0)
+        if self.engine == "substring":
+            found = [pid for pid, pat in enumerate(self.patterns) if pat in text]
+        else:
+            found = set(pid for _, pid in self._matches(text))
+        for pid in found:
+            for event_id, weight in self.owners[pid]:
+                scores[event_id] += weight
+        return scores
+
+
+# ----------------------------------------------------------------------
+# Benchmark: scaling with the number of keywords
+# ----------------------------------------------------------------------
+
+def synthetic_events(text: str, n_keywords: int, per_event: int = 20, seed: int = 0) -> List[EventConfig]:
+    """Fake catalog of 1-3 word phrases sampled from real text, per_event keywords each."""
+    rng = random.Random(seed)
+    words = text.lower().split()
+    events: List[EventConfig] = []
+    for e in range(0, n_keywords, per_event):
+        kws = []
+        for _ in range(min(per_event, n_keywords - e)):
+            i = rng.randrange(len(words) - 3)
+            kws.append(" ".join(words[i:i + rng.randint(1, 3)]))
+        events.append(EventConfig(f"synthetic_{e}", f"Synthetic {e}", "", kws))
+    return events
+
+
+def main():
+    from part1_data.docstore import DocStore
+    from part2_events.config import get_all_events
+    from part2_events.retrieval import chunk_document, score_chunk_for_event
+
+    parser = argparse.ArgumentParser(description="Keyword matcher check + scaling benchmark")
+    parser.add_argument("--path", default="data/processed/gutenberg_lincoln.jsonl")
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--sizes", default="33,100,400,1600,6400")
+    args = parser.parse_args()
+
+    with DocStore(args.path) as docs:
+        doc = docs.get(docs.ids()[0])
+    chunks = chunk_document(doc["content"], persist=False).lowered[:args.chunks]
+    engines = ["substring", "python"] + (["c"] if ahocorasick is not None else [])
+
+    # Differential check on the real event catalog
+    events = get_all_events()
+    mismatches = 0
+    for engine in engines:
+        matcher = KeywordMatcher(events, engine=engine)
+        for ch in chunks:
+            expected = {ev.event_id: score_chunk_for_event(ch, ev) for ev in events}
+            if matcher.scores(ch) != expected:
+                mismatches += 1
+    print(f"[check] {len(chunks)} chunks x {len(engines)} engines, {mismatches} mismatches")
+
+    for n in [int(x) for x in args.sizes.split(",")]:
+        catalog = synthetic_events(doc["content"], n)
+        line = [f"[bench] {n:>5} keywords:"]
+        start = time.perf_counter()
+        for ch in chunks:
+            for ev in catalog:
+                score_chunk_for_event(ch, ev)
+        line.append(f"per-event loop {(time.perf_counter() - start) * 1000 / len(chunks):7.2f} ms/chunk")
+        for engine in engines:
+            matcher = KeywordMatcher(catalog, engine=engine)
+            start = time.perf_counter()
+            for ch in chunks:
+                matcher.scores(ch)
+            line.append(f"{engine} {(time.perf_counter() - start) * 1000 / len(chunks):7.2f}")
+        print("  ".join(line))
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+# src/part2_events/llm_batch.py
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from openai import OpenAI
+
+if __package__ is None or __package__ == "":
+    # Running as a script: add src/ to sys.path and use absolute imports
+    import sys
+
+    current_file = os.path.abspath(__file__)
+    src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+    if src_dir not in sys.path:
+        sys.path.append(src_dir)
+
+    from part2_events.llm_cache import CACHE_MODE, LLMCache, cache_key, get_cache
+    from part2_events.llm_client import LLMRequest, _get_client, chat_messages
+else:
+    from .llm_cache import CACHE_MODE, LLMCache, cache_key, get_cache
+    from .llm_client import LLMRequest, _get_client, chat_messages
+
+# Offline execution through the OpenAI Batch API: half the price, no
+# per-minute rate limits, results within 24h.
+#
+# A job is named by the caller (e.g. --batch extract-2024-06) and lives in
+# BATCH_DIR/<job>/:
+#   state.json          fingerprint of the request set + one entry per part
+#                       (input / batch / output file ids, status, collected)
+#   part-000.jsonl      batch input, one chat completion request per line
+#   part-000.keys.json  custom_id -> [cache key, model]
+#
+# Results are streamed from the output file into the LLM response cache, so a
+# pipeline stage uses a batch by planning its prompts, running the job, and
+# then running normally: every call is answered from the cache and lands on
+# the same output record as an interactive run. Requests that are already
+# cached are never submitted; requests the batch failed on are simply called
+# live in that normal pass.
+#
+# The state file is rewritten after every step, so a job survives restarts:
+# rerunning the same command with the same job name resumes polling (or
+# collecting) instead of submitting again.
+
+BATCH_DIR = os.environ.get("MM_BATCH_DIR", "data/batches")
+POLL_S = float(os.environ.get("MM_BATCH_POLL_S", "60"))
+ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+MAX_REQUESTS = 50_000            # API limits per batch input file
+MAX_BYTES = 190 * 1024 * 1024    # (200 MB, with headroom)
+BATCH_PRICE_FACTOR = 0.5         # batch requests are billed at half price
+TERMINAL = ("completed", "failed", "expired", "cancelled")
+
+
+def custom_id(doc_id: str, event: str, strategy: str, run: int = 0) -> str:
+    """Stable request id for (document, event, prompt strategy, repeated draw)."""
+    return f"{doc_id}|{event}|{strategy}|{run}"
+
+
+def _key(req: LLMRequest) -> str:
+    return cache_key(req.model, chat_messages(req.system_prompt, req.user_prompt), req.temperature, req.sample)
+
+
+def _fingerprint(requests: List[LLMRequest]) -> str:
+    h = hashlib.sha256()
+    for req in requests:
+        h.update(f"{req.request_id}\t{_key(req)}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+class BatchJob:
+    """
+    One named batch job:
+
+        job = BatchJob("extract-v2")
+        done = job.run(requests)        # submit (or resume), poll, collect
+    """
+
+    def __init__(
+        self,
+        name: str,
+        client: Optional[OpenAI] = None,
+        batch_dir: str = BATCH_DIR,
+        poll_s: float = POLL_S,
+        cache: Optional[LLMCache] = None,
+    ):
+        self.name = name
+        self.dir = os.path.join(batch_dir, name)
+        self.state_path = os.path.join(self.dir, "state.json")
+        self.client = client
+        self.poll_s = poll_s
+        self.cache = cache or get_cache()
+        self.state: Dict[str, Any] = self._load_state()
+
+    def _api(self) -> OpenAI:
+        if self.client is None:
+            self.client = _get_client()
+        return self.client
+
+    def _load_state(self) -> Dict[str, Any]:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self) -> None:
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_path)  # atomic: a crash leaves the old or the new state
+
+    @property
+    def finished(self) -> bool:
+        return bool(self.state) and all(p["collected"] for p in self.state["parts"])
+
+    # ------------------------------------------------------------------
+    # prepare
+    # ------------------------------------------------------------------
+
+    def prepare(self, requests: Iterable[LLMRequest]) -> None:
+        """Write the input parts for requests not yet cached (kept as-is if this request set was prepared before)."""
+        if CACHE_MODE != "on":
+            raise RuntimeError("Batch mode delivers results through the LLM cache; set MM_LLM_CACHE=on")
+        unique: Dict[str, LLMRequest] = {}
+        for req in requests:
+            seen = unique.setdefault(req.request_id, req)
+            if seen is not req and _key(seen) != _key(req):
+                # Results are matched back by custom_id: one of the two would get the other's answer
+                raise ValueError(f"Two different prompts share the request id {req.request_id!r}")
+        reqs = list(unique.values())
+        fingerprint = _fingerprint(reqs)
+        if self.state.get("fingerprint") == fingerprint:
+            return  # same request set: resume
+        if self.state and not self.finished:
+            raise RuntimeError(
+                f"Batch job {self.name!r} is still in flight for a different request set; "
+                f"use a new job name or cancel it (llm_batch cancel {self.name})"
+            )
+
+        os.makedirs(self.dir, exist_ok=True)
+        parts: List[Dict[str, Any]] = []
+        lines: List[bytes] = []
+        keys: Dict[str, List[str]] = {}
+        size = 0
+        cached = 0
+
+        def flush() -> None:
+            nonlocal lines, keys, size
+            if not lines:
+                return
+            name = f"part-{len(parts):03d}"
+            with open(os.path.join(self.dir, name + ".jsonl"), "wb") as f:
+                f.writelines(lines)
+            with open(os.path.join(self.dir, name + ".keys.json"), "w", encoding="utf-8") as f:
+                json.dump(keys, f)
+            parts.append({
+                "name": name, "requests": len(lines), "input_file_id": None, "batch_id": None,
+                "status": "new", "output_file_id": None, "error_file_id": None, "collected": False,
+            })
+            lines, keys, size = [], {}, 0
+
+        for req in reqs:
+            messages = chat_messages(req.system_prompt, req.user_prompt)
+            key = _key(req)
+            if self.cache.contains(key):
+                cached += 1
+                continue
+            line = json.dumps({
+                "custom_id": req.request_id,
+                "method": "POST",
+                "url": ENDPOINT,
+                "body": {"model": req.model, "messages": messages, "temperature": req.temperature},
+            }, ensure_ascii=False).encode("utf-8") + b"\n"
+            if len(lines) >= MAX_REQUESTS or size + len(line) > MAX_BYTES:
+                flush()
+            lines.append(line)
+            keys[req.request_id] = [key, req.model]
+            size += len(line)
+        flush()
+
+        self.state = {
+            "fingerprint": fingerprint,
+            "requests": len(reqs),
+            "cached": cached,
+            "parts": parts,
+            "created_at": time.time(),
+        }
+        self._save_state()
+        print(f"[info] Batch {self.name}: {len(reqs)} requests, {cached} already cached, "
+              f"{len(reqs) - cached} to submit in {len(parts)} part(s)")
+
+    # ------------------------------------------------------------------
+    # submit / poll / collect
+    # ------------------------------------------------------------------
+
+    def submit(self) -> None:
+        api = self._api()
+        for part in self.state["parts"]:
+            if part["input_file_id"] is None:
+                with open(os.path.join(self.dir, part["name"] + ".jsonl"), "rb") as f:
+                    part["input_file_id"] = api.files.create(file=f, purpose="batch").id
+                self._save_state()
+            if part["batch_id"] is None:
+                # A crash between create() and saving the state must not submit twice
+                batch = self._find_submitted(part)
+                action = "found already submitted"
+                if batch is None:
+                    batch = api.batches.create(
+                        input_file_id=part["input_file_id"],
+                        endpoint=ENDPOINT,
+                        completion_window=COMPLETION_WINDOW,
+                        metadata={"job": self.name, "part": part["name"]},
+                    )
+                    action = "submitted"
+                part["batch_id"] = batch.id
+                part["status"] = batch.status
+                self._save_state()
+                print(f"[info] Batch {self.name}/{part['name']}: {action} {part['requests']} requests as {batch.id}")
+
+    def _find_submitted(self, part: Dict[str, Any]) -> Any:
+        for batch in self._api().batches.list(limit=100).data:  # most recent first
+            if batch.input_file_id == part["input_file_id"] and (batch.metadata or {}).get("job") == self.name:
+                return batch
+        return None
+
+    def poll(self) -> bool:
+        """Refresh every unfinished part once; True when all have reached a terminal status."""
+        api = self._api()
+        for part in self.state["parts"]:
+            if part["status"] in TERMINAL or part["batch_id"] is None:
+                continue
+            batch = api.batches.retrieve(part["batch_id"])
+            part["status"] = batch.status
+            part["output_file_id"] = batch.output_file_id
+            part["error_file_id"] = batch.error_file_id
+            counts = batch.request_counts
+            done = f"{counts.completed}/{counts.total} done, {counts.failed} failed" if counts else ""
+            print(f"[info] Batch {self.name}/{part['name']}: {batch.status} {done}")
+        self._save_state()
+        return all(p["status"] in TERMINAL for p in self.state["parts"])
+
+    def collect(self) -> None:
+        """Stream each finished part's output file into the LLM cache."""
+        api = self._api()
+        for part in self.state["parts"]:
+            if part["collected"] or part["status"] not in TERMINAL:
+                continue
+            with open(os.path.join(self.dir, part["name"] + ".keys.json"), "r", encoding="utf-8") as f:
+                keys = json.load(f)
+            stored = failed = 0
+            if part["output_file_id"]:
+                with api.files.with_streaming_response.content(part["output_file_id"]) as resp:
+                    for line in resp.iter_lines():
+                        if not line.strip():
+                            continue
+                        row = json.loads(line)
+                        response = row.get("response") or {}
+                        body = response.get("body") or {}
+                        if row.get("error") or response.get("status_code") != 200 or row["custom_id"] not in keys:
+                            failed += 1
+                            continue
+                        key, model = keys[row["custom_id"]]
+                        content = body["choices"][0]["message"]["content"]
+                        usage = body.get("usage") or {}
+                        self.cache.put(key, model, content, usage.get("prompt_tokens", 0),
+                                  usage.get("completion_tokens", 0), price_factor=BATCH_PRICE_FACTOR)
+                        stored += 1
+            missing = part["requests"] - stored
+            part["collected"] = True
+            self._save_state()
+            status = "[ok]" if not missing else "[warn]"
+            print(f"{status} Batch {self.name}/{part['name']} {part['status']}: {stored} results cached, "
+                  f"{missing} without a result (called live in the normal pass)")
+
+    def run(self, requests: Iterable[LLMRequest], wait: bool = True) -> bool:
+        """
+        prepare + submit + poll + collect. With wait=False, returns after one
+        poll; the return value says whether every result has been collected.
+        """
+        self.prepare(requests)
+        if self.finished:
+            return True
+        self.submit()
+        while not self.poll():
+            self.collect()  # parts finish independently
+            if not wait:
+                return False
+            time.sleep(self.poll_s)
+        self.collect()
+        return True
+
+    def cancel(self) -> None:
+        api = self._api()
+        for part in self.state.get("parts", []):
+            if part["batch_id"] and part["status"] not in TERMINAL:
+                part["status"] = api.batches.cancel(part["batch_id"]).status
+                print(f"[info] Batch {self.name}/{part['name']}: {part['status']}")
+        self._save_state()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect / control OpenAI Batch API jobs")
+    parser.add_argument("cmd", choices=["status", "poll", "cancel"])
+    parser.add_argument("job")
+    args = parser.parse_args()
+
+    job = BatchJob(args.job)
+    if not job.state:
+        print(f"[error] No batch job named {args.job!r} in {BATCH_DIR}")
+        return
+    if args.cmd == "poll":
+        if job.poll():
+            job.collect()
+    elif args.cmd == "cancel":
+        job.cancel()
+    for part in job.state["parts"]:
+        print(f"[info] {part['name']}: {part['requests']} requests, {part['status']}, "
+              f"batch {part['batch_id']}, collected={part['collected']}")
+    print(f"[info] {job.state['requests']} requests ({job.state['cached']} were cached), "
+          f"finished={job.finished}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# src/part2_events/llm_cache.py
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Persistent cache of chat completions, shared by every stage through
+# llm_client.call_llm. One SQLite file in WAL mode, so parallel workers (and
+# the extractor + judge running side by side) read and write it concurrently.
+#
+# Key = sha256 of (model, messages, temperature, sample). `sample` is the
+# index of a repeated draw of the same prompt (self-consistency runs at
+# temperature > 0): each draw gets its own entry, so a rerun replays the same
+# five answers instead of collapsing them into one.
+#
+# MM_LLM_CACHE selects the mode:
+#   on       read + write (default)
+#   refresh  always call the API, overwrite the cached answer
+#   off      bypass the cache completely
+
+CACHE_PATH = os.environ.get("MM_LLM_CACHE_PATH", "data/cache/llm.sqlite")
+CACHE_MODE = os.environ.get("MM_LLM_CACHE", "on")
+MODES = ("on", "refresh", "off")
+MAX_BYTES = 256 * 1024 * 1024  # size-based eviction, least recently used first
+MAX_AGE_DAYS = 90              # age-based eviction, by last use
+EVICT_EVERY = 500              # writes between automatic eviction passes
+
+# USD per 1M (input, output) tokens, for the "saved" figures.
+PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_used ON responses(used_at);
+"""
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], temperature: float, sample: int = 0) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "sample": sample},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def request_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price_in, price_out = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1e6
+
+
+class LLMCache:
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._writes = 0
+        # this process only
+        self.hits = 0
+        self.misses = 0
+        self.saved_usd = 0.0
+        self.spent_usd = 0.0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT response, cost FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE responses SET used_at = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+            )
+        self.hits += 1
+        self.saved_usd += row[1]
+        return row[0]
+
+    def contains(self, key: str) -> bool:
+        """Whether key is cached, without counting a lookup or touching its last use."""
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is not None
+
+    def put(
+        self,
+        key: str,
+        model: str,
+        response: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        price_factor: float = 1.0,
+    ) -> None:
+        """Store a response; price_factor scales its cost (0.5 for Batch API results)."""
+        cost = request_cost(model, prompt_tokens, completion_tokens) * price_factor
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, prompt_tokens, completion_tokens, cost, size, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, prompt_tokens, completion_tokens, cost,
+                 len(response.encode("utf-8")), now, now),
+            )
+            self._writes += 1
+        self.spent_usd += cost
+        if self._writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self, max_bytes: int = MAX_BYTES, max_age_days: float = MAX_AGE_DAYS) -> int:
+        """Drop entries unused for max_age_days, then least recently used ones until under max_bytes."""
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.execute("DELETE FROM responses WHERE used_at < ?", (time.time() - max_age_days * 86400,))
+            total = self.conn.execute("SELECT coalesce(sum(size), 0) FROM responses").fetchone()[0]
+            if total > max_bytes:
+                # Walk from the oldest use until enough bytes are freed.
+                cutoff = None
+                freed = 0
+                for used_at, size in self.conn.execute("SELECT used_at, size FROM responses ORDER BY used_at"):
+                    freed += size
+                    cutoff = used_at
+                    if total - freed <= max_bytes:
+                        break
+                self.conn.execute("DELETE FROM responses WHERE used_at <= ?", (cutoff,))
+            return self.conn.total_changes - before
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals over the whole cache file (all runs)."""
+        with self._lock:
+            n, size, hits, saved = self.conn.execute(
+                "SELECT count(*), coalesce(sum(size), 0), coalesce(sum(hits), 0), "
+                "coalesce(sum(hits * cost), 0) FROM responses"
+            ).fetchone()
+        return {"entries": n, "bytes": size, "hits": hits, "saved_usd": saved}
+
+    def report(self) -> None:
+        lookups = self.hits + self.misses
+        if not lookups:
+            return
+        print(f"[stats] LLM cache: {self.hits}/{lookups} hits ({self.hits / lookups:.0%}), "
+              f"${self.saved_usd:.4f} saved, ${self.spent_usd:.4f} spent on new calls")
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+_cache: Optional[LLMCache] = None
+
+
+def get_cache() -> LLMCache:
+    """The process-wide cache at CACHE_PATH, opened on first use."""
+    global _cache
+    if _cache is None:
+        _cache = LLMCache(CACHE_PATH)
+    return _cache
+
+
+def report() -> None:
+    """Hit rate and dollars saved for this process (no-op if the cache was never used)."""
+    if _cache is not None:
+        _cache.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent LLM response cache")
+    parser.add_argument("--path", default=CACHE_PATH)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="entries, size, hits and dollars saved so far")
+    p_evict = sub.add_parser("evict", help="apply size / age limits now")
+    p_evict.add_argument("--max-mb", type=float, default=MAX_BYTES / 1024 / 1024)
+    p_evict.add_argument("--max-age-days", type=float, default=MAX_AGE_DAYS)
+    sub.add_parser("clear", help="delete every cached response")
+    args = parser.parse_args()
+
+    cache = LLMCache(args.path)
+    if args.cmd == "stats":
+        s = cache.stats()
+        print(f"[stats] {s['entries']} entries, {s['bytes'] / 1e6:.2f} MB, "
+              f"{s['hits']} hits, ${s['saved_usd']:.4f} saved")
+    elif args.cmd == "evict":
+        n = cache.evict(int(args.max_mb * 1024 * 1024), args.max_age_days)
+        print(f"[ok] Evicted {n} entries")
+    else:
+        with cache.conn:
+            n = cache.conn.execute("DELETE FROM responses").rowcount
+        print(f"[ok] Cleared {n} entries")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,26 @@
 # src/part2_events/llm_client.py
 
+import asyncio
 import os
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
-from openai import OpenAI
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncOpenAI,
+    OpenAI,
+)
+
+from .dedup import estimate_tokens
+from .llm_cache import CACHE_MODE, MODES, cache_key, get_cache
 
 # Load .env explicitly from project root
 try:
@@ -16,6 +33,17 @@ try:
 except ImportError:
     pass
 
+# Concurrent execution (AsyncLLMEngine / call_llm_many). MM_LLM_CONCURRENCY=1
+# keeps the old one-request-at-a-time behaviour; the RPM / TPM budgets default
+# to the gpt-4o-mini tier-1 limits.
+LLM_CONCURRENCY = int(os.environ.get("MM_LLM_CONCURRENCY", "1"))
+LLM_RPM = int(os.environ.get("MM_LLM_RPM", "500"))
+LLM_TPM = int(os.environ.get("MM_LLM_TPM", "200000"))
+MAX_RETRIES = 6
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 60.0
+COMPLETION_TOKENS_EST = 512  # reserved per request until the real usage is known
+
 
 def _get_api_key() -> str:
     api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
@@ -24,7 +52,29 @@ def _get_api_key() -> str:
     return api_key
 
 
-_client = OpenAI(api_key=_get_api_key())
+_client: Optional[OpenAI] = None
+
+
+def _get_client() -> OpenAI:
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=_get_api_key())
+    return _client
+
+
+def chat_messages(system_prompt: str, user_prompt: str) -> List[dict]:
+    """The messages call_llm sends (and keys the cache by) for a prompt pair."""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _cache_mode(cache: Optional[str]) -> str:
+    mode = cache or CACHE_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown cache mode {mode!r}")
+    return mode
 
 
 def call_llm(
@@ -32,13 +82,323 @@ def call_llm(
     user_prompt: str,
     model: str = "gpt-4o-mini",
     temperature: float = 0.2,
+    sample: int = 0,
+    cache: Optional[str] = None,
 ) -> str:
-    resp = _client.chat.completions.create(
+    """
+    One chat completion, answered from the persistent response cache when the
+    same request was made before (see llm_cache). `sample` numbers repeated
+    draws of one prompt so each is cached separately; `cache` overrides the
+    MM_LLM_CACHE mode ("on", "refresh", "off") for this call.
+    """
+    mode = _cache_mode(cache)
+    messages = chat_messages(system_prompt, user_prompt)
+    key = cache_key(model, messages, temperature, sample)
+    if mode == "on":
+        cached = get_cache().get(key)
+        if cached is not None:
+            return cached
+
+    resp = _get_client().chat.completions.create(
         model=model,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
+        messages=messages,
         temperature=temperature,
     )
-    return resp.choices[0].message.content
+    content = resp.choices[0].message.content
+    if mode != "off" and content is not None:
+        usage = resp.usage
+        get_cache().put(
+            key, model, content,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0,
+        )
+    return content
+
+
+# ----------------------------------------------------------------------
+# Concurrent execution
+# ----------------------------------------------------------------------
+
+@dataclass
+class LLMRequest:
+    request_id: str
+    system_prompt: str
+    user_prompt: str
+    model: str = "gpt-4o-mini"
+    temperature: float = 0.2
+    sample: int = 0
+
+
+@dataclass
+class LLMResult:
+    request_id: str
+    content: Optional[str] = None
+    error: Optional[str] = None
+    cached: bool = False
+    attempts: int = 0
+    seconds: float = 0.0
+    usage: Tuple[int, int] = (0, 0)  # (prompt, completion) tokens
+    index: int = -1  # position of the request in the stream() / map() input
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class RateLimiter:
+    """
+    Token buckets for requests and tokens per minute. Each bucket holds up to a
+    minute's budget and refills continuously; acquire() waits until both can
+    cover the request. Token costs are estimates, corrected with settle() once
+    the response reports real usage.
+    """
+    rpm: int
+    tpm: int
+    _requests: float = field(init=False)
+    _tokens: float = field(init=False)
+    _stamp: float = field(init=False)
+    _lock: asyncio.Lock = field(init=False, default_factory=asyncio.Lock)
+
+    def __post_init__(self) -> None:
+        self._requests = float(self.rpm)
+        self._tokens = float(self.tpm)
+        self._stamp = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._stamp
+        self._stamp = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int) -> None:
+        tokens = min(tokens, self.tpm)  # a single huge request must still fit eventually
+        async with self._lock:  # FIFO: later requests queue behind this one
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60 / self.rpm if self._requests < 1 else 0.0,
+                    (tokens - self._tokens) * 60 / self.tpm if self._tokens < tokens else 0.0,
+                )
+                await asyncio.sleep(wait)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        self._refill()
+        self._tokens = min(self.tpm, self._tokens + estimated - actual)
+
+
+def _retry_after(exc: APIStatusError) -> Optional[float]:
+    """The server's requested delay, clamped to [0, BACKOFF_MAX_S]."""
+    headers = exc.response.headers
+    try:
+        if "retry-after-ms" in headers:
+            delay = float(headers["retry-after-ms"]) / 1000
+        elif "retry-after" in headers:
+            delay = float(headers["retry-after"])
+        else:
+            return None
+    except ValueError:
+        return None  # HTTP-date form: fall back to exponential backoff
+    return min(BACKOFF_MAX_S, max(0.0, delay))
+
+
+class AsyncLLMEngine:
+    """
+    Runs many chat completions concurrently on AsyncOpenAI:
+
+        engine = AsyncLLMEngine(concurrency=16)
+        for res in engine.map(requests):        # results as they complete
+            ...
+        engine.close()
+
+    At most `concurrency` requests are in flight; a RateLimiter keeps the run
+    inside the RPM / TPM budget; 429s, 5xx and connection errors are retried
+    with exponential backoff (or after the server's Retry-After). Responses
+    go through the same cache as call_llm. The engine owns an event loop on a
+    background thread, so plain synchronous code can use map() directly;
+    async code can await complete() / iterate stream() on that loop instead.
+
+    base_url points it at any OpenAI-compatible server, e.g. the local
+    stand-in in part2_events.llm_stand_in.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        rpm: int = LLM_RPM,
+        tpm: int = LLM_TPM,
+        max_retries: int = MAX_RETRIES,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        cache: Optional[str] = None,
+        backoff_base_s: float = BACKOFF_BASE_S,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.base_url = base_url
+        self.api_key = api_key
+        self.cache_mode = _cache_mode(cache)
+        self.backoff_base_s = backoff_base_s
+        self.retries = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-engine", daemon=True)
+        self._thread.start()
+        self._client: Optional[AsyncOpenAI] = None
+        self._limiter: Optional[RateLimiter] = None
+
+    def _setup(self) -> None:
+        # Created on the engine's loop: httpx connection pools are loop-bound.
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key or _get_api_key(),
+                base_url=self.base_url,
+                max_retries=0,  # retries are ours, so they respect the rate limiter
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=self.concurrency),
+                    timeout=httpx.Timeout(120.0, connect=10.0),
+                ),
+            )
+            self._limiter = RateLimiter(self.rpm, self.tpm)
+
+    async def complete(self, req: LLMRequest) -> LLMResult:
+        self._setup()
+        assert self._client is not None and self._limiter is not None
+        start = time.perf_counter()
+        messages = chat_messages(req.system_prompt, req.user_prompt)
+        key = cache_key(req.model, messages, req.temperature, req.sample)
+        if self.cache_mode == "on":
+            cached = get_cache().get(key)
+            if cached is not None:
+                return LLMResult(req.request_id, cached, cached=True, seconds=time.perf_counter() - start)
+
+        estimated = estimate_tokens(req.system_prompt + req.user_prompt) + COMPLETION_TOKENS_EST
+        error = ""
+        for attempt in range(1, self.max_retries + 2):
+            await self._limiter.acquire(estimated)
+            try:
+                resp = await self._client.chat.completions.create(
+                    model=req.model, messages=messages, temperature=req.temperature,  # type: ignore[arg-type]
+                )
+            except (APIConnectionError, APITimeoutError, APIStatusError) as e:
+                status = getattr(e, "status_code", None)
+                if status is not None and status != 429 and status < 500:
+                    return LLMResult(req.request_id, error=f"{type(e).__name__}: {e}",
+                                     attempts=attempt, seconds=time.perf_counter() - start)
+                error = f"{type(e).__name__}: {e}"
+                if attempt > self.max_retries:
+                    break
+                self.retries += 1
+                delay = _retry_after(e) if isinstance(e, APIStatusError) else None
+                if delay is None:
+                    delay = min(BACKOFF_MAX_S, self.backoff_base_s * 2 ** (attempt - 1))
+                    delay *= random.uniform(0.5, 1.0)  # jitter, so retries don't arrive in waves
+                await asyncio.sleep(delay)
+                continue
+
+            usage = (resp.usage.prompt_tokens, resp.usage.completion_tokens) if resp.usage else (0, 0)
+            self._limiter.settle(estimated, sum(usage) if resp.usage else estimated)
+            content = resp.choices[0].message.content
+            if self.cache_mode != "off" and content is not None:
+                get_cache().put(key, req.model, content, *usage)
+            return LLMResult(req.request_id, content, attempts=attempt, usage=usage,
+                             seconds=time.perf_counter() - start)
+
+        return LLMResult(req.request_id, error=error, attempts=self.max_retries + 1,
+                         seconds=time.perf_counter() - start)
+
+    async def stream(self, requests: Iterable[LLMRequest]) -> AsyncIterator[LLMResult]:
+        """
+        Results in completion order, each carrying its request's position in
+        `index`; `requests` is consumed lazily, `concurrency` at a time.
+        """
+        it = enumerate(requests)
+        pending: Set["asyncio.Task[LLMResult]"] = set()
+        positions: Dict["asyncio.Task[LLMResult]", int] = {}
+        while True:
+            for i, req in it:
+                task = asyncio.ensure_future(self.complete(req))
+                positions[task] = i
+                pending.add(task)
+                if len(pending) >= self.concurrency:
+                    break
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                res = task.result()
+                res.index = positions.pop(task)
+                yield res
+
+    def map(self, requests: Iterable[LLMRequest]) -> Iterator[LLMResult]:
+        """Synchronous view of stream(): yields each LLMResult as soon as it completes."""
+        out: "queue.Queue[Optional[LLMResult]]" = queue.Queue()
+
+        async def pump() -> None:
+            try:
+                async for res in self.stream(requests):
+                    out.put(res)
+            finally:
+                out.put(None)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        while True:
+            res = out.get()
+            if res is None:
+                future.result()  # re-raise anything that broke the pump
+                return
+            yield res
+
+    def close(self) -> None:
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "AsyncLLMEngine":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+_engine: Optional[AsyncLLMEngine] = None
+
+
+def get_engine() -> AsyncLLMEngine:
+    """The process-wide engine, sized by MM_LLM_CONCURRENCY / MM_LLM_RPM / MM_LLM_TPM."""
+    global _engine
+    if _engine is None:
+        _engine = AsyncLLMEngine(concurrency=LLM_CONCURRENCY)
+    return _engine
+
+
+def call_llm_many(requests: Sequence[LLMRequest], engine: Optional[AsyncLLMEngine] = None) -> List[str]:
+    """
+    Contents for a list of requests, in request order. Runs them concurrently
+    when MM_LLM_CONCURRENCY > 1 (or an engine is given), otherwise one by one
+    through call_llm. Raises RuntimeError if any request ultimately fails.
+    """
+    if engine is None and LLM_CONCURRENCY <= 1:
+        return [
+            call_llm(r.system_prompt, r.user_prompt, r.model, r.temperature, r.sample)
+            for r in requests
+        ]
+    engine = engine or get_engine()
+    # By position, not request_id: two requests may share an id
+    results: List[Optional[LLMResult]] = [None] * len(requests)
+    for res in engine.map(requests):
+        results[res.index] = res
+    failed = [res for res in results if res is None or not res.ok]
+    if failed:
+        first = failed[0].error if failed[0] is not None else "no result"
+        raise RuntimeError(f"{len(failed)} LLM request(s) failed, first: {first}")
+    return [res.content or "" for res in results if res is not None]
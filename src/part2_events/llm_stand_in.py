@@ -0,0 +1,308 @@
+# src/part2_events/llm_stand_in.py
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+
+# --- Make sure src/ is on sys.path so we can import sibling packages ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.local_server import Response, StandInServer, read_body
+from part2_events.dedup import estimate_tokens
+from part2_events.llm_batch import BatchJob, custom_id
+from part2_events.llm_cache import LLMCache
+from part2_events.llm_client import AsyncLLMEngine, LLMRequest
+
+# Local OpenAI-compatible stand-in for POST /v1/chat/completions, to exercise
+# and benchmark AsyncLLMEngine offline. It answers after `latency_s`, enforces
+# its own per-minute request limit (429 + Retry-After, like the real API) and
+# fails a fraction of requests with 500, so retries and backoff get exercised.
+# With batches, it also serves the Files + Batches endpoints for llm_batch.
+#
+#   python src/part2_events/llm_stand_in.py --requests 300 --concurrency 32
+
+CHAT_PATH = "/v1/chat/completions"
+REPLY = json.dumps({"claims": [], "temporal_details": {"date": "", "time": "", "place": ""},
+                    "tone": "Not discussed"})
+
+
+class ChatStandIn:
+    """State and route for the stand-in: a sliding one-minute request window and counters."""
+
+    def __init__(self, rpm: int = 600, error_rate: float = 0.02, latency_s: float = 0.2, seed: int = 0):
+        self.rpm = rpm
+        self.error_rate = error_rate
+        self.latency_s = latency_s
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window: List[float] = []
+        self.served = 0
+        self.throttled = 0
+        self.failed = 0
+
+    def route(self, handler: BaseHTTPRequestHandler) -> Response:
+        body = json.loads(read_body(handler) or b"{}")
+        now = time.monotonic()
+        with self.lock:
+            self.window = [t for t in self.window if now - t < 60]
+            if len(self.window) >= self.rpm:
+                self.throttled += 1
+                retry_after = 60 - (now - self.window[0])
+                return 429, {"Content-Type": "application/json", "retry-after-ms": str(int(retry_after * 1000))}, \
+                    b'{"error": {"message": "Rate limit reached", "type": "requests"}}'
+            self.window.append(now)
+            fail = self.rng.random() < self.error_rate
+        time.sleep(self.latency_s)
+        if fail:
+            with self.lock:
+                self.failed += 1
+            return 500, {"Content-Type": "application/json"}, b'{"error": {"message": "Internal error"}}'
+
+        return 200, {"Content-Type": "application/json"}, json.dumps(self.reply(body)).encode("utf-8")
+
+    def reply(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """A chat.completion object answering request `body`."""
+        prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+        with self.lock:
+            self.served += 1
+            n = self.served
+        return {
+            "id": f"chatcmpl-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": REPLY}}],
+            "usage": {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(REPLY),
+                      "total_tokens": estimate_tokens(prompt) + estimate_tokens(REPLY)},
+        }
+
+
+class BatchStandIn:
+    """
+    The Files + Batches endpoints the Batch API mode uses (llm_batch). A batch
+    reports in_progress for `polls` retrievals, then completes: each input
+    line is answered by `chat` (ignoring its rate limit, like the real batch
+    API), failing at chat's error_rate into the error file. Routes for new
+    files and batches are added to the server as they are created.
+    """
+
+    def __init__(self, chat: ChatStandIn, polls: int = 2):
+        self.chat = chat
+        self.polls = polls
+        self.routes: Dict[str, Any] = {}
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def _json(self, obj: Dict[str, Any], status: int = 200) -> Response:
+        return status, {"Content-Type": "application/json"}, json.dumps(obj).encode("utf-8")
+
+    def _new_id(self, prefix: str) -> str:
+        with self.lock:
+            self.created += 1
+            return f"{prefix}-{self.created}"
+
+    def _add_file(self, data: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        file_id = self._new_id("file")
+        self.files[file_id] = data
+        self.routes[f"/v1/files/{file_id}/content"] = lambda handler: (200, {}, self.files[file_id])
+        return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def upload(self, handler: BaseHTTPRequestHandler) -> Response:
+        raw = b"Content-Type: " + handler.headers["Content-Type"].encode("latin-1") + b"\r\n\r\n" + read_body(handler)
+        fields = {part.get_param("name", header="content-disposition"): part
+                  for part in BytesParser(policy=policy.default).parsebytes(raw).iter_parts()}
+        upload = fields["file"]
+        return self._json(self._add_file(upload.get_payload(decode=True), upload.get_filename() or "upload",
+                                         fields["purpose"].get_content().strip()))
+
+    def create(self, handler: BaseHTTPRequestHandler) -> Response:
+        req = json.loads(read_body(handler))
+        if req.get("input_file_id") not in self.files:
+            return self._json({"error": {"message": "No such file"}}, 404)
+        batch_id = self._new_id("batch")
+        total = self.files[req["input_file_id"]].count(b"\n")
+        self.batches[batch_id] = {
+            "id": batch_id, "object": "batch", "endpoint": req["endpoint"], "errors": None,
+            "input_file_id": req["input_file_id"], "completion_window": req["completion_window"],
+            "status": "validating", "output_file_id": None, "error_file_id": None,
+            "created_at": int(time.time()), "metadata": req.get("metadata"),
+            "request_counts": {"total": total, "completed": 0, "failed": 0}, "_polls": 0,
+        }
+        self.routes[f"/v1/batches/{batch_id}"] = lambda handler: self.retrieve(batch_id)
+        self.routes[f"/v1/batches/{batch_id}/cancel"] = lambda handler: self.cancel(batch_id)
+        return self._json(self._public(batch_id))
+
+    def _public(self, batch_id: str) -> Dict[str, Any]:
+        return {k: v for k, v in self.batches[batch_id].items() if not k.startswith("_")}
+
+    def retrieve(self, batch_id: str) -> Response:
+        batch = self.batches[batch_id]
+        if batch["status"] in ("validating", "in_progress"):
+            batch["_polls"] += 1
+            batch["status"] = "in_progress"
+            if batch["_polls"] > self.polls:
+                self._run(batch)
+        return self._json(self._public(batch_id))
+
+    def cancel(self, batch_id: str) -> Response:
+        self.batches[batch_id]["status"] = "cancelled"
+        return self._json(self._public(batch_id))
+
+    def list(self, handler: BaseHTTPRequestHandler) -> Response:
+        data = [self._public(b) for b in reversed(list(self.batches))]
+        return self._json({"object": "list", "data": data, "has_more": False,
+                           "first_id": data[0]["id"] if data else None, "last_id": data[-1]["id"] if data else None})
+
+    def _run(self, batch: Dict[str, Any]) -> None:
+        out: List[bytes] = []
+        err: List[bytes] = []
+        for line in self.files[batch["input_file_id"]].splitlines():
+            req = json.loads(line)
+            row: Dict[str, Any] = {"id": f"batch_req_{len(out) + len(err)}", "custom_id": req["custom_id"], "error": None}
+            if self.chat.rng.random() < self.chat.error_rate:
+                row["response"] = {"status_code": 500, "body": {"error": {"message": "Internal error"}}}
+                err.append(json.dumps(row).encode("utf-8") + b"\n")
+            else:
+                row["response"] = {"status_code": 200, "request_id": row["id"], "body": self.chat.reply(req["body"])}
+                out.append(json.dumps(row).encode("utf-8") + b"\n")
+        batch["output_file_id"] = self._add_file(b"".join(out), "output.jsonl", "batch_output")["id"]
+        if err:
+            batch["error_file_id"] = self._add_file(b"".join(err), "errors.jsonl", "batch_output")["id"]
+        batch["request_counts"].update(completed=len(out), failed=len(err))
+        batch["status"] = "completed"
+
+
+def serve(stand_in: ChatStandIn, batches: Optional[BatchStandIn] = None) -> StandInServer:
+    """
+    A StandInServer serving the chat route (and the batch routes, if given);
+    use as a context manager, base_url + "/v1" is the API root.
+    """
+    routes: Dict[str, Any] = {CHAT_PATH: stand_in.route}
+    if batches is not None:
+        routes.update({"/v1/files": batches.upload, "/v1/batches": batches.create,
+                       "/v1/batches?limit=100": batches.list})
+        batches.routes = routes
+    return StandInServer(routes)
+
+
+def benchmark(n_requests: int, concurrency: int, rpm: int, latency_s: float, error_rate: float) -> None:
+    """Sequential (concurrency 1) vs concurrent engine against the same stand-in limits."""
+    requests = [
+        LLMRequest(f"req-{i}", "You extract claims.", f"Document {i}: " + "text " * 200)
+        for i in range(n_requests)
+    ]
+    rows: Dict[int, float] = {}
+    for workers in (1, concurrency):
+        stand_in = ChatStandIn(rpm=rpm, error_rate=error_rate, latency_s=latency_s)
+        with serve(stand_in) as server:
+            # The client-side budget is set above the server's, so the server's
+            # 429s + Retry-After are what keep the run inside its limit.
+            with AsyncLLMEngine(concurrency=workers, rpm=rpm * 2, base_url=server.url("/v1"),
+                                api_key="stand-in", cache="off", backoff_base_s=0.05) as engine:
+                start = time.perf_counter()
+                results = list(engine.map(requests))
+                seconds = time.perf_counter() - start
+        ok = sum(r.ok for r in results)
+        rows[workers] = seconds
+        print(f"[bench] concurrency {workers:>3}: {ok}/{n_requests} ok in {seconds:.2f}s "
+              f"({n_requests / seconds:.1f} req/s), {engine.retries} retries "
+              f"({stand_in.throttled} throttled, {stand_in.failed} server errors)")
+    print(f"[bench] speedup: {rows[1] / rows[concurrency]:.1f}x")
+
+
+def check_batch(n_requests: int, error_rate: float) -> None:
+    """
+    Batch mode end to end against the fake endpoint, including a restart:
+    one BatchJob submits and returns, a fresh one for the same job name
+    resumes polling without resubmitting and collects into a scratch cache.
+    """
+    import httpx
+    from openai import OpenAI
+
+    requests = [
+        LLMRequest(custom_id(f"doc{i}", "gettysburg_address", "extract"), "You extract claims.", f"Document {i}")
+        for i in range(n_requests)
+    ]
+    work_dir = tempfile.mkdtemp(prefix="llm_batch_")
+    try:
+        batches = BatchStandIn(ChatStandIn(error_rate=error_rate, latency_s=0.0))
+        with serve(batches.chat, batches) as server:
+            cache = LLMCache(os.path.join(work_dir, "cache.sqlite"))
+
+            def job() -> BatchJob:
+                client = OpenAI(api_key="stand-in", base_url=server.url("/v1"), http_client=httpx.Client())
+                return BatchJob("check", client, batch_dir=work_dir, poll_s=0.01, cache=cache)
+
+            finished = job().run(requests, wait=False)
+            print(f"[check] first process: submitted, finished={finished}")
+            resumed = job()
+            finished = resumed.run(requests)
+            submitted = len(batches.batches)
+            batch_id = resumed.state["parts"][0]["batch_id"]
+            cached = sum(cache.contains(k) for k, _ in _keys(resumed).values())
+            print(f"[check] after restart: finished={finished}, {submitted} batch(es) submitted, "
+                  f"{cached}/{n_requests} results cached, "
+                  f"{batches.batches[batch_id]['request_counts']['failed']} failed in the batch")
+            again = job()
+            again.run(requests)
+            print(f"[check] rerun of a finished job submits nothing: {len(batches.batches)} batch(es)")
+            cache.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _keys(job: BatchJob) -> Dict[str, List[str]]:
+    keys: Dict[str, List[str]] = {}
+    for part in job.state["parts"]:
+        with open(os.path.join(job.dir, part["name"] + ".keys.json"), "r", encoding="utf-8") as f:
+            keys.update(json.load(f))
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in + engine benchmark")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rpm", type=int, default=6000, help="server-side request limit per minute")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per completion")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="share of requests failing with 500")
+    parser.add_argument("--serve", action="store_true", help="just run the stand-in until interrupted")
+    parser.add_argument("--batch", action="store_true", help="check Batch API mode against the fake endpoint")
+    args = parser.parse_args()
+
+    if args.batch:
+        check_batch(args.requests, args.error_rate)
+        return
+    if args.serve:
+        chat = ChatStandIn(args.rpm, args.error_rate, args.latency)
+        with serve(chat, BatchStandIn(chat)) as server:
+            print(f"[info] OpenAI-compatible stand-in at {server.url('/v1')}")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+        return
+    benchmark(args.requests, args.concurrency, args.rpm, args.latency, args.error_rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# src/part2_events/packing.py
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config import EventConfig
+from .dedup import estimate_tokens
+
+# Prompt packing for event extraction: fewer, fuller LLM calls.
+#
+# Unpacked, every (document, event) pair is its own call. Two things waste
+# tokens there: events of one document often retrieve the same chunks (sent
+# once per event), and short LoC letters pay the fixed instructions + JSON
+# schema for every event of every letter.
+#
+# Packing works on work units. A unit is one document's excerpts plus the
+# events to extract from them. Within a document, an event joins an existing
+# unit when most of its chunks (MIN_OVERLAP of the smaller set) are already
+# in it and the merged unit still fits the budget. Units are then packed, in
+# document order, into prompts of up to PACK_TOKENS context tokens and
+# MAX_PAIRS (document, event) pairs. A unit larger than the budget becomes a
+# prompt on its own.
+#
+# The budget assumes assembled contexts (context.py, CONTEXT_TOKENS each):
+# event_extractor --pack turns assembly on. Whole-chunk contexts of a long
+# book are ~9k tokens per event, so two rarely fit one budget and packing
+# alone saves almost nothing there.
+
+PACK_TOKENS = int(os.environ.get("MM_PACK_TOKENS", "12000"))
+MAX_PAIRS = 24         # bounds the answer length of one packed call
+MIN_OVERLAP = 0.5
+SEPARATOR = "\n\n---\n\n"
+
+
+@dataclass
+class WorkUnit:
+    doc_id: str
+    title: str
+    events: List[EventConfig]
+    chunks: List[str]                  # union of the events' chunks, first-seen order
+    contexts: Dict[str, str]           # event_id -> its own context, for single-event fallback
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # event_id -> parsed (filled later)
+
+    @property
+    def text(self) -> str:
+        return SEPARATOR.join(self.chunks)
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text) + sum(estimate_tokens(ev.name + ev.description) for ev in self.events)
+
+
+def _overlap(a: Sequence[str], b: Sequence[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(set(a) & set(b)) / min(len(set(a)), len(set(b)))
+
+
+def group_events(
+    doc_id: str,
+    title: str,
+    contexts: List[Tuple[EventConfig, List[str]]],
+    budget: int = PACK_TOKENS,
+    min_overlap: float = MIN_OVERLAP,
+) -> List[WorkUnit]:
+    """Work units for one document, given each event's ranked chunk texts (in event order)."""
+    units: List[WorkUnit] = []
+    for ev, chunks in contexts:
+        best: Optional[WorkUnit] = None
+        best_overlap = min_overlap
+        for unit in units:
+            overlap = _overlap(unit.chunks, chunks)
+            if overlap >= best_overlap:
+                best, best_overlap = unit, overlap
+        context = SEPARATOR.join(chunks)
+        if best is not None:
+            extra = [c for c in chunks if c not in best.chunks]
+            merged_tokens = best.tokens + estimate_tokens(SEPARATOR.join(extra)) + estimate_tokens(ev.name + ev.description)
+            if merged_tokens <= budget:
+                best.events.append(ev)
+                best.chunks.extend(extra)
+                best.contexts[ev.event_id] = context
+                continue
+        units.append(WorkUnit(doc_id, title, [ev], list(dict.fromkeys(chunks)), {ev.event_id: context}))
+    return units
+
+
+class Packer:
+    """
+    Greedy, order-preserving bin packing of work units into prompts:
+
+        packer = Packer()
+        for unit in units:
+            pack = packer.add(unit)     # a full pack, or None
+        last = packer.flush()
+    """
+
+    def __init__(self, budget: int = PACK_TOKENS, max_pairs: int = MAX_PAIRS):
+        self.budget = budget
+        self.max_pairs = max_pairs
+        self.current: List[WorkUnit] = []
+        self.tokens = 0
+        self.pairs = 0
+
+    def add(self, unit: WorkUnit) -> Optional[List[WorkUnit]]:
+        full = None
+        if self.current and (
+            self.tokens + unit.tokens > self.budget or self.pairs + len(unit.events) > self.max_pairs
+        ):
+            full = self.flush()
+        self.current.append(unit)
+        self.tokens += unit.tokens
+        self.pairs += len(unit.events)
+        return full
+
+    def flush(self) -> Optional[List[WorkUnit]]:
+        pack, self.current, self.tokens, self.pairs = self.current, [], 0, 0
+        return pack or None
@@ -1,21 +1,36 @@
 # src/part2_events/retrieval.py
 
+import hashlib
 import json
 import os
-from typing import List, Dict, Any, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 
-from .config import EventConfig
+from part1_data.store import STORE_DIR, BlobStore, exists, iter_jsonl, open_binary
+
+from .config import EventConfig, get_all_events
+from .keywords import KeywordMatcher
+from .spans import Span, SpanChunks, chunk_spans
+
+# Chunk arrays are cached per (content hash, chunking params): in memory for
+# the current run, and in the blob store under cache/chunks/ across runs.
+CHUNK_CACHE_PREFIX = "cache/chunks"
+CHUNK_CACHE_SIZE = 16
+
+# "words": the original whitespace-word chunks (chunk_text). "spans":
+# sentence-aligned (start, end) offsets into the document with an approximate
+# token budget (part2_events.spans); chunk texts are sliced out on access.
+# MM_CHUNKER=spans opts in. "words" stays the default: on the gold set
+# (retrieval_eval.py --chunkers words,spans) spans lose recall@1 with every
+# backend at 1000/150, and vector recall at every setting.
+DEFAULT_CHUNKER = os.environ.get("MM_CHUNKER", "words")
+TOKENS_PER_WORD = 4 / 3  # turns the max_words / overlap_words knobs into token budgets
 
 
 def load_jsonl(path: str) -> List[Dict[str, Any]]:
-    docs = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            docs.append(json.loads(line))
-    return docs
+    """Whole file as a list; stream large files with iter_jsonl() instead."""
+    return list(iter_jsonl(path))
 
 
 def chunk_text(text: str, max_words: int = 1000, overlap_words: int = 150) -> List[str]:
@@ -41,6 +56,82 @@ def chunk_text(text: str, max_words: int = 1000, overlap_words: int = 150) -> Li
     return chunks
 
 
+@dataclass
+class ChunkedDocument:
+    chunks: Union[List[str], SpanChunks]
+    lowered: Union[List[str], SpanChunks]  # chunk.lower(), computed once for every event
+    spans: Optional[List[Span]] = None     # (start, end) offsets, "spans" chunker only
+
+
+_chunk_cache: "OrderedDict[str, ChunkedDocument]" = OrderedDict()
+_cache_store = BlobStore(STORE_DIR, "gzip-fast")
+
+
+def _chunk_cache_key(content: str, max_words: int, overlap_words: int, chunker: str = "words") -> str:
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    key = f"{digest}-{max_words}-{overlap_words}"
+    return key if chunker == "words" else f"{key}-{chunker}"
+
+
+def _span_document(content: str, spans: List[Span]) -> ChunkedDocument:
+    lowered_text = content.lower()
+    if len(lowered_text) == len(content):
+        lowered: Union[List[str], SpanChunks] = SpanChunks(lowered_text, spans)
+    else:
+        # A few characters lowercase to two (e.g. U+0130), shifting offsets.
+        lowered = [content[s:e].lower() for s, e in spans]
+    return ChunkedDocument(SpanChunks(content, spans), lowered, spans)
+
+
+def chunk_document(
+    content: str,
+    max_words: int = 1000,
+    overlap_words: int = 150,
+    persist: bool = True,
+    chunker: Optional[str] = None,
+) -> ChunkedDocument:
+    """
+    chunk_text() (or chunk_spans(), see DEFAULT_CHUNKER) + lowercasing, done
+    once per document and cached by content hash so every event (and later
+    runs) reuse the same chunk arrays. The "spans" chunker persists only the
+    offsets, not the chunk texts.
+    """
+    chunker = chunker or DEFAULT_CHUNKER
+    if chunker not in ("words", "spans"):
+        raise ValueError(f"Unknown chunker {chunker!r}")
+    key = _chunk_cache_key(content, max_words, overlap_words, chunker)
+    doc = _chunk_cache.get(key)
+    if doc is not None:
+        _chunk_cache.move_to_end(key)
+        return doc
+
+    name = f"{CHUNK_CACHE_PREFIX}/{key}.json"
+    if persist and exists(name):
+        with open_binary(name) as f:
+            chunks = json.load(f)
+    else:
+        if chunker == "spans":
+            chunks = chunk_spans(
+                content,
+                max_tokens=round(max_words * TOKENS_PER_WORD),
+                overlap_tokens=round(overlap_words * TOKENS_PER_WORD),
+            )
+        else:
+            chunks = chunk_text(content, max_words=max_words, overlap_words=overlap_words)
+        if persist:
+            with _cache_store.writer(name=name) as w:
+                w.write(json.dumps(chunks, ensure_ascii=False).encode("utf-8"))
+
+    if chunker == "spans":
+        doc = _span_document(content, [(s, e) for s, e in chunks])
+    else:
+        doc = ChunkedDocument(chunks, [ch.lower() for ch in chunks])
+    _chunk_cache[key] = doc
+    if len(_chunk_cache) > CHUNK_CACHE_SIZE:
+        _chunk_cache.popitem(last=False)
+    return doc
+
+
 def score_chunk_for_event(chunk: str, event_cfg: EventConfig) -> int:
     """
     Naive keyword score: count occurrences of each keyword (case-insensitive).
@@ -53,22 +144,72 @@ def score_chunk_for_event(chunk: str, event_cfg: EventConfig) -> int:
     return score
 
 
+_matchers: Dict[Tuple[Any, ...], KeywordMatcher] = {}
+
+
+def keyword_matcher(events: Sequence[EventConfig]) -> KeywordMatcher:
+    """One KeywordMatcher per event catalog, built on first use."""
+    key = tuple((ev.event_id, tuple(ev.keywords)) for ev in events)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = _matchers[key] = KeywordMatcher(events)
+    return matcher
+
+
 def get_top_chunks_for_event(
     content: str,
     event_cfg: EventConfig,
     max_words: int = 1000,
     overlap_words: int = 150,
     top_k: int = 5,
-) -> List[Tuple[str, int]]:
+    backend: str = "keywords",
+) -> List[Tuple[str, Any]]:
     """
     Return up to top_k (chunk, score) pairs with score > 0.
+
+    backend="keywords" scores by distinct keywords present (int scores);
+    backend="vector" ranks by cosine similarity to the event in the local
+    hashed TF-IDF index (part2_events.vector_index, float scores), which
+    also finds chunks that discuss the event without naming it.
+    """
+    if backend == "vector":
+        from .vector_index import load_vector_index
+
+        return load_vector_index().top_chunks_for_event(
+            content, event_cfg, top_k=top_k, max_words=max_words, overlap_words=overlap_words,
+        )
+    if backend != "keywords":
+        raise ValueError(f"Unknown retrieval backend {backend!r}")
+    return get_top_chunks_for_events(
+        content, [event_cfg], max_words=max_words, overlap_words=overlap_words, top_k=top_k,
+    )[event_cfg.event_id]
+
+
+def get_top_chunks_for_events(
+    content: str,
+    events: Optional[Sequence[EventConfig]] = None,
+    max_words: int = 1000,
+    overlap_words: int = 150,
+    top_k: int = 5,
+) -> Dict[str, List[Tuple[str, int]]]:
+    """
+    Same ranking as get_top_chunks_for_event, for every event at once
+    (all configured events by default): the document is chunked and
+    lowercased once, then each chunk is scored against every event's
+    keywords in a single sweep (part2_events.keywords). Returns
+    {event_id: [(chunk, score), ...]}.
     """
-    chunks = chunk_text(content, max_words=max_words, overlap_words=overlap_words)
-    scored = []
-    for ch in chunks:
-        s = score_chunk_for_event(ch, event_cfg)
-        if s > 0:
-            scored.append((ch, s))
-
-    scored.sort(key=lambda x: x[1], reverse=True)
-    return scored[:top_k]
+    events = list(events) if events is not None else get_all_events()
+    doc = chunk_document(content, max_words=max_words, overlap_words=overlap_words)
+    matcher = keyword_matcher(events)
+
+    scored: Dict[str, List[Tuple[str, int]]] = {ev.event_id: [] for ev in events}
+    for ch, lowered in zip(doc.chunks, doc.lowered):
+        for event_id, s in matcher.scores(lowered).items():
+            if s > 0:
+                scored[event_id].append((ch, s))
+
+    for event_id, pairs in scored.items():
+        pairs.sort(key=lambda x: x[1], reverse=True)
+        scored[event_id] = pairs[:top_k]
+    return scored
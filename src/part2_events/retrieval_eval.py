@@ -0,0 +1,285 @@
+# src/part2_events/retrieval_eval.py
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# --- Make sure src/ is on sys.path so we can import sibling packages ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.docstore import DocStore
+from part1_data.store import exists, iter_jsonl, write_jsonl
+from part2_events import bm25_index, retrieval, vector_index
+from part2_events.bm25_index import BM25Index
+from part2_events.config import EventConfig, get_all_events
+from part2_events.dedup import estimate_tokens
+from part2_events.retrieval import chunk_document, get_top_chunks_for_event
+from part2_events.spans import Span
+from part2_events.vector_index import VectorIndex, build_index
+
+# Retrieval quality vs. cost, per backend, chunker and chunking setting.
+#
+# The gold set labels, for a (document, event) pair, passages that a good
+# context must contain. Labels are short verbatim quotes rather than offsets,
+# so they survive re-normalization; each is located in the document (ignoring
+# whitespace differences) and becomes a character span. A retrieved chunk is
+# relevant when its span overlaps a gold span, whatever the chunking.
+#
+# Every configuration ranks chunks for every (document, event) pair, like the
+# extractor does, and reports:
+#   recall@k   share of gold passages covered by the top k chunks
+#   MRR        1 / rank of the first relevant chunk (0 if none in the top k)
+#   p50 / p95  per-query ranking latency
+#   build      time to chunk / index the corpus for this setting
+#   tokens     context tokens the extractor would send for the whole corpus
+# --chunkers compares chunkers (retrieval.DEFAULT_CHUNKER, MM_CHUNKER) in one
+# run; the first one listed is the baseline.
+
+GOLD_PATH = "data/gold/retrieval_gold.jsonl"
+OUT_PATH = "data/evals/retrieval_eval.jsonl"
+SOURCES = [
+    "data/processed/gutenberg_lincoln.jsonl",
+    "data/processed/loc_lincoln_improved.jsonl",
+]
+BACKENDS = ["keywords", "bm25", "vector"]
+CHUNKERS = "words,spans"
+CHUNKINGS = "1000:150,500:75,250:40"
+TOP_KS = "1,3,5"
+
+_WORD_RE = re.compile(r"\S+")
+
+# rank(doc_id, content, event, top_k) -> chunk numbers, best first
+Ranker = Callable[[str, str, EventConfig, int], List[int]]
+
+
+@dataclass
+class GoldQuery:
+    doc_id: str
+    event: str
+    spans: List[Span]
+
+
+def locate(content: str, quote: str) -> Optional[Span]:
+    """Character span of `quote` in content, matching any run of whitespace between words."""
+    pattern = r"\s+".join(re.escape(w) for w in quote.split())
+    m = re.search(pattern, content)
+    return m.span() if m else None
+
+
+def load_gold(path: str, contents: Dict[str, str]) -> List[GoldQuery]:
+    gold: List[GoldQuery] = []
+    for rec in iter_jsonl(path):
+        content = contents.get(rec["doc_id"])
+        if content is None:
+            print(f"[warn] Gold document not in corpus: {rec['doc_id']}")
+            continue
+        spans = []
+        for quote in rec["quotes"]:
+            span = locate(content, quote)
+            if span is None:
+                print(f"[warn] Quote not found in {rec['doc_id']}: {quote[:60]!r}")
+            else:
+                spans.append(span)
+        if spans:
+            gold.append(GoldQuery(rec["doc_id"], rec["event"], spans))
+    return gold
+
+
+def use_chunker(chunker: str) -> None:
+    """Switch every backend to `chunker` (they read DEFAULT_CHUNKER at import time)."""
+    for module in (retrieval, bm25_index, vector_index):
+        module.DEFAULT_CHUNKER = chunker
+
+
+def chunk_offsets(content: str, max_words: int, overlap_words: int) -> List[Span]:
+    """Character span of every chunk chunk_document() produces for these settings."""
+    doc = chunk_document(content, max_words, overlap_words, persist=False)
+    if doc.spans is not None:
+        return doc.spans
+    # Word chunks are re-joined text, so walk the words the way chunk_text does.
+    words = [m.span() for m in _WORD_RE.finditer(content)]
+    spans: List[Span] = []
+    start = 0
+    while start < len(words):
+        end = min(start + max_words, len(words))
+        spans.append((words[start][0], words[end - 1][1]))
+        if end == len(words):
+            break
+        start = max(0, end - overlap_words)
+    return spans
+
+
+def _chunk_numbers(contents: Dict[str, str], max_words: int, overlap_words: int) -> Dict[str, Dict[str, int]]:
+    """doc_id -> {chunk text: first chunk number}, to map ranked texts back to positions."""
+    numbers: Dict[str, Dict[str, int]] = {}
+    for doc_id, content in contents.items():
+        chunks = chunk_document(content, max_words, overlap_words, persist=False).chunks
+        by_text: Dict[str, int] = {}
+        for i, ch in enumerate(chunks):
+            by_text.setdefault(ch, i)
+        numbers[doc_id] = by_text
+    return numbers
+
+
+def make_ranker(
+    backend: str,
+    contents: Dict[str, str],
+    max_words: int,
+    overlap_words: int,
+    work_dir: str,
+) -> Tuple[float, Ranker]:
+    """Build whatever `backend` needs for this chunking; returns (build seconds, ranker)."""
+    retrieval._chunk_cache.clear()
+    start = time.perf_counter()
+    if backend == "keywords":
+        numbers = _chunk_numbers(contents, max_words, overlap_words)
+        build_s = time.perf_counter() - start
+
+        def rank(doc_id: str, content: str, ev: EventConfig, top_k: int) -> List[int]:
+            top = get_top_chunks_for_event(content, ev, max_words, overlap_words, top_k)
+            return [numbers[doc_id][ch] for ch, _ in top]
+
+    elif backend == "bm25":
+        index = BM25Index(os.path.join(
+            work_dir, f"bm25-{retrieval.DEFAULT_CHUNKER}-{max_words}-{overlap_words}.sqlite"))
+        for doc_id, content in contents.items():
+            index.add_document(doc_id, content, max_words, overlap_words)
+        build_s = time.perf_counter() - start
+
+        def rank(doc_id: str, content: str, ev: EventConfig, top_k: int) -> List[int]:
+            return [chunk_no for _, chunk_no, _, _ in index.search(ev, doc_id, top_k)]
+
+    elif backend == "vector":
+        out_dir = os.path.join(work_dir, f"vectors-{retrieval.DEFAULT_CHUNKER}-{max_words}-{overlap_words}")
+        build_index(({"id": d, "content": c} for d, c in contents.items()), out_dir,
+                    max_words=max_words, overlap_words=overlap_words)
+        index_v = VectorIndex(out_dir)
+        build_s = time.perf_counter() - start
+        numbers = _chunk_numbers(contents, max_words, overlap_words)
+
+        def rank(doc_id: str, content: str, ev: EventConfig, top_k: int) -> List[int]:
+            top = index_v.top_chunks_for_event(content, ev, top_k, max_words, overlap_words)
+            return [numbers[doc_id][ch] for ch, _ in top]
+
+    else:
+        raise ValueError(f"Unknown retrieval backend {backend!r}")
+    return build_s, rank
+
+
+def _percentile(values: Sequence[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(round(p * (len(ordered) - 1)))] if ordered else 0.0
+
+
+def _overlaps(a: Span, b: Span) -> bool:
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def evaluate(
+    backend: str,
+    contents: Dict[str, str],
+    gold: List[GoldQuery],
+    max_words: int,
+    overlap_words: int,
+    top_ks: Sequence[int],
+    work_dir: str,
+) -> List[Dict[str, object]]:
+    """One result row per top_k for this backend + chunking."""
+    events = get_all_events()
+    build_s, rank = make_ranker(backend, contents, max_words, overlap_words, work_dir)
+    offsets = {d: chunk_offsets(c, max_words, overlap_words) for d, c in contents.items()}
+    texts = {d: chunk_document(c, max_words, overlap_words, persist=False).chunks for d, c in contents.items()}
+    k_max = max(top_ks)
+
+    ranked: Dict[Tuple[str, str], List[int]] = {}
+    latencies: List[float] = []
+    for doc_id, content in contents.items():
+        for ev in events:
+            start = time.perf_counter()
+            ranked[(doc_id, ev.event_id)] = rank(doc_id, content, ev, k_max)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    rows = []
+    for k in top_ks:
+        recall = mrr = 0.0
+        for q in gold:
+            top = [offsets[q.doc_id][i] for i in ranked.get((q.doc_id, q.event), [])[:k]]
+            recall += sum(any(_overlaps(g, c) for c in top) for g in q.spans) / len(q.spans)
+            hit = next((r for r, c in enumerate(top, start=1) if any(_overlaps(g, c) for g in q.spans)), None)
+            mrr += 1.0 / hit if hit else 0.0
+        tokens = sum(estimate_tokens(texts[doc_id][i]) for (doc_id, _), nums in ranked.items() for i in nums[:k])
+        rows.append({
+            "backend": backend,
+            "chunker": retrieval.DEFAULT_CHUNKER,
+            "max_words": max_words,
+            "overlap_words": overlap_words,
+            "top_k": k,
+            "recall": round(recall / len(gold), 4) if gold else 0.0,
+            "mrr": round(mrr / len(gold), 4) if gold else 0.0,
+            "p50_ms": round(_percentile(latencies, 0.50), 3),
+            "p95_ms": round(_percentile(latencies, 0.95), 3),
+            "build_s": round(build_s, 3),
+            "tokens": tokens,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval quality vs. latency / token cost")
+    parser.add_argument("--gold", default=GOLD_PATH)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--chunkers", default=CHUNKERS, help="comma-separated: words, spans")
+    parser.add_argument("--chunking", default=CHUNKINGS, help="max_words:overlap_words,...")
+    parser.add_argument("--top-k", default=TOP_KS, help="comma-separated k values")
+    parser.add_argument("--out", default=OUT_PATH)
+    args = parser.parse_args()
+
+    contents: Dict[str, str] = {}
+    for path in SOURCES:
+        if not exists(path):
+            print(f"[warn] Missing corpus file {path}")
+            continue
+        with DocStore(path) as docs:
+            for doc in docs:
+                contents[doc["id"]] = doc.get("content", "")
+    gold = load_gold(args.gold, contents)
+    n_spans = sum(len(q.spans) for q in gold)
+    print(f"[info] {len(contents)} documents, {len(gold)} gold queries ({n_spans} passages)")
+
+    top_ks = [int(k) for k in args.top_k.split(",")]
+    rows: List[Dict[str, object]] = []
+    work_dir = tempfile.mkdtemp(prefix="retrieval_eval_")
+    default_chunker = retrieval.DEFAULT_CHUNKER
+    try:
+        for backend in args.backends.split(","):
+            for chunker in args.chunkers.split(","):
+                use_chunker(chunker)
+                for setting in args.chunking.split(","):
+                    max_words, overlap_words = (int(x) for x in setting.split(":"))
+                    rows.extend(evaluate(backend, contents, gold, max_words, overlap_words, top_ks, work_dir))
+    finally:
+        use_chunker(default_chunker)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'backend':<9} {'chunker':<7} {'chunks':>8} {'k':>2}  {'recall':>6} {'MRR':>6}  "
+          f"{'p50 ms':>7} {'p95 ms':>7}  {'build s':>7}  {'tokens':>8}")
+    for r in rows:
+        print(f"{r['backend']:<9} {r['chunker']:<7} {r['max_words']:>4}/{r['overlap_words']:<3} {r['top_k']:>2}  "
+              f"{r['recall']:6.3f} {r['mrr']:6.3f}  {r['p50_ms']:7.2f} {r['p95_ms']:7.2f}  "
+              f"{r['build_s']:7.2f}  {r['tokens']:8d}")
+    write_jsonl(args.out, rows)
+    print(f"[ok] Wrote {len(rows)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
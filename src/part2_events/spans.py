@@ -0,0 +1,153 @@
+# src/part2_events/spans.py
+
+import argparse
+import bisect
+import os
+import re
+import sys
+import time
+import tracemalloc
+from typing import Iterator, List, Sequence, Tuple, Union, overload
+
+# --- Make sure src/ is on sys.path so we can import sibling packages ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part2_events.dedup import CHARS_PER_TOKEN
+
+# Chunking by character spans: a chunk is a (start, end) pair into the
+# original text, so chunking a book allocates one small tuple per chunk and
+# one int per sentence boundary instead of a string per word. Chunk text is
+# only sliced out when someone actually reads it.
+#
+# Boundaries prefer sentence ends (., !, ? plus closing quotes/brackets, or a
+# blank line); a sentence longer than the whole budget is cut at whitespace.
+# Sizes are an approximate token budget (CHARS_PER_TOKEN chars per token).
+
+SENTENCE_END_RE = re.compile(r"[.!?][\"'”’)\]]*\s+|\n\s*\n")
+
+Span = Tuple[int, int]
+
+
+def sentence_starts(text: str) -> List[int]:
+    """Offsets where a sentence begins (always includes 0)."""
+    return [0] + [m.end() for m in SENTENCE_END_RE.finditer(text)]
+
+
+def _trim(text: str, start: int, end: int) -> Span:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def chunk_spans(text: str, max_tokens: int = 1300, overlap_tokens: int = 200) -> List[Span]:
+    """
+    (start, end) spans of about max_tokens each, ending on sentence
+    boundaries, with about overlap_tokens of whole sentences repeated at the
+    start of the next span.
+    """
+    budget = max(1, max_tokens * CHARS_PER_TOKEN)
+    overlap = max(0, overlap_tokens * CHARS_PER_TOKEN)
+    starts = sentence_starts(text)
+    n = len(text)
+
+    spans: List[Span] = []
+    start = _trim(text, 0, n)[0]
+    while start < n:
+        limit = start + budget
+        if limit >= n:
+            end = n
+        else:
+            # Last sentence start inside the budget closes this chunk.
+            i = bisect.bisect_right(starts, limit) - 1
+            end = starts[i] if starts[i] > start else 0
+            if not end:
+                # One sentence longer than the budget: cut at the last whitespace.
+                ws = text.rfind(" ", start, limit)
+                end = ws if ws > start else limit
+        s, e = _trim(text, start, end)
+        if e > s:
+            spans.append((s, e))
+        if end >= n:
+            break
+        # Step back over whole sentences for the overlap, but always move forward.
+        i = bisect.bisect_left(starts, end - overlap)
+        nxt = starts[i] if i < len(starts) else end
+        start = nxt if start < nxt < end else end
+        start = _trim(text, start, n)[0]
+    return spans
+
+
+class SpanChunks(Sequence[str]):
+    """
+    List-like view of chunk texts: spans over one backing string, each chunk
+    sliced out only when indexed or iterated.
+    """
+
+    def __init__(self, text: str, spans: List[Span]):
+        self.text = text
+        self.spans = spans
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    @overload
+    def __getitem__(self, i: int) -> str: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[str]: ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(i, slice):
+            return [self.text[s:e] for s, e in self.spans[i]]
+        s, e = self.spans[i]
+        return self.text[s:e]
+
+    def __iter__(self) -> Iterator[str]:
+        text = self.text
+        for s, e in self.spans:
+            yield text[s:e]
+
+
+def benchmark(text: str, label: str) -> None:
+    from part2_events.retrieval import chunk_text
+
+    for name, fn in (("words", lambda: chunk_text(text)), ("spans", lambda: chunk_spans(text))):
+        start = time.perf_counter()
+        result = fn()
+        secs = time.perf_counter() - start
+        tracemalloc.start()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"[bench] {label} {name:>5}: {len(result):4d} chunks, {secs * 1000:7.1f} ms, "
+              f"peak {peak / 1e6:6.1f} MB while chunking")
+
+
+def main():
+    from part1_data.docstore import DocStore
+
+    parser = argparse.ArgumentParser(description="Span chunker benchmark (vs word chunking)")
+    parser.add_argument("--path", default="data/processed/gutenberg_lincoln.jsonl")
+    parser.add_argument("--doc-id", default="gutenberg_14004")
+    args = parser.parse_args()
+
+    with DocStore(args.path) as docs:
+        text = docs.get(args.doc_id)["content"]
+    print(f"[info] {args.doc_id}: {len(text) / 1e6:.1f}M chars, {len(sentence_starts(text))} sentences")
+    benchmark(text, args.doc_id)
+
+    spans = chunk_spans(text)
+    cut_mid_sentence = sum(1 for s, e in spans[:-1] if not SENTENCE_END_RE.match(text, e) and
+                           not text[e - 1:e] in ".!?\"')]”’")
+    print(f"[check] {len(spans)} spans, {cut_mid_sentence} end mid-sentence, "
+          f"largest ~{max(e - s for s, e in spans) // CHARS_PER_TOKEN} tokens")
+
+
+if __name__ == "__main__":
+    main()
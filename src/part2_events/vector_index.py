@@ -0,0 +1,421 @@
+# src/part2_events/vector_index.py
+
+import argparse
+import array
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import time
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# --- Make sure src/ is on sys.path so we can import sibling packages ---
+
+current_file = os.path.abspath(__file__)
+src_dir = os.path.dirname(os.path.dirname(current_file))  # .../src
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from part1_data.docstore import source_key
+from part1_data.store import logical_name
+from part2_events.bm25_index import STOPWORDS
+from part2_events.config import EventConfig, get_all_events
+from part2_events.retrieval import DEFAULT_CHUNKER, chunk_document
+
+# Local dense retrieval, no network and no NumPy:
+#
+#   vectorizer     TF-IDF over hashed unigrams + bigrams (2^20 buckets), folded
+#                  into DIM signed dimensions and L2-normalized
+#   matrix.f32     float32 row-major [n_chunks x DIM], read through mmap
+#   centroids.f32  float32 [n_lists x DIM] IVF centroids, mmap'ed
+#   idf.f32        float32 idf per hash bucket, mmap'ed
+#   meta.json      fingerprint, rows -> (doc_id, chunk_no), doc row ranges,
+#                  IVF lists
+#
+# The fingerprint covers the input files (docstore.source_key) and the
+# chunking parameters, like the chunk store's; load_vector_index() rebuilds
+# the index when it is missing or stale.
+#
+# Search is IVF: chunks are clustered with k-means (~sqrt(n) lists) and a query
+# only scores the chunks in its `nprobe` nearest lists. Short event queries sit
+# far from every centroid, so recall needs a generous nprobe; `bench` prints
+# the latency / recall trade-off.
+
+VECTOR_DIR = "data/index/vectors"
+DEFAULT_SOURCES = [
+    "data/processed/gutenberg_lincoln.jsonl",
+    "data/processed/loc_lincoln_improved.jsonl",
+]
+DIM = 4096
+N_BUCKETS = 1 << 20
+NPROBE = 8
+# Ranges this small (e.g. one document's chunks) are scanned exactly - that is
+# already cheap, and IVF only pays off once there are many lists to skip.
+EXACT_MAX_ROWS = 256
+KMEANS_ITERS = 8
+KMEANS_SAMPLE = 4000
+# Clustering only looks at each chunk's heaviest dimensions - enough to place
+# it, and k-means cost no longer grows with chunk length.
+KMEANS_TOP_DIMS = 64
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _features(text: str) -> Counter:
+    words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+    feats = Counter(zlib.crc32(w.encode("utf-8")) for w in words)
+    feats.update(zlib.crc32(f"{a} {b}".encode("utf-8")) for a, b in zip(words, words[1:]))
+    return feats
+
+
+# A vector in compute form: {dimension: weight}, L2-normalized. Chunks have a
+# few hundred non-zero dimensions and event queries a few dozen, so every dot
+# product only touches the query's non-zeros.
+Sparse = Dict[int, float]
+
+
+def _sparse_dot(q: Sparse, dense: Sequence[float], base: int = 0) -> float:
+    return sum(w * dense[base + d] for d, w in q.items())
+
+
+class HashingVectorizer:
+    def __init__(self, idf: Optional[Sequence[float]] = None, dim: int = DIM):
+        self.idf = idf
+        self.dim = dim
+
+    @staticmethod
+    def fit_idf(texts: Iterable[str]) -> array.array:
+        df = Counter()
+        n = 0
+        for text in texts:
+            df.update(set(h & (N_BUCKETS - 1) for h in _features(text)))
+            n += 1
+        base = math.log(1 + n) + 1  # idf of a bucket no chunk contains
+        idf = array.array("f", [base]) * N_BUCKETS
+        for bucket, count in df.items():
+            idf[bucket] = math.log((1 + n) / (1 + count)) + 1
+        return idf
+
+    def transform(self, text: str) -> Sparse:
+        vec: Sparse = {}
+        idf = self.idf
+        for h, count in _features(text).items():
+            w = (1 + math.log(count)) * (idf[h & (N_BUCKETS - 1)] if idf is not None else 1.0)
+            d = (h >> 1) % self.dim
+            vec[d] = vec.get(d, 0.0) + (w if h & 1 else -w)
+        norm = math.sqrt(sum(v * v for v in vec.values()))
+        return {d: v / norm for d, v in vec.items()} if norm else vec
+
+
+def _kmeans(rows: List[Sparse], k: int, dim: int, iters: int = KMEANS_ITERS) -> List[List[float]]:
+    """Spherical k-means with deterministic, evenly spaced initial centroids."""
+    step = max(1, len(rows) // k)
+    centroids: List[List[float]] = []
+    for i in range(k):
+        c = [0.0] * dim
+        for d, v in rows[i * step].items():
+            c[d] = v
+        centroids.append(c)
+    for _ in range(iters):
+        sums = [[0.0] * dim for _ in range(k)]
+        counts = [0] * k
+        for row in rows:
+            j = max(range(k), key=lambda j: _sparse_dot(row, centroids[j]))
+            counts[j] += 1
+            s = sums[j]
+            for d, v in row.items():
+                s[d] += v
+        for j in range(k):
+            if counts[j]:
+                norm = math.sqrt(sum(v * v for v in sums[j])) or 1.0
+                centroids[j] = [v / norm for v in sums[j]]
+    return centroids
+
+
+def fingerprint(paths: Sequence[str], dim: int = DIM, max_words: int = 1000, overlap_words: int = 150) -> Dict[str, object]:
+    return {
+        "sources": {logical_name(p): source_key(p) for p in paths},
+        "chunker": DEFAULT_CHUNKER,
+        "dim": dim,
+        "max_words": max_words,
+        "overlap_words": overlap_words,
+    }
+
+
+def build_index(
+    docs: Iterable[Dict[str, str]],
+    out_dir: str = VECTOR_DIR,
+    dim: int = DIM,
+    max_words: int = 1000,
+    overlap_words: int = 150,
+    stamp: Optional[Dict[str, object]] = None,
+) -> None:
+    """stamp is the fingerprint of the sources docs came from (see build_from_paths)."""
+    rows_meta: List[Tuple[str, int]] = []
+    doc_rows: Dict[str, List[int]] = {}
+    doc_hashes: Dict[str, str] = {}
+    texts: List[str] = []
+    for doc in docs:
+        content = doc.get("content", "")
+        chunks = chunk_document(content, max_words=max_words, overlap_words=overlap_words).chunks
+        doc_rows[doc["id"]] = [len(texts), len(texts) + len(chunks)]
+        doc_hashes[chunk_cache_hash(content)] = doc["id"]
+        for i, ch in enumerate(chunks):
+            rows_meta.append((doc["id"], i))
+            texts.append(ch)
+
+    os.makedirs(out_dir, exist_ok=True)
+    idf = HashingVectorizer.fit_idf(texts)
+    with open(os.path.join(out_dir, "idf.f32.tmp"), "wb") as f:
+        idf.tofile(f)
+
+    vectorizer = HashingVectorizer(idf, dim)
+    vectors = [vectorizer.transform(t) for t in texts]
+    with open(os.path.join(out_dir, "matrix.f32.tmp"), "wb") as f:
+        for vec in vectors:
+            row = array.array("f", bytes(4 * dim))
+            for d, v in vec.items():
+                row[d] = v
+            row.tofile(f)
+
+    heads = [dict(heapq.nlargest(KMEANS_TOP_DIMS, vec.items(), key=lambda x: abs(x[1]))) for vec in vectors]
+    k = max(1, int(math.sqrt(len(vectors))))
+    sample_step = max(1, len(vectors) // KMEANS_SAMPLE)
+    centroids = _kmeans(heads[::sample_step], k, dim) if vectors else []
+    lists: List[List[int]] = [[] for _ in centroids]
+    for r, vec in enumerate(heads):
+        lists[max(range(len(centroids)), key=lambda j: _sparse_dot(vec, centroids[j]))].append(r)
+    with open(os.path.join(out_dir, "centroids.f32.tmp"), "wb") as f:
+        for c in centroids:
+            array.array("f", c).tofile(f)
+
+    with open(os.path.join(out_dir, "meta.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump({
+            "fingerprint": stamp,
+            "dim": dim,
+            "chunker": DEFAULT_CHUNKER,
+            "max_words": max_words,
+            "overlap_words": overlap_words,
+            "rows": rows_meta,
+            "doc_rows": doc_rows,
+            "doc_hashes": doc_hashes,
+            "lists": lists,
+        }, f)
+    # meta.json last: a reader never sees new metadata over an old matrix.
+    for name in ("idf.f32", "matrix.f32", "centroids.f32", "meta.json"):
+        os.replace(os.path.join(out_dir, name + ".tmp"), os.path.join(out_dir, name))
+    print(f"[ok] {len(vectors)} chunk vectors, {len(centroids)} IVF lists -> {out_dir}")
+
+
+def build_from_paths(paths: Sequence[str] = DEFAULT_SOURCES, out_dir: str = VECTOR_DIR) -> None:
+    from part1_data.docstore import DocStore
+
+    stamp = fingerprint(paths)  # before reading: a source changing mid-build reads as stale next time
+
+    def all_docs():
+        for path in paths:
+            with DocStore(path) as docs:
+                yield from docs
+
+    build_index(all_docs(), out_dir, stamp=stamp)
+
+
+def is_current(paths: Sequence[str] = DEFAULT_SOURCES, index_dir: str = VECTOR_DIR) -> bool:
+    try:
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)["fingerprint"] == fingerprint(paths)
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def chunk_cache_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _map_floats(path: str) -> Tuple[Optional[mmap.mmap], memoryview]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, memoryview(array.array("f"))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, memoryview(mm).cast("f")
+
+
+class VectorIndex:
+    """Read side: mmap'ed matrix + IVF lists. Loaded once per process via load_vector_index()."""
+
+    def __init__(self, index_dir: str = VECTOR_DIR):
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dim: int = meta["dim"]
+        self.chunker: str = meta.get("chunker", "words")
+        self.chunking = (meta.get("max_words", 1000), meta.get("overlap_words", 150), self.chunker)
+        self.rows: List[Tuple[str, int]] = [tuple(r) for r in meta["rows"]]  # type: ignore[misc]
+        self.doc_rows: Dict[str, List[int]] = meta["doc_rows"]
+        self.doc_hashes: Dict[str, str] = meta["doc_hashes"]
+        self.lists: List[List[int]] = meta["lists"]
+        self._idf_mm, idf = _map_floats(os.path.join(index_dir, "idf.f32"))
+        self._mat_mm, self.matrix = _map_floats(os.path.join(index_dir, "matrix.f32"))
+        self._cen_mm, self.centroids = _map_floats(os.path.join(index_dir, "centroids.f32"))
+        self.vectorizer = HashingVectorizer(idf, self.dim)
+
+    def search(
+        self,
+        query: Sparse,
+        top_k: int = 5,
+        doc_id: Optional[str] = None,
+        nprobe: int = NPROBE,
+        exact: bool = False,
+    ) -> List[Tuple[int, float]]:
+        """(row, cosine) for the best top_k rows, optionally within one document."""
+        lo, hi = self.doc_rows.get(doc_id, (0, 0)) if doc_id is not None else (0, len(self.rows))
+        if exact or hi - lo <= EXACT_MAX_ROWS:
+            candidates: Iterable[int] = range(lo, hi)
+        else:
+            order = sorted(range(len(self.lists)),
+                           key=lambda j: -_sparse_dot(query, self.centroids, j * self.dim))
+            picked: List[int] = []
+            n_in_doc = 0
+            for probed, j in enumerate(order):
+                members = [r for r in self.lists[j] if lo <= r < hi]
+                picked.extend(members)
+                n_in_doc += len(members)
+                # Keep probing past nprobe until the document has enough candidates
+                if probed + 1 >= nprobe and n_in_doc >= top_k:
+                    break
+            candidates = picked
+        scored = ((r, _sparse_dot(query, self.matrix, r * self.dim)) for r in candidates)
+        return heapq.nlargest(top_k, scored, key=lambda x: x[1])
+
+    def top_chunks_for_event(
+        self,
+        content: str,
+        event_cfg: EventConfig,
+        top_k: int = 5,
+        max_words: int = 1000,
+        overlap_words: int = 150,
+    ) -> List[Tuple[str, float]]:
+        """
+        get_top_chunks_for_event, ranked by cosine to the event description +
+        keywords. Documents not in the index are embedded on the fly.
+        """
+        query = self.vectorizer.transform(event_text(event_cfg))
+        chunks = chunk_document(content, max_words=max_words, overlap_words=overlap_words).chunks
+        doc_id = self.doc_hashes.get(chunk_cache_hash(content))
+        if doc_id is not None and (max_words, overlap_words, DEFAULT_CHUNKER) == self.chunking:
+            hits = self.search(query, top_k, doc_id)
+            return [(chunks[self.rows[r][1]], s) for r, s in hits if s > 0]
+        scored = []
+        for ch in chunks:
+            vec = self.vectorizer.transform(ch)
+            scored.append((ch, sum(w * vec.get(d, 0.0) for d, w in query.items())))
+        return heapq.nlargest(top_k, [p for p in scored if p[1] > 0], key=lambda x: x[1])
+
+
+def event_text(event_cfg: EventConfig) -> str:
+    return " ".join([event_cfg.name, event_cfg.description] + list(event_cfg.keywords))
+
+
+_loaded: Dict[str, VectorIndex] = {}
+
+
+def load_vector_index(index_dir: str = VECTOR_DIR, paths: Sequence[str] = DEFAULT_SOURCES) -> VectorIndex:
+    """Open the index, building it first if it is missing or any input changed."""
+    if index_dir not in _loaded:
+        if not is_current(paths, index_dir):
+            print(f"[info] Vector index missing or out of date, building {index_dir}")
+            try:
+                build_from_paths(paths, index_dir)
+            except FileNotFoundError as e:
+                raise SystemExit(f"[error] Vector index source missing ({e}); run the part1_data "
+                                 f"pipeline first, then vector_index.py build") from None
+        _loaded[index_dir] = VectorIndex(index_dir)
+    return _loaded[index_dir]
+
+
+# ----------------------------------------------------------------------
+# Latency / recall comparison
+# ----------------------------------------------------------------------
+
+def compare(
+    index: VectorIndex,
+    docs: Sequence[Tuple[str, str]],
+    events: Sequence[EventConfig],
+    top_k: int = 5,
+) -> None:
+    """
+    Corpus-wide: IVF vs exact cosine (latency, recall@k).
+    Per document: vector backend vs the keyword scorer (latency, overlap of
+    their top-k, and vector hits the keyword scorer cannot see at all).
+    """
+    from part2_events.retrieval import get_top_chunks_for_events, keyword_matcher
+
+    queries = [index.vectorizer.transform(event_text(ev)) for ev in events]
+
+    def timed(**kwargs) -> Tuple[float, List[List[int]]]:
+        start = time.perf_counter()
+        found = [[r for r, _ in index.search(q, top_k, **kwargs)] for q in queries]
+        return (time.perf_counter() - start) * 1000 / len(queries), found
+
+    exact_ms, exact = timed(exact=True)
+    print(f"[bench] corpus ({len(index.rows)} chunks, {len(index.lists)} lists): "
+          f"exact {exact_ms:.2f} ms/query")
+    for nprobe in sorted({2, 4, NPROBE, 2 * NPROBE}):
+        ivf_ms, ivf = timed(nprobe=nprobe)
+        recall = sum(len(set(a) & set(b)) for a, b in zip(ivf, exact)) / max(1, sum(len(b) for b in exact))
+        print(f"  IVF nprobe={nprobe:<3} {ivf_ms:6.2f} ms/query, recall@{top_k} {recall:.2f}")
+
+    matcher = keyword_matcher(events)
+    kw_s = vec_s = 0.0
+    overlap = kw_total = vec_total = unseen = 0
+    for _, content in docs:
+        start = time.perf_counter()
+        kw = get_top_chunks_for_events(content, events, top_k=top_k)
+        kw_s += time.perf_counter() - start
+        for ev in events:
+            start = time.perf_counter()
+            vec = index.top_chunks_for_event(content, ev, top_k)
+            vec_s += time.perf_counter() - start
+            kw_chunks = set(ch for ch, _ in kw[ev.event_id])
+            overlap += sum(1 for ch, _ in vec if ch in kw_chunks)
+            kw_total += len(kw_chunks)
+            vec_total += len(vec)
+            unseen += sum(1 for ch, _ in vec if matcher.scores(ch.lower())[ev.event_id] == 0)
+    n = max(1, len(docs))
+    print(f"[bench] per document: keywords {kw_s * 1000 / n:.1f} ms (all events), "
+          f"vector {vec_s * 1000 / n:.1f} ms (all events)")
+    print(f"[bench] vector top-{top_k} recovers {overlap}/{kw_total} keyword top-{top_k} chunks; "
+          f"{unseen}/{vec_total} vector hits contain none of the event's keywords")
+
+
+def main():
+    from part1_data.docstore import DocStore
+
+    parser = argparse.ArgumentParser(description="Local hashed-TF-IDF vector index with IVF search")
+    parser.add_argument("--dir", default=VECTOR_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build")
+    p_build.add_argument("paths", nargs="*", default=DEFAULT_SOURCES)
+    p_bench = sub.add_parser("bench", help="latency / recall vs exact search and the keyword scorer")
+    p_bench.add_argument("paths", nargs="*", default=DEFAULT_SOURCES)
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        start = time.perf_counter()
+        build_from_paths(args.paths, args.dir)
+        print(f"[stats] build {time.perf_counter() - start:.1f}s")
+    else:
+        docs: List[Tuple[str, str]] = []
+        for path in args.paths:
+            with DocStore(path) as store:
+                docs.extend((d["id"], d.get("content", "")) for d in store)
+        compare(load_vector_index(args.dir, args.paths), docs, get_all_events())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 # src/part3_eval/event_judge.py
 
+import argparse
 import json
 import os
 import sys
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, Iterable, Iterator, List, Set, Tuple
 
 # --- Make sure src/ is on sys.path so we can import sibling packages ---
 
@@ -13,26 +14,28 @@ if src_dir not in sys.path:
     sys.path.append(src_dir)
 
 from part2_events.config import EVENTS
-from part2_events.llm_client import call_llm
+from part2_events import llm_cache
+from part2_events.cost_plan import CostPlan
+from part2_events.llm_batch import custom_id
+from part2_events.llm_client import LLMRequest, call_llm_many
+from part1_data.store import JsonlWriter, exists, iter_jsonl
 
 
 EVENT_CLAIMS_PATH = "data/events/event_extractions.jsonl"
 OUT_PATH = "data/evals/event_consistency.jsonl"
 
 
+def iter_event_claims(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream event claim records one at a time."""
+    return iter_jsonl(path)
+
+
 def load_event_claims(path: str) -> List[Dict[str, Any]]:
-    records: List[Dict[str, Any]] = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            records.append(json.loads(line))
-    return records
+    return list(iter_event_claims(path))
 
 
 def group_claims_by_event(
-    records: List[Dict[str, Any]]
+    records: Iterable[Dict[str, Any]]
 ) -> Dict[str, Dict[str, Any]]:
     """
     Group event records into a structure like:
@@ -53,6 +56,9 @@ def group_claims_by_event(
     }
     """
     grouped: Dict[str, Dict[str, Any]] = {}
+    # Claims are deduplicated as they stream in, so repeated claims are never held
+    seen_docs: Dict[int, Set[str]] = {}
+    seen_claims: Dict[int, Set[str]] = {}
 
     for rec in records:
         event_id = rec["event"]
@@ -72,21 +78,18 @@ def group_claims_by_event(
             }
 
         bucket = grouped[event_id].get(source, grouped[event_id]["unknown"])
-        if doc_id not in bucket["doc_ids"]:
+        docs = seen_docs.setdefault(id(bucket), set())
+        if doc_id not in docs:
+            docs.add(doc_id)
             bucket["doc_ids"].append(doc_id)
-        bucket["claims"].extend(claims)
-
-    # Deduplicate claims per source
-    for grp in grouped.values():
-        for src in ["lincoln", "other", "unknown"]:
-            seen = set()
-            unique_claims = []
-            for c in grp[src]["claims"]:
-                c_norm = c.strip()
-                if c_norm and c_norm not in seen:
-                    seen.add(c_norm)
-                    unique_claims.append(c_norm)
-            grp[src]["claims"] = unique_claims
+
+        # Deduplicate claims per source
+        seen = seen_claims.setdefault(id(bucket), set())
+        for c in claims:
+            c_norm = c.strip()
+            if c_norm and c_norm not in seen:
+                seen.add(c_norm)
+                bucket["claims"].append(c_norm)
 
     return grouped
 
@@ -237,8 +240,12 @@ def evaluate_events(grouped: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Run the LLM judge for each event where we have any claims.
     """
-    results: List[Dict[str, Any]] = []
+    return list(iter_evaluations(grouped))
 
+
+def judge_requests(grouped: Dict[str, Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any], LLMRequest]]:
+    """(event_id, group, judge request) for each event where we have any claims."""
+    planned = []
     for event_id, grp in grouped.items():
         lincoln_claims = grp["lincoln"]["claims"]
         other_claims = grp["other"]["claims"]
@@ -246,46 +253,72 @@ def evaluate_events(grouped: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
         if not lincoln_claims and not other_claims:
             continue
 
-        event_name = grp["event_name"]
-        print(f"[info] Evaluating event {event_id} ({event_name})")
-
         system_prompt, user_prompt = build_judge_prompt(
-            event_id, event_name, lincoln_claims, other_claims
+            event_id, grp["event_name"], lincoln_claims, other_claims
         )
+        request = LLMRequest(custom_id("all", event_id, "judge"), system_prompt, user_prompt, temperature=0.2)
+        planned.append((event_id, grp, request))
+    return planned
+
 
-        raw_output = call_llm(system_prompt, user_prompt, temperature=0.2)
+def iter_evaluations(grouped: Dict[str, Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    evaluate_events, one result at a time. The judge calls for all events are
+    issued together, so they run concurrently when MM_LLM_CONCURRENCY > 1.
+    """
+    planned = judge_requests(grouped)
+    for event_id, grp, _ in planned:
+        print(f"[info] Evaluating event {event_id} ({grp['event_name']})")
+
+    outputs = call_llm_many([req for _, _, req in planned])
+
+    for (event_id, grp, _), raw_output in zip(planned, outputs):
         parsed = safe_parse_judge_output(raw_output, event_id)
 
-        parsed["event_name"] = event_name
+        parsed["event_name"] = grp["event_name"]
         parsed["lincoln_doc_ids"] = grp["lincoln"]["doc_ids"]
         parsed["other_doc_ids"] = grp["other"]["doc_ids"]
-        parsed["lincoln_claim_count"] = len(lincoln_claims)
-        parsed["other_claim_count"] = len(other_claims)
-
-        results.append(parsed)
+        parsed["lincoln_claim_count"] = len(grp["lincoln"]["claims"])
+        parsed["other_claim_count"] = len(grp["other"]["claims"])
 
-    return results
+        yield parsed
 
 
 def main():
-    if not os.path.exists(EVENT_CLAIMS_PATH):
+    parser = argparse.ArgumentParser(description="LLM judge: Lincoln vs other authors, per event")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="build every judge prompt and report tokens, cost and run time "
+                             "without calling the LLM")
+    args = parser.parse_args()
+
+    if not exists(EVENT_CLAIMS_PATH):
         raise FileNotFoundError(f"Event claims file not found at: {EVENT_CLAIMS_PATH}")
 
-    os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
+    # Stream the claims straight into the grouping, counting them on the way
+    n_records = 0
 
-    records = load_event_claims(EVENT_CLAIMS_PATH)
-    print(f"[info] Loaded {len(records)} event claim records")
+    def counted(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        nonlocal n_records
+        for rec in records:
+            n_records += 1
+            yield rec
 
-    grouped = group_claims_by_event(records)
+    grouped = group_claims_by_event(counted(iter_event_claims(EVENT_CLAIMS_PATH)))
+    print(f"[info] Loaded {n_records} event claim records")
     print(f"[info] Found {len(grouped)} events with extracted claims")
 
-    eval_results = evaluate_events(grouped)
+    if args.dry_run:
+        plan = CostPlan()
+        plan.add("judge", [req for _, _, req in judge_requests(grouped)])
+        plan.report()
+        return
 
-    with open(OUT_PATH, "w", encoding="utf-8") as f:
-        for res in eval_results:
-            f.write(json.dumps(res, ensure_ascii=False) + "\n")
+    with JsonlWriter(OUT_PATH) as f:
+        for res in iter_evaluations(grouped):
+            f.write(res)
 
-    print(f"[ok] Wrote {len(eval_results)} evaluation records to {OUT_PATH}")
+    print(f"[ok] Wrote {f.count} evaluation records to {OUT_PATH}")
+    llm_cache.report()
 
 
 if __name__ == "__main__":
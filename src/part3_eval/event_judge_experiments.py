@@ -1,5 +1,6 @@
 # src/part3_eval/event_judge_experiments.py
 
+import argparse
 import json
 import os
 import sys
@@ -14,8 +15,12 @@ if src_dir not in sys.path:
     sys.path.append(src_dir)
 
 from part2_events.config import EVENTS
-from part2_events.llm_client import call_llm
+from part2_events import llm_cache
+from part2_events.cost_plan import CostPlan
+from part2_events.llm_batch import BatchJob, custom_id
+from part2_events.llm_client import LLMRequest, call_llm_many
 from part3_eval.event_judge import load_event_claims, group_claims_by_event
+from part1_data.store import JsonlWriter, exists, iter_jsonl
 
 
 EVENT_CLAIMS_PATH = "data/events/event_extractions.jsonl"
@@ -152,14 +157,39 @@ def extract_consistency_from_output(output: str) -> int:
 # 3B.1: Prompt robustness
 # ----------------------------------------------------------------------
 
+STRATEGIES = ["zero_shot", "cot", "few_shot"]
+SELF_CONSISTENCY_RUNS = 5
+
+
+def robustness_requests(event_id: str, grp: Dict[str, Any]) -> List[LLMRequest]:
+    """One judge request per prompting strategy, in STRATEGIES order."""
+    requests = []
+    for strat in STRATEGIES:
+        sys_prompt, user_prompt = build_strategy_prompt(
+            event_id, grp["event_name"], grp["lincoln"]["claims"], grp["other"]["claims"], strat
+        )
+        requests.append(LLMRequest(custom_id("all", event_id, strat), sys_prompt, user_prompt, temperature=0.2))
+    return requests
+
+
+def self_consistency_requests(event_id: str, grp: Dict[str, Any]) -> List[LLMRequest]:
+    """The same cot prompt SELF_CONSISTENCY_RUNS times at temperature 0.7."""
+    sys_prompt, user_prompt = build_strategy_prompt(
+        event_id, grp["event_name"], grp["lincoln"]["claims"], grp["other"]["claims"], strategy="cot"
+    )
+    # One cache entry per draw, so reruns replay the same five samples
+    return [
+        LLMRequest(custom_id("all", event_id, "self_consistency", run_idx), sys_prompt, user_prompt,
+                   temperature=0.7, sample=run_idx)
+        for run_idx in range(SELF_CONSISTENCY_RUNS)
+    ]
+
+
 def run_prompt_robustness(grouped: Dict[str, Dict[str, Any]]) -> None:
     """
     3B.1: Prompt robustness – compare multiple prompting strategies.
     """
-    os.makedirs(os.path.dirname(PROMPT_ROBUST_OUT), exist_ok=True)
-    strategies = ["zero_shot", "cot", "few_shot"]
-
-    with open(PROMPT_ROBUST_OUT, "w", encoding="utf-8") as f_out:
+    with JsonlWriter(PROMPT_ROBUST_OUT) as f_out:
         for event_id, grp in grouped.items():
             lincoln_claims = grp["lincoln"]["claims"]
             other_claims = grp["other"]["claims"]
@@ -169,11 +199,9 @@ def run_prompt_robustness(grouped: Dict[str, Dict[str, Any]]) -> None:
             event_name = grp["event_name"]
             print(f"[robustness] Event {event_id} ({event_name})")
 
-            for strat in strategies:
-                sys_prompt, user_prompt = build_strategy_prompt(
-                    event_id, event_name, lincoln_claims, other_claims, strat
-                )
-                raw = call_llm(sys_prompt, user_prompt, temperature=0.2)
+            # The three strategies run concurrently when MM_LLM_CONCURRENCY > 1
+            outputs = call_llm_many(robustness_requests(event_id, grp))
+            for strat, raw in zip(STRATEGIES, outputs):
                 score = extract_consistency_from_output(raw)
 
                 record = {
@@ -182,7 +210,7 @@ def run_prompt_robustness(grouped: Dict[str, Dict[str, Any]]) -> None:
                     "strategy": strat,
                     "overall_consistency": score,
                 }
-                f_out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f_out.write(record)
 
 
 # ----------------------------------------------------------------------
@@ -193,9 +221,7 @@ def run_self_consistency(grouped: Dict[str, Dict[str, Any]]) -> None:
     """
     3B.2: Self-consistency – run the same prompt multiple times with temp>0.
     """
-    os.makedirs(os.path.dirname(SELF_CONSIST_OUT), exist_ok=True)
-
-    with open(SELF_CONSIST_OUT, "w", encoding="utf-8") as f_out:
+    with JsonlWriter(SELF_CONSIST_OUT) as f_out:
         for event_id, grp in grouped.items():
             lincoln_claims = grp["lincoln"]["claims"]
             other_claims = grp["other"]["claims"]
@@ -205,15 +231,8 @@ def run_self_consistency(grouped: Dict[str, Dict[str, Any]]) -> None:
             event_name = grp["event_name"]
             print(f"[self-consistency] Event {event_id} ({event_name})")
 
-            sys_prompt, user_prompt = build_strategy_prompt(
-                event_id, event_name, lincoln_claims, other_claims, strategy="cot"
-            )
-
-            scores: List[int] = []
-            for run_idx in range(5):
-                raw = call_llm(sys_prompt, user_prompt, temperature=0.7)
-                score = extract_consistency_from_output(raw)
-                scores.append(score)
+            outputs = call_llm_many(self_consistency_requests(event_id, grp))
+            scores: List[int] = [extract_consistency_from_output(raw) for raw in outputs]
 
             mean_score = sum(scores) / len(scores)
             std = float(statistics.pstdev(scores)) if len(scores) > 1 else 0.0
@@ -230,7 +249,7 @@ def run_self_consistency(grouped: Dict[str, Dict[str, Any]]) -> None:
                 "std": std,
                 "coefficient_of_variation": coef_var,
             }
-            f_out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f_out.write(record)
 
 
 # ----------------------------------------------------------------------
@@ -243,12 +262,11 @@ def run_inter_rater_from_prompt_robustness() -> None:
     (zero_shot, cot, few_shot) is treated as a different rater assigning
     a 0–100 consistency score per event.
     """
-    if not os.path.exists(PROMPT_ROBUST_OUT):
+    if not exists(PROMPT_ROBUST_OUT):
         print(f"[warn] {PROMPT_ROBUST_OUT} not found; skipping inter-rater summary")
         return
 
-    with open(PROMPT_ROBUST_OUT, "r", encoding="utf-8") as f:
-        rows = [json.loads(line) for line in f if line.strip()]
+    rows = list(iter_jsonl(PROMPT_ROBUST_OUT))
 
     by_event: Dict[str, Dict[str, Any]] = {}
     for r in rows:
@@ -263,8 +281,7 @@ def run_inter_rater_from_prompt_robustness() -> None:
         )
         by_event[ev]["scores"][r["strategy"]] = r["overall_consistency"]
 
-    os.makedirs(os.path.dirname(INTER_RATER_OUT), exist_ok=True)
-    with open(INTER_RATER_OUT, "w", encoding="utf-8") as f_out:
+    with JsonlWriter(INTER_RATER_OUT) as f_out:
         for ev, rec in by_event.items():
             scores_dict = rec["scores"]
             scores_list = list(scores_dict.values())
@@ -283,7 +300,7 @@ def run_inter_rater_from_prompt_robustness() -> None:
                 "std": std,
                 "range": score_range,
             }
-            f_out.write(json.dumps(out, ensure_ascii=False) + "\n")
+            f_out.write(out)
 
 
 # ----------------------------------------------------------------------
@@ -357,12 +374,11 @@ def compute_kappa_inter_rater() -> None:
 
     Results are written to KAPPA_OUT as a single JSONL record.
     """
-    if not os.path.exists(PROMPT_ROBUST_OUT):
+    if not exists(PROMPT_ROBUST_OUT):
         print(f"[warn] {PROMPT_ROBUST_OUT} not found; skipping kappa computation")
         return
 
-    with open(PROMPT_ROBUST_OUT, "r", encoding="utf-8") as f:
-        rows = [json.loads(line) for line in f if line.strip()]
+    rows = list(iter_jsonl(PROMPT_ROBUST_OUT))
 
     # Group by event: {event: {"event_name": ..., "zero_shot": score, "cot": score, "few_shot": score}}
     by_event: Dict[str, Dict[str, Any]] = {}
@@ -402,8 +418,7 @@ def compute_kappa_inter_rater() -> None:
     kappa_zero_vs_few = cohen_kappa(labels_zero, labels_few)
     kappa_cot_vs_few = cohen_kappa(labels_cot, labels_few)
 
-    os.makedirs(os.path.dirname(KAPPA_OUT), exist_ok=True)
-    with open(KAPPA_OUT, "w", encoding="utf-8") as f_out:
+    with JsonlWriter(KAPPA_OUT) as f_out:
         record = {
             "events": events,
             "category_labels": {
@@ -417,7 +432,7 @@ def compute_kappa_inter_rater() -> None:
                 "cot_vs_few": kappa_cot_vs_few,
             },
         }
-        f_out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f_out.write(record)
 
     print(f"[ok] Wrote Cohen's kappa inter-rater results to {KAPPA_OUT}")
 
@@ -427,12 +442,46 @@ def compute_kappa_inter_rater() -> None:
 # ----------------------------------------------------------------------
 
 def main():
-    if not os.path.exists(EVENT_CLAIMS_PATH):
+    parser = argparse.ArgumentParser(description="Judge robustness / consistency experiments (3B)")
+    parser.add_argument("--batch", metavar="JOB",
+                        help="run the LLM calls as OpenAI batch job JOB (half price, results within 24h); "
+                             "rerun with the same JOB to resume after an interruption")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="with --batch: submit / check the job once and exit instead of polling")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="build every prompt and report calls, tokens, cost and run time "
+                             "without calling the LLM")
+    args = parser.parse_args()
+
+    if not exists(EVENT_CLAIMS_PATH):
         raise FileNotFoundError(f"{EVENT_CLAIMS_PATH} not found")
 
     records = load_event_claims(EVENT_CLAIMS_PATH)
     grouped = group_claims_by_event(records)
 
+    if args.dry_run:
+        # Grouped per event, as run_prompt_robustness / run_self_consistency send them
+        plan = CostPlan()
+        for event_id, grp in grouped.items():
+            if grp["lincoln"]["claims"] or grp["other"]["claims"]:
+                plan.add("prompt robustness", robustness_requests(event_id, grp))
+        for event_id, grp in grouped.items():
+            if grp["lincoln"]["claims"] or grp["other"]["claims"]:
+                plan.add("self-consistency", self_consistency_requests(event_id, grp))
+        plan.report()
+        return
+
+    if args.batch:
+        # Both experiments' prompts go into one batch job; the runs below are
+        # then answered from the LLM cache.
+        requests: List[LLMRequest] = []
+        for event_id, grp in grouped.items():
+            if grp["lincoln"]["claims"] or grp["other"]["claims"]:
+                requests += robustness_requests(event_id, grp) + self_consistency_requests(event_id, grp)
+        if not BatchJob(args.batch).run(requests, wait=not args.no_wait):
+            print(f"[info] Batch {args.batch} still running; rerun the same command to resume")
+            return
+
     print("[info] Running Prompt Robustness (3B.1)")
     run_prompt_robustness(grouped)
 
@@ -449,6 +498,7 @@ def main():
     print(f"[ok] Wrote self-consistency results to {SELF_CONSIST_OUT}")
     print(f"[ok] Wrote inter-rater summary to {INTER_RATER_OUT}")
     print(f"[ok] Wrote kappa inter-rater summary to {KAPPA_OUT}")
+    llm_cache.report()
 
 
 if __name__ == "__main__":